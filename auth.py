@@ -1,27 +1,182 @@
-from fastapi import Depends, HTTPException
+import os
+import secrets
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from backend import crud
-from backend.database import SessionLocal
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend import crud, schemas, utils
+from backend.cache import TTLCache
+from backend.database import AsyncSessionLocal
+from backend.logs import get_logger
 
-# Disable OAuth2 for now
-# oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+logger = get_logger(__name__)
 
-def get_db():
-    db = SessionLocal()
-    try:
+# python-jose is imported where tokens are signed or verified, which requests with
+# a cached token never reach
+
+# Tokens are signed with AUTH_SECRET_KEY; without it a random key is used and
+# tokens stop being valid when the process restarts
+SECRET_KEY = os.environ.get("AUTH_SECRET_KEY") or secrets.token_urlsafe(32)
+ALGORITHM = "HS256"
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.environ.get("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
+# Seconds a verified token is trusted before its user is looked up again
+AUTH_CACHE_TTL = float(os.environ.get("AUTH_CACHE_TTL", "30"))
+# Unless set, requests without a token act as the default user (development mode)
+AUTH_REQUIRED = os.environ.get("AUTH_REQUIRED", "").lower() in ("1", "true", "yes")
+DEFAULT_USERNAME = "default_user"
+DEFAULT_PASSWORD = "default_password"
+
+# Users allowed to call the /admin routes; when unset, nobody is. The default
+# user, whose password is public, never is.
+ADMIN_USERS = {name.strip() for name in os.environ.get("ADMIN_USERS", "").split(",") if name.strip()}
+if DEFAULT_USERNAME in ADMIN_USERS:
+    logger.warning("Ignoring %s in ADMIN_USERS; the default user cannot be an admin", DEFAULT_USERNAME)
+    ADMIN_USERS.discard(DEFAULT_USERNAME)
+
+if "AUTH_SECRET_KEY" not in os.environ:
+    logger.warning("AUTH_SECRET_KEY is not set; issued tokens are only valid until restart")
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
+
+
+class Principal:
+    """The authenticated user of a request. Shared between requests through the
+    cache, so it must be treated as read-only.
+    """
+    __slots__ = ("id", "username", "token_id")
+
+    def __init__(self, id: int, username: str, token_id: Optional[str] = None):
+        self.id = id
+        self.username = username
+        self.token_id = token_id
+
+
+# token -> Principal of a verified token
+principals = TTLCache(max_entries=10000, max_bytes=8 * 1024 * 1024)
+# token -> True for a token that failed verification. Kept apart from principals
+# and small, so a flood of bad tokens cannot evict the principals of good ones.
+rejected = TTLCache(max_entries=1000, max_bytes=1024 * 1024)
+
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
-
-async def get_current_user(db: Session = Depends(get_db)):
-    # Simplified authentication for development
-    # In a real application, this would verify the token and retrieve the user from the database
-    user = crud.get_user(db, user_id=1) # Placeholder user
-    if not user:
-        # Create a default user if it doesn't exist
-        from backend.utils import get_password_hash
-        hashed_password = get_password_hash("default_password")
-        db_user = crud.create_user(db, {"username": "default_user", "password": "default_password"})
-        return db_user
+
+def create_access_token(user) -> Dict[str, Any]:
+    """Sign a bearer token for a user"""
+    from jose import jwt
+    now = int(time.time())
+    expires_in = ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    claims = {"sub": str(user.id), "name": user.username, "jti": uuid.uuid4().hex, "iat": now, "exp": now + expires_in}
+    return {"access_token": jwt.encode(claims, SECRET_KEY, algorithm=ALGORITHM), "token_type": "bearer", "expires_in": expires_in}
+
+async def authenticate_user(db: AsyncSession, username: str, password: str):
+    """The user with these credentials, or None. bcrypt runs in a worker thread."""
+    user = await crud.get_user_by_username(db, username)
+    if user is None or not await utils.verify_password_async(password, user.hashed_password):
+        return None
     return user
+
+async def revoke_token(token: str) -> bool:
+    """Reject a token from now on, even though it has not expired.
+
+    The revocation is stored in the database: this worker rejects the token at
+    once, other workers when they next verify it, within AUTH_CACHE_TTL.
+    """
+    from jose import JWTError, jwt
+    try:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        token_id, expires_at = claims["jti"], int(claims["exp"])
+    except (JWTError, KeyError, TypeError, ValueError):
+        return False
+    async with AsyncSessionLocal() as db:
+        await crud.revoke_token(db, token_id, expires_at)
+    principals.delete(token)
+    return True
+
+async def _verify_token(token: str) -> Optional[Principal]:
+    from jose import JWTError, jwt
+    try:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        user_id = int(claims["sub"])
+    except (JWTError, KeyError, ValueError):
+        return None
+    # The user may have been deleted, or the token revoked, since it was issued
+    async with AsyncSessionLocal() as db:
+        user = await crud.get_user(db, user_id=user_id)
+        if user is None or (claims.get("jti") and await crud.is_token_revoked(db, claims["jti"])):
+            return None
+    # Never trust a cached token past its expiry
+    expiry = min(AUTH_CACHE_TTL, claims["exp"] - time.time())
+    principal = Principal(user.id, user.username, claims.get("jti"))
+    principals.set(token, principal, expiry)
+    return principal
+
+async def default_principal() -> Principal:
+    """The default user, created on first use; concurrent callers share one lookup"""
+    async def load():
+        async with AsyncSessionLocal() as db:
+            user = await crud.get_user_by_username(db, DEFAULT_USERNAME)
+            if not user:
+                try:
+                    user = await crud.create_user(db, schemas.UserCreate(username=DEFAULT_USERNAME, password=DEFAULT_PASSWORD))
+                except IntegrityError:
+                    # Created by another worker in the meantime
+                    user = await crud.get_user_by_username(db, DEFAULT_USERNAME)
+        return Principal(user.id, user.username)
+    return await principals.get_or_compute_async(("default",), load, AUTH_CACHE_TTL)
+
+async def get_current_user(token: Optional[str] = Depends(oauth2_scheme)) -> Principal:
+    """The principal of the request's bearer token.
+
+    Verified tokens are cached, so most requests cost one dictionary lookup and
+    no database query. A token that is invalid, expired or revoked is rejected
+    with 401; only requests without a token fall back to the default user.
+    """
+    if token:
+        principal = principals.get(token)
+        if principal is None and not rejected.get(token):
+            principal = await _verify_token(token)
+            if principal is None:
+                # Remember bad tokens too, so they are not verified on every request
+                rejected.set(token, True, AUTH_CACHE_TTL)
+        if principal is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid or expired token",
+                headers={"WWW-Authenticate": 'Bearer error="invalid_token"'},
+            )
+        return principal
+    if AUTH_REQUIRED:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return await default_principal()
+
+async def require_admin(principal: Principal = Depends(get_current_user)) -> Principal:
+    """The principal of an /admin request, which needs a valid token even when AUTH_REQUIRED is off"""
+    if principal.token_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if principal.username not in ADMIN_USERS or principal.username == DEFAULT_USERNAME:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return principal
+
+async def get_stats() -> Dict[str, Any]:
+    async with AsyncSessionLocal() as db:
+        revoked = await crud.count_revoked_tokens(db)
+    return {
+        "auth_required": AUTH_REQUIRED,
+        "revoked_tokens": revoked,
+        "cache": principals.get_stats(),
+        "rejected_cache": rejected.get_stats(),
+    }
@@ -0,0 +1,111 @@
+# Concurrent write throughput of the SQLite layer
+#
+# Many clients insert and update tasks at the same time, as request handlers,
+# WebSocket sessions and the task queue do. Three setups are compared on a fresh
+# database file each:
+#   baseline  default engine, each client commits its own session
+#   wal       WAL and tuned pragmas, each client still commits its own session
+#   batched   WAL with the serialized batch writer (group commit)
+#
+# Run from the directory containing the backend package:
+#   python -m backend.benchmarks.db_writes --clients 50 --writes 40
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from backend import database, models
+from backend.tracing import percentile
+
+
+def _prepare(path: str) -> None:
+    engine = create_engine(f"sqlite:///{path}")
+    database.Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(models.MCPServer.__table__.insert(), {"id": 1, "name": "bench", "host": "localhost", "port": 1, "type": "web"})
+    engine.dispose()
+
+
+async def _client(client_id: int, writes: int, write, latencies: list, errors: list) -> None:
+    for i in range(writes):
+        started = time.perf_counter()
+        try:
+            await write(client_id, i)
+        except Exception as e:
+            errors.append(type(e).__name__)
+        else:
+            latencies.append(time.perf_counter() - started)
+
+
+def _task_insert(session, client_id: int, i: int) -> models.Task:
+    task = models.Task(name=f"task-{client_id}-{i}", command="ls", server_id=1)
+    session.add(task)
+    return task
+
+
+async def _run(mode: str, path: str, clients: int, writes: int) -> dict:
+    url = f"sqlite+aiosqlite:///{path}"
+    if mode == "batched":
+        write_engine = database.create_write_engine(url)
+        writer = database.BatchWriter(async_sessionmaker(write_engine, expire_on_commit=False))
+
+        async def write(client_id, i):
+            async def operation(session):
+                _task_insert(session, client_id, i)
+            await writer.run(operation)
+        engines = [write_engine]
+    else:
+        engine = create_async_engine(url)
+        if mode == "wal":
+            database.apply_pragmas(engine)
+        sessions = async_sessionmaker(engine, expire_on_commit=False)
+
+        async def write(client_id, i):
+            async with sessions() as session:
+                _task_insert(session, client_id, i)
+                await session.commit()
+        engines = [engine]
+
+    latencies, errors = [], []
+    started = time.perf_counter()
+    await asyncio.gather(*(_client(c, writes, write, latencies, errors) for c in range(clients)))
+    elapsed = time.perf_counter() - started
+    if mode == "batched":
+        await writer.close()
+    for engine in engines:
+        await engine.dispose()
+
+    latencies.sort()
+    result = {
+        "mode": mode,
+        "writes": len(latencies),
+        "errors": len(errors),
+        "seconds": round(elapsed, 3),
+        "writes_per_sec": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+    if mode == "batched":
+        result["mean_batch"] = writer.get_stats()["mean_batch"]
+    return result
+
+
+async def main(clients: int, writes: int, modes: list) -> None:
+    for mode in modes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.db")
+            _prepare(path)
+            print(await _run(mode, path, clients, writes))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent SQLite write throughput")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--writes", type=int, default=40, help="writes per client")
+    parser.add_argument("--modes", default="baseline,wal,batched")
+    args = parser.parse_args()
+    asyncio.run(main(args.clients, args.writes, args.modes.split(",")))
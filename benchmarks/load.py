@@ -0,0 +1,296 @@
+# End-to-end load test against a simulated MCP fleet
+#
+# Starts the app in-process under uvicorn, on a fresh database and config.json
+# in a temporary directory, with --servers simulated MCP servers (simulator.py):
+# every connect and command waits for a latency drawn from a lognormal
+# distribution around --latency-ms, fails with probability --error-rate and
+# returns --output-bytes of output. By default the simulated servers run
+# in-process; with --rpc each listens on its own port and the app talks to them
+# over JSON-RPC, exercising the real client path. Then, all at once for
+# --duration seconds:
+#   rest        --rest-clients clients POST /execute/{id}
+#   tasks       --task-clients clients create a task, run it and poll it until
+#               it has finished (latency is run to finished)
+#   dashboards  --ws-clients WebSocket clients receive server lists and metrics
+#               and ask for the server list every --ws-interval seconds
+# and reports throughput and latency percentiles for each workload.
+#
+# --save-baseline FILE stores the results. --baseline FILE compares against
+# stored results and exits with status 1 if throughput fell, or p95 latency or
+# the error rate rose, by more than --tolerance.
+#
+# Run from the directory containing the backend package:
+#   python -m backend.benchmarks.load --servers 50 --duration 20 --save-baseline baseline.json
+#   python -m backend.benchmarks.load --servers 50 --duration 20 --baseline baseline.json
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import httpx
+import uvicorn
+import websockets
+
+from backend.mcp_manager import CommandBackend, RPCBackend
+from backend.simulator import RPCServer, Simulator, merge_tools
+from backend.tracing import percentile
+
+# Simulated servers are registered with consecutive ports from here (listening on them with --rpc)
+FIRST_PORT = 19001
+
+# Limits high enough that the benchmark measures the stack rather than the rate limiter
+BENCHMARK_RATE_LIMITS = {
+    "global": {"rate": 1000000, "burst": 1000000},
+    "per_user": {"rate": 1000000, "burst": 1000000},
+    "per_server": {"default": {"rate": 1000000, "burst": 1000000}},
+    "max_inflight": 100000,
+    "max_queue_depth": 100000,
+}
+
+
+class SimulatedFleet(CommandBackend):
+    """One simulator per server, run in-process"""
+
+    def __init__(self, simulators: List[Simulator]):
+        self.simulators = simulators
+
+    async def connect(self, server) -> None:
+        # A connect takes as long as a command would
+        simulator = self.simulators[server.port - FIRST_PORT]
+        await asyncio.sleep(simulator.latency(simulator.resolve("*")))
+
+    async def execute(self, server, command: str) -> str:
+        name, _, args = command.partition(" ")
+        return await self.simulators[server.port - FIRST_PORT].call(name, args, server=server.name)
+
+
+class Workload:
+    """Latencies and outcomes of one kind of operation"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies: List[float] = []
+        self.errors = 0
+        self.rejected = 0  # 429 and 503 from rate limiting and load shedding
+        self.messages = 0  # WebSocket messages received
+
+    def record(self, started: float, status_code: int) -> None:
+        if status_code < 400:
+            self.latencies.append(time.perf_counter() - started)
+        elif status_code in (429, 503):
+            self.rejected += 1
+        else:
+            self.errors += 1
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        latencies = sorted(self.latencies)
+        attempts = len(latencies) + self.errors + self.rejected
+        result = {
+            "ops": len(latencies),
+            "errors": self.errors,
+            "rejected": self.rejected,
+            "error_rate": round(self.errors / attempts, 4) if attempts else 0.0,
+            "throughput": round(len(latencies) / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        }
+        if self.messages:
+            result["messages_per_sec"] = round(self.messages / elapsed, 1)
+        return result
+
+
+async def rest_client(http: httpx.AsyncClient, server_ids: List[int], stop_at: float, workload: Workload, rng: random.Random) -> None:
+    while time.monotonic() < stop_at:
+        server_id = rng.choice(server_ids)
+        started = time.perf_counter()
+        try:
+            response = await http.post(f"/execute/{server_id}", data={"command": f"run job-{rng.randrange(1000000)}"})
+            workload.record(started, response.status_code)
+        except httpx.HTTPError:
+            workload.errors += 1
+
+
+async def task_client(http: httpx.AsyncClient, server_ids: List[int], stop_at: float, workload: Workload, rng: random.Random) -> None:
+    while time.monotonic() < stop_at:
+        server_id = rng.choice(server_ids)
+        try:
+            task = (await http.post("/tasks", json={"name": "bench", "command": "run batch", "server_id": server_id})).json()
+            started = time.perf_counter()
+            response = await http.post(f"/tasks/{task['id']}/run")
+            if response.status_code >= 400:
+                workload.record(started, response.status_code)
+                continue
+            while True:
+                await asyncio.sleep(0.01)
+                status = (await http.get(f"/tasks/{task['id']}")).json()["status"]
+                if status in ("completed", "failed"):
+                    break
+            workload.record(started, 200 if status == "completed" else 500)
+        except (httpx.HTTPError, KeyError, ValueError):
+            workload.errors += 1
+
+
+async def dashboard_client(url: str, interval: float, stop_at: float, workload: Workload) -> None:
+    requested: List[float] = []
+    try:
+        async with websockets.connect(url, max_size=None) as ws:
+            # The server sends a server list of its own a second after connecting, before reading requests
+            while json.loads(await ws.recv())["type"] != "server_list":
+                workload.messages += 1
+            workload.messages += 1
+
+            async def receive():
+                async for raw in ws:
+                    workload.messages += 1
+                    if json.loads(raw)["type"] == "server_list" and requested:
+                        workload.record(requested.pop(0), 200)
+            receiver = asyncio.create_task(receive())
+            while time.monotonic() < stop_at:
+                requested.append(time.perf_counter())
+                await ws.send(json.dumps({"type": "get_server_list"}))
+                await asyncio.sleep(interval)
+            receiver.cancel()
+    except (OSError, websockets.exceptions.WebSocketException):
+        workload.errors += 1
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    # Imported here so that the app's database and archive paths resolve inside the working directory
+    from backend.main import app
+    from backend.mcp_manager import mcp_manager
+
+    mcp_manager.config_path = os.path.join(os.getcwd(), "config.json")
+    with open(mcp_manager.config_path, "w") as f:
+        json.dump({"servers": [], "rate_limits": BENCHMARK_RATE_LIMITS}, f)
+    tools = merge_tools([], {
+        "latency": {"distribution": "lognormal", "ms": args.latency_ms, "spread": args.latency_sigma},
+        "error_rate": args.error_rate,
+        "payload_bytes": args.output_bytes,
+        "progress_steps": args.progress_steps,
+    })
+    simulators = [Simulator(tools, name=f"sim-{i}", seed=args.seed + i) for i in range(args.servers)]
+    fleet = []
+    if args.rpc:
+        for i, simulator in enumerate(simulators):
+            fleet.append(await asyncio.start_server(RPCServer(simulator).handle, "127.0.0.1", FIRST_PORT + i))
+        mcp_manager.set_backend(RPCBackend())
+    else:
+        mcp_manager.set_backend(SimulatedFleet(simulators))
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", log_config=None))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    base_url = f"http://127.0.0.1:{port}"
+    limits = httpx.Limits(max_connections=args.rest_clients + args.task_clients + 10)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as http:
+        token = (await http.post("/token", data={"username": "default_user", "password": "default_password"})).json()
+        http.headers["Authorization"] = f"Bearer {token['access_token']}"
+
+        servers = [{"name": f"sim-{i}", "host": "127.0.0.1", "port": FIRST_PORT + i, "type": "simulated"} for i in range(args.servers)]
+        created = (await http.post("/servers/bulk", json=servers)).json()
+        server_ids = [item["id"] for item in created if item["success"]]
+        await asyncio.gather(*(http.post(f"/servers/connect/{server_id}") for server_id in server_ids))
+
+        workloads = {name: Workload(name) for name in ("rest", "tasks", "dashboards")}
+        rng = random.Random(args.seed)
+        started = time.monotonic()
+        stop_at = started + args.duration
+        await asyncio.gather(
+            *(rest_client(http, server_ids, stop_at, workloads["rest"], random.Random(rng.random())) for _ in range(args.rest_clients)),
+            *(task_client(http, server_ids, stop_at, workloads["tasks"], random.Random(rng.random())) for _ in range(args.task_clients)),
+            *(dashboard_client(f"ws://127.0.0.1:{port}/ws/{i}", args.ws_interval, stop_at, workloads["dashboards"])
+              for i in range(args.ws_clients)),
+        )
+        elapsed = time.monotonic() - started
+
+    server.should_exit = True
+    await serving
+    for listener in fleet:
+        listener.close()
+    return {name: workload.summary(elapsed) for name, workload in workloads.items()}
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Regressions of `results` against a baseline run, as readable lines"""
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if not base or not base["ops"]:
+            continue
+        if current["throughput"] < base["throughput"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {current['throughput']}/s, baseline {base['throughput']}/s")
+        if current["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {current['p95_ms']} ms, baseline {base['p95_ms']} ms")
+        if current["error_rate"] > base["error_rate"] + tolerance * max(base["error_rate"], 0.01):
+            regressions.append(f"{name}: error rate {current['error_rate']}, baseline {base['error_rate']}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="End-to-end load test against a simulated MCP fleet")
+    parser.add_argument("--servers", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=20, help="median simulated latency per connect or command")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="spread of the lognormal latency distribution")
+    parser.add_argument("--error-rate", type=float, default=0.01, help="probability that a simulated command fails")
+    parser.add_argument("--output-bytes", type=int, default=2048, help="size of each command's output")
+    parser.add_argument("--progress-steps", type=int, default=0, help="progress notifications per command (with --rpc)")
+    parser.add_argument("--rpc", action="store_true", help="run the simulated servers behind JSON-RPC over TCP")
+    parser.add_argument("--rest-clients", type=int, default=20)
+    parser.add_argument("--task-clients", type=int, default=10)
+    parser.add_argument("--ws-clients", type=int, default=20)
+    parser.add_argument("--ws-interval", type=float, default=1.0, help="seconds between server list requests per dashboard")
+    parser.add_argument("--duration", type=float, default=15, help="seconds of load")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", help="compare against the results stored in this file")
+    parser.add_argument("--save-baseline", help="store the results in this file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression against the baseline")
+    args = parser.parse_args()
+
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    settings = {k: v for k, v in vars(args).items() if k not in ("baseline", "save_baseline", "tolerance")}
+    previous_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            results = asyncio.run(run(args))
+        finally:
+            os.chdir(previous_dir)
+
+    for name, summary in results.items():
+        print(name, json.dumps(summary))
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({"settings": settings, "results": results}, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline["settings"] != settings:
+            print(f"Settings differ from the baseline's: {baseline['settings']}", file=sys.stderr)
+            return 2
+        regressions = compare(results, baseline["results"], args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            return 1
+        print("No regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
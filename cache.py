@@ -1,10 +1,162 @@
-# Placeholder for Redis caching
+# In-process cache with per-key TTLs, memory-bounded LRU eviction and stampede protection
+#
+# There is deliberately no tier shared between workers. Command results are
+# cached by the worker that owns the server (see sharding.py), so they are not
+# recomputed elsewhere; principals are a signature check away; and cross-worker
+# invalidation of the registry goes through the collection versions in the
+# database. A shared tier would put a blocking disk or IPC round trip on every
+# lookup, which costs more than the misses it saves here.
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from backend.singleflight import SingleFlight
+
+_MISSING = object()
+
+
+def _sizeof(value: Any) -> int:
+    """Approximate memory footprint of a cached value in bytes.
+
+    Counts the value and, for containers, their direct items, without walking
+    nested structures; pass the size to set() where that matters.
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(sys.getsizeof(item) for item in value)
+    return size
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after a per-key TTL.
+
+    Eviction is bounded both by entry count and by the approximate size of the
+    stored values. All operations are non-blocking, so it is safe to use from
+    the event loop as well as from worker threads.
+    """
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        self._entries: "OrderedDict[Any, tuple]" = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+        self._flight = SingleFlight()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return default
+            expires_at, _, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                self.stats["expirations"] += 1
+                self.stats["misses"] += 1
+                return default
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return value
+
+    def set(self, key: Any, value: Any, expiry: Optional[float] = 60, size: Optional[int] = None) -> None:
+        """Store a value for `expiry` seconds (None keeps it until evicted); `size`
+        in bytes is estimated unless given
+        """
+        if size is None:
+            size = _sizeof(value)
+        expires_at = time.monotonic() + expiry if expiry is not None else None
+        with self._lock:
+            self._remove(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (expires_at, size, value)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.stats["evictions"] += 1
+
+    def delete(self, key: Any) -> bool:
+        with self._lock:
+            return self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key: Any) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._bytes -= entry[1]
+        return True
+
+    def get_or_compute(self, key: Any, compute: Callable[[], Any], expiry: Optional[float] = 60) -> Any:
+        """Return the cached value, computing it once even if many threads miss at the same time"""
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        def load():
+            # Another caller may have filled the entry while we waited to lead
+            cached = self.get(key, _MISSING)
+            if cached is not _MISSING:
+                return cached
+            result = compute()
+            self.set(key, result, expiry)
+            return result
+
+        return self._flight.do(key, load)
+
+    async def get_or_compute_async(self, key: Any, compute: Callable[[], Awaitable[Any]], expiry: Optional[float] = 60) -> Any:
+        """Async variant of get_or_compute; concurrent coroutines await a single computation"""
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        async def load():
+            result = await compute()
+            self.set(key, result, expiry)
+            return result
+
+        return await self._flight.do_async(key, load)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hit_rate": self.stats["hits"] / lookups if lookups else 0.0,
+            }
+
+
+# Process-wide cache used by the helpers below
+default_cache = TTLCache()
+
 def get_cached_data(key):
-    print(f"Getting data from cache for key {key}")
-    # In a real application, this would retrieve data from Redis
-    return None
+    return default_cache.get(key)
 
 def set_cached_data(key, data, expiry=60):
-    print(f"Setting data in cache for key {key} with expiry {expiry}")
-    # In a real application, this would store data in Redis with an expiry time
+    default_cache.set(key, data, expiry)
     return True
+
+def delete_cached_data(key):
+    return default_cache.delete(key)
+
+def get_or_compute(key, compute, expiry=60):
+    return default_cache.get_or_compute(key, compute, expiry)
+
+async def get_or_compute_async(key, compute, expiry=60):
+    return await default_cache.get_or_compute_async(key, compute, expiry)
+
+def get_cache_stats():
+    return default_cache.get_stats()
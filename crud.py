@@ -1,117 +1,496 @@
+from sqlalchemy import delete, event, func, insert, select, tuple_, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import base64
+import json
+import os
+import time
 
-from backend import models, schemas
+from backend import models, schemas, utils
+from backend.database import writer
+from backend.registry import ServerRegistry, registry
+from backend.logs import get_logger
 
-def get_mcpserver(db: Session, mcpserver_id: int):
-    return db.query(models.MCPServer).filter(models.MCPServer.id == mcpserver_id).first()
+logger = get_logger(__name__)
 
-def get_mcpserver_by_name(db: Session, name: str):
-    return db.query(models.MCPServer).filter(models.MCPServer.name == name).first()
+# Reads use the caller's session; writes are applied by the database writer, which
+# commits concurrent writes together, and return objects detached from its session.
+# Servers are read from the in-memory registry, which every committed server write
+# is written through to.
 
-def get_mcpservers(db: Session, skip: int = 0):
-    print("Fetching MCP servers from database...") # Log function call
-    servers = db.query(models.MCPServer).offset(skip).all()
-    print(f"Fetched {len(servers)} MCP servers from database") # Log server count
-    return servers
+# How often the registry is checked against the database for server changes made
+# by other worker processes (seconds)
+REGISTRY_CHECK_INTERVAL = float(os.environ.get("REGISTRY_CHECK_INTERVAL", "0.25"))
 
-def create_mcpserver(db: Session, mcpserver: schemas.MCPServerCreate):
-    db_mcpserver = models.MCPServer(**mcpserver.dict())
-    db.add(db_mcpserver)
-    db.commit()
-    db.refresh(db_mcpserver)
-    return db_mcpserver
+# Largest batch accepted by the bulk operations
+MAX_BULK_ITEMS = 1000
 
-def update_mcpserver(db: Session, mcpserver_id: int, mcpserver: schemas.MCPServerUpdate):
-    db_mcpserver = get_mcpserver(db, mcpserver_id=mcpserver_id)
-    for key, value in mcpserver.dict(exclude_unset=True).items():
-        setattr(db_mcpserver, key, value)
-    db.add(db_mcpserver)
-    db.commit()
-    db.refresh(db_mcpserver)
-    return db_mcpserver
+# Per-collection versions, bumped in the transaction of every write so that
+# readers in any worker process can cheaply tell whether anything changed (used
+# for ETags on listings). A version starts at the time of the collection's first
+# write in milliseconds, so a recreated database does not reuse old versions.
+#
+# The versions of the other collections are kept in process: this process's own
+# writes set them when they commit, and they are read from the database at most
+# every REGISTRY_CHECK_INTERVAL seconds. A conditional GET is thus answered
+# without a query, at the cost of seeing a write by another worker process up to
+# that interval late, as the registry does. Versions only grow, so of two the
+# larger is the newer.
+_versions: Dict[str, Tuple[int, float]] = {}
+
+async def get_version(db: AsyncSession, collection: str) -> int:
+    if collection == "servers":
+        # Servers are served from the registry, so their version is the one it matches
+        return (await server_registry(db)).db_version
+    cached = _versions.get(collection)
+    if cached is not None and time.monotonic() - cached[1] < REGISTRY_CHECK_INTERVAL:
+        return cached[0]
+    return _set_version(collection, await _stored_version(db, collection))
+
+def _set_version(collection: str, version: int) -> int:
+    cached = _versions.get(collection)
+    if cached is not None:
+        # A read that started before a local commit must not take its version back
+        version = max(version, cached[0])
+    _versions[collection] = (version, time.monotonic())
+    return version
+
+async def _stored_version(db: AsyncSession, collection: str) -> int:
+    version = models.CollectionVersion
+    return await db.scalar(select(version.version).where(version.collection == collection)) or 0
+
+async def bump_version(session: AsyncSession, collection: str) -> int:
+    """Bump a collection's version; called by write operations, inside their transaction"""
+    version = models.CollectionVersion
+    statement = sqlite_insert(version).values(collection=collection, version=int(time.time() * 1000))
+    bumped = await session.scalar(
+        statement.on_conflict_do_update(index_elements=[version.collection], set_={"version": version.version + 1})
+        .returning(version.version)
+    )
+    session.sync_session.info.setdefault("bumped_versions", {})[collection] = bumped
+    return bumped
+
+@event.listens_for(Session, "after_commit")
+def _commit_versions(session: Session) -> None:
+    for collection, version in session.info.pop("bumped_versions", {}).items():
+        if collection != "servers":
+            _set_version(collection, version)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_versions(session: Session) -> None:
+    session.info.pop("bumped_versions", None)
+
+# Keyset pagination: a cursor is the opaque, encoded sort key of the last row of
+# the previous page, so a page costs an index seek however deep it is.
+def encode_cursor(*values) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> list:
+    """Decode a cursor; raises ValueError if it is malformed"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
+
+def mcpserver_cursor(db_mcpserver) -> str:
+    return encode_cursor(db_mcpserver.id)
+
+def parse_mcpserver_cursor(cursor: str) -> int:
+    values = decode_cursor(cursor)
+    if len(values) != 1 or not isinstance(values[0], int):
+        raise ValueError("Invalid cursor")
+    return values[0]
+
+def task_cursor(db_task) -> str:
+    return encode_cursor(db_task.created_at.isoformat(), db_task.id)
 
-def delete_mcpserver(db: Session, mcpserver_id: int):
-    db_mcpserver = get_mcpserver(db, mcpserver_id=mcpserver_id)
-    db.delete(db_mcpserver)
-    db.commit()
+def parse_task_cursor(cursor: str) -> Tuple[datetime, int]:
+    values = decode_cursor(cursor)
+    if len(values) != 2 or not isinstance(values[1], int):
+        raise ValueError("Invalid cursor")
+    try:
+        return datetime.fromisoformat(values[0]), values[1]
+    except (TypeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+# Serializes loading, so that a load that started before a write cannot overwrite
+# the registry after the write has been put into it
+_registry_load_lock = asyncio.Lock()
+
+async def server_registry(db: AsyncSession) -> ServerRegistry:
+    """The server registry, loaded from the database on first use.
+
+    At most every REGISTRY_CHECK_INTERVAL seconds the servers version in the
+    database is compared with the one the registry matches, and the registry
+    is reloaded if another process changed servers.
+    """
+    if registry.loaded and time.monotonic() - registry.checked_at < REGISTRY_CHECK_INTERVAL:
+        return registry
+    async with _registry_load_lock:
+        if not registry.loaded or time.monotonic() - registry.checked_at >= REGISTRY_CHECK_INTERVAL:
+            # Read before the rows, so a change committed in between makes the next check reload again
+            version = await _stored_version(db, "servers")
+            if not registry.loaded or version != registry.db_version:
+                logger.debug("Loading MCP servers into the registry")
+                await registry.load(db)
+                registry.db_version = version
+            registry.checked_at = time.monotonic()
+    return registry
+
+def _written_servers(version: int) -> None:
+    """Record a committed server write that is being put into the registry"""
+    # Unless another process wrote in between, the registry still matches the database
+    if version == registry.db_version + 1:
+        registry.db_version = version
+    else:
+        # Reload on next use, so the registry is never served under a version it does not match
+        registry.checked_at = 0.0
+
+async def get_mcpserver(db: AsyncSession, mcpserver_id: int):
+    return (await server_registry(db)).get(mcpserver_id)
+
+async def get_mcpserver_by_name(db: AsyncSession, name: str):
+    return (await server_registry(db)).get_by_name(name)
+
+async def get_mcpservers(
+    db: AsyncSession,
+    limit: Optional[int] = None,
+    after_id: Optional[int] = None,
+    status: Optional[bool] = None,
+    server_type: Optional[str] = None
+):
+    """Servers ordered by id, starting after `after_id`"""
+    return (await server_registry(db)).list(limit=limit, after_id=after_id, status=status, server_type=server_type)
+
+async def create_mcpserver(db: AsyncSession, mcpserver: schemas.MCPServerCreate):
+    await server_registry(db)
+    async def write(session: AsyncSession):
+        db_mcpserver = models.MCPServer(**mcpserver.dict())
+        session.add(db_mcpserver)
+        return db_mcpserver, await bump_version(session, "servers")
+    db_mcpserver, version = await writer.run(write)
+    _written_servers(version)
+    return registry.put(db_mcpserver)
+
+async def update_mcpserver(db: AsyncSession, mcpserver_id: int, mcpserver: schemas.MCPServerUpdate):
+    return await update_mcpserver_state(db, mcpserver_id, **mcpserver.dict(exclude_unset=True))
+
+async def update_mcpserver_state(db: AsyncSession, mcpserver_id: int, **fields):
+    """Update runtime state of a server (status, metrics, error counters) with a single UPDATE"""
+    await server_registry(db)
+    if not fields:
+        return registry.get(mcpserver_id)
+    async def write(session: AsyncSession):
+        db_mcpserver = await session.scalar(
+            update(models.MCPServer).where(models.MCPServer.id == mcpserver_id).values(**fields).returning(models.MCPServer)
+        )
+        if not db_mcpserver:
+            return None, None
+        return db_mcpserver, await bump_version(session, "servers")
+    db_mcpserver, version = await writer.run(write)
+    if not db_mcpserver:
+        return None
+    _written_servers(version)
+    return registry.put(db_mcpserver)
+
+async def delete_mcpserver(db: AsyncSession, mcpserver_id: int):
+    await server_registry(db)
+    async def write(session: AsyncSession):
+        db_mcpserver = await session.get(models.MCPServer, mcpserver_id)
+        if not db_mcpserver:
+            return None, None
+        await session.delete(db_mcpserver)
+        return db_mcpserver, await bump_version(session, "servers")
+    db_mcpserver, version = await writer.run(write)
+    if db_mcpserver:
+        _written_servers(version)
+    registry.remove(mcpserver_id)
     return db_mcpserver
 
-def get_user(db: Session, user_id: int):
-    return db.query(models.User).filter(models.User.id == user_id).first()
+async def get_user(db: AsyncSession, user_id: int):
+    return await db.scalar(select(models.User).where(models.User.id == user_id))
+
+async def get_user_by_username(db: AsyncSession, username: str):
+    return await db.scalar(select(models.User).where(models.User.username == username))
 
-def create_user(db: Session, user: schemas.UserCreate):
-    fake_hashed_password = user.password + "notreallyhashed"
-    db_user = models.User(username=user.username, hashed_password=fake_hashed_password)
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    return db_user
+async def create_user(db: AsyncSession, user: schemas.UserCreate):
+    hashed_password = await utils.get_password_hash_async(user.password)
+    async def write(session: AsyncSession):
+        db_user = models.User(username=user.username, hashed_password=hashed_password)
+        session.add(db_user)
+        return db_user
+    return await writer.run(write)
+
+# Revoked tokens
+async def is_token_revoked(db: AsyncSession, token_id: str) -> bool:
+    revoked = models.RevokedToken
+    return await db.scalar(select(revoked.token_id).where(revoked.token_id == token_id)) is not None
+
+async def count_revoked_tokens(db: AsyncSession) -> int:
+    revoked = models.RevokedToken
+    return await db.scalar(select(func.count()).select_from(revoked).where(revoked.expires_at > int(time.time())))
+
+async def revoke_token(db: AsyncSession, token_id: str, expires_at: int) -> None:
+    """Record a revoked token, dropping the records of tokens that have expired since"""
+    async def write(session: AsyncSession):
+        revoked = models.RevokedToken
+        await session.execute(delete(revoked).where(revoked.expires_at <= int(time.time())))
+        await session.execute(
+            sqlite_insert(revoked).values(token_id=token_id, expires_at=expires_at).on_conflict_do_nothing()
+        )
+    await writer.run(write)
 
 # Task CRUD operations
-def get_task(db: Session, task_id: int):
-    return db.query(models.Task).filter(models.Task.id == task_id).first()
-
-def get_tasks(db: Session, skip: int = 0, limit: int = 100, server_id: Optional[int] = None):
-    query = db.query(models.Task)
-    if server_id:
-        query = query.filter(models.Task.server_id == server_id)
-    return query.offset(skip).limit(limit).all()
-
-def create_task(db: Session, task: schemas.TaskCreate):
-    db_task = models.Task(**task.dict())
-    db.add(db_task)
-    db.commit()
-    db.refresh(db_task)
-    return db_task
-
-def update_task(db: Session, task_id: int, task: schemas.TaskUpdate):
-    db_task = get_task(db, task_id=task_id)
-    if not db_task:
-        return None
-    
-    update_data = task.dict(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(db_task, key, value)
-    
-    db.add(db_task)
-    db.commit()
-    db.refresh(db_task)
-    return db_task
-
-def delete_task(db: Session, task_id: int):
-    db_task = get_task(db, task_id=task_id)
-    if not db_task:
-        return None
-    
-    db.delete(db_task)
-    db.commit()
-    return db_task
-
-def run_task(db: Session, task_id: int, result: str = None):
-    db_task = get_task(db, task_id=task_id)
-    if not db_task:
-        return None
-    
-    db_task.status = "running"
-    db_task.last_run = datetime.utcnow()
-    
-    db.add(db_task)
-    db.commit()
-    db.refresh(db_task)
-    return db_task
-
-def update_task_status(db: Session, task_id: int, status: str, result: str = None):
-    db_task = get_task(db, task_id=task_id)
-    if not db_task:
-        return None
-    
-    db_task.status = status
+async def get_task(db: AsyncSession, task_id: int):
+    return await db.scalar(select(models.Task).where(models.Task.id == task_id))
+
+async def get_tasks(
+    db: AsyncSession,
+    limit: int = 100,
+    after: Optional[Tuple[datetime, int]] = None,
+    server_id: Optional[int] = None,
+    status: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None
+):
+    """Tasks ordered by (created_at, id), starting after the `after` key.
+
+    Returns plain rows rather than ORM objects, listings only read them.
+    """
+    query = select(models.Task.__table__)
+    if server_id is not None:
+        query = query.where(models.Task.server_id == server_id)
+    if status is not None:
+        query = query.where(models.Task.status == status)
+    if created_after is not None:
+        query = query.where(models.Task.created_at >= created_after)
+    if created_before is not None:
+        query = query.where(models.Task.created_at < created_before)
+    if after is not None:
+        query = query.where(tuple_(models.Task.created_at, models.Task.id) > tuple_(*after))
+    query = query.order_by(models.Task.created_at, models.Task.id).limit(limit)
+    return (await db.execute(query)).all()
+
+async def create_task(db: AsyncSession, task: schemas.TaskCreate):
+    async def write(session: AsyncSession):
+        db_task = models.Task(**task.dict())
+        session.add(db_task)
+        await bump_version(session, "tasks")
+        return db_task
+    return await writer.run(write)
+
+async def _update_task_fields(db: AsyncSession, task_id: int, **fields):
+    """Update a task with a single UPDATE ... RETURNING"""
+    if not fields:
+        return await get_task(db, task_id)
+    async def write(session: AsyncSession):
+        db_task = await session.scalar(
+            update(models.Task).where(models.Task.id == task_id).values(**fields).returning(models.Task)
+        )
+        if db_task:
+            await bump_version(session, "tasks")
+        return db_task
+    return await writer.run(write)
+
+async def update_task(db: AsyncSession, task_id: int, task: schemas.TaskUpdate):
+    return await _update_task_fields(db, task_id, **task.dict(exclude_unset=True))
+
+async def delete_task(db: AsyncSession, task_id: int):
+    async def write(session: AsyncSession):
+        db_task = await session.get(models.Task, task_id)
+        if db_task:
+            await session.delete(db_task)
+            await bump_version(session, "tasks")
+        return db_task
+    return await writer.run(write)
+
+async def run_task(db: AsyncSession, task_id: int, result: str = None):
+    return await _update_task_fields(db, task_id, status="running", last_run=datetime.utcnow())
+
+async def update_task_status(db: AsyncSession, task_id: int, status: str, result: str = None, timings: dict = None):
+    fields = {"status": status}
     if result:
-        db_task.result = result
-    
-    db.add(db_task)
-    db.commit()
-    db.refresh(db_task)
-    return db_task
+        fields["result"] = result
+    if timings:
+        fields["timings"] = timings
+    return await _update_task_fields(db, task_id, **fields)
+
+# Bulk operations: a batch is validated up front, valid items are written in one
+# transaction with executemany-style statements, and every item gets a result.
+def _failed(index: int, message: str) -> Dict[str, Any]:
+    return {"index": index, "success": False, "message": message}
+
+async def _existing_ids(db: AsyncSession, column, ids: List[int]) -> set:
+    if not ids:
+        return set()
+    return set((await db.scalars(select(column).where(column.in_(set(ids))))).all())
+
+async def _bulk_write(results: List[Optional[Dict[str, Any]]], indexes: List[int], write, ids: List[int] = None):
+    """Apply a bulk write and fill in the results of `indexes`.
+
+    Inserts return the new rows and their ids are reported; updates and deletes
+    pass the ids of the affected rows. A constraint violation fails the whole
+    batch. Returns what `write` returned, or None if the batch was rejected.
+    """
+    try:
+        written = await writer.run(write)
+    except IntegrityError as e:
+        for index in indexes:
+            results[index] = _failed(index, f"Batch rejected by the database: {e.orig}")
+        return None
+    if ids is None:
+        ids = [row.id for row in written]
+    for index, row_id in zip(indexes, ids):
+        results[index] = {"index": index, "success": True, "id": row_id}
+    return written if written is not None else ids
+
+async def bulk_create_mcpservers(db: AsyncSession, servers: List[schemas.MCPServerCreate]) -> List[Dict[str, Any]]:
+    results: List[Optional[Dict[str, Any]]] = [None] * len(servers)
+    known = await server_registry(db)
+    taken = set()
+    rows, indexes = [], []
+    for index, server in enumerate(servers):
+        if server.name in taken or known.get_by_name(server.name) is not None:
+            results[index] = _failed(index, f"A server named {server.name!r} already exists")
+            continue
+        taken.add(server.name)
+        rows.append(server.dict())
+        indexes.append(index)
+    if rows:
+        versions = []
+        async def write(session: AsyncSession):
+            # Rows of one multi-row INSERT get ascending ids in statement order
+            created = (await session.scalars(insert(models.MCPServer).returning(models.MCPServer), rows)).all()
+            versions.append(await bump_version(session, "servers"))
+            return sorted(created, key=lambda row: row.id)
+        created = await _bulk_write(results, indexes, write)
+        if created:
+            _written_servers(versions[-1])
+            for row in created:
+                registry.put(row)
+    return results
+
+async def bulk_update_mcpservers(db: AsyncSession, updates: List[schemas.MCPServerBulkUpdate]) -> List[Dict[str, Any]]:
+    results: List[Optional[Dict[str, Any]]] = [None] * len(updates)
+    known = await server_registry(db)
+    renamed = {}  # name -> id of the server taking it in this batch
+    rows, indexes, seen = [], [], set()
+    for index, item in enumerate(updates):
+        owner = known.get_by_name(item.name)
+        if known.get(item.id) is None:
+            results[index] = _failed(index, "Server not found")
+        elif item.id in seen:
+            results[index] = _failed(index, "Server is updated more than once in this batch")
+        elif renamed.get(item.name, owner.id if owner else item.id) != item.id:
+            results[index] = _failed(index, f"A server named {item.name!r} already exists")
+        else:
+            seen.add(item.id)
+            renamed[item.name] = item.id
+            rows.append(item.dict(exclude_unset=True))
+            indexes.append(index)
+    if rows:
+        versions = []
+        async def write(session: AsyncSession):
+            # Primary key in every row: an executemany UPDATE ... WHERE id = ?
+            await session.execute(update(models.MCPServer), rows)
+            versions.append(await bump_version(session, "servers"))
+        if await _bulk_write(results, indexes, write, [row["id"] for row in rows]):
+            _written_servers(versions[-1])
+            for row in rows:
+                registry.update(row["id"], **row)
+    return results
+
+async def bulk_delete_mcpservers(db: AsyncSession, ids: List[int]) -> List[Dict[str, Any]]:
+    results: List[Optional[Dict[str, Any]]] = [None] * len(ids)
+    known = await server_registry(db)
+    status_by_id = {server_id: known.get(server_id).status for server_id in set(ids) if known.get(server_id)}
+    delete_ids, indexes = [], []
+    for index, server_id in enumerate(ids):
+        if server_id not in status_by_id:
+            results[index] = _failed(index, "Server not found")
+        elif status_by_id[server_id]:
+            results[index] = _failed(index, "Cannot delete a connected server. Please disconnect first.")
+        else:
+            # A repeated id is reported as not found, as it would be by a second DELETE
+            status_by_id.pop(server_id)
+            delete_ids.append(server_id)
+            indexes.append(index)
+    if delete_ids:
+        versions = []
+        async def write(session: AsyncSession):
+            await session.execute(delete(models.MCPServer).where(models.MCPServer.id.in_(delete_ids)))
+            versions.append(await bump_version(session, "servers"))
+        if await _bulk_write(results, indexes, write, delete_ids):
+            _written_servers(versions[-1])
+            for server_id in delete_ids:
+                registry.remove(server_id)
+    return results
+
+async def bulk_create_tasks(db: AsyncSession, tasks: List[schemas.TaskCreate]) -> List[Dict[str, Any]]:
+    results: List[Optional[Dict[str, Any]]] = [None] * len(tasks)
+    known = await server_registry(db)
+    rows, indexes = [], []
+    for index, task in enumerate(tasks):
+        if known.get(task.server_id) is None:
+            results[index] = _failed(index, "Server not found")
+            continue
+        rows.append(task.dict())
+        indexes.append(index)
+    if rows:
+        async def write(session: AsyncSession):
+            # Rows of one multi-row INSERT get ascending ids in statement order
+            created = (await session.scalars(insert(models.Task).returning(models.Task), rows)).all()
+            await bump_version(session, "tasks")
+            return sorted(created, key=lambda row: row.id)
+        await _bulk_write(results, indexes, write)
+    return results
+
+async def bulk_update_tasks(db: AsyncSession, updates: List[schemas.TaskBulkUpdate]) -> List[Dict[str, Any]]:
+    results: List[Optional[Dict[str, Any]]] = [None] * len(updates)
+    tasks = await _existing_ids(db, models.Task.id, [item.id for item in updates])
+    known = await server_registry(db)
+    rows, indexes, seen = [], [], set()
+    for index, item in enumerate(updates):
+        if item.id not in tasks:
+            results[index] = _failed(index, "Task not found")
+        elif item.id in seen:
+            results[index] = _failed(index, "Task is updated more than once in this batch")
+        elif item.server_id is not None and known.get(item.server_id) is None:
+            results[index] = _failed(index, "Server not found")
+        else:
+            seen.add(item.id)
+            rows.append(item.dict(exclude_unset=True))
+            indexes.append(index)
+    if rows:
+        async def write(session: AsyncSession):
+            # Primary key in every row: an executemany UPDATE ... WHERE id = ?
+            await session.execute(update(models.Task), rows)
+            await bump_version(session, "tasks")
+        await _bulk_write(results, indexes, write, [row["id"] for row in rows])
+    return results
+
+async def bulk_delete_tasks(db: AsyncSession, ids: List[int]) -> List[Dict[str, Any]]:
+    results: List[Optional[Dict[str, Any]]] = [None] * len(ids)
+    tasks = await _existing_ids(db, models.Task.id, ids)
+    delete_ids, indexes = [], []
+    for index, task_id in enumerate(ids):
+        if task_id not in tasks:
+            results[index] = _failed(index, "Task not found")
+        else:
+            tasks.discard(task_id)
+            delete_ids.append(task_id)
+            indexes.append(index)
+    if delete_ids:
+        async def write(session: AsyncSession):
+            await session.execute(delete(models.Task).where(models.Task.id.in_(delete_ids)))
+            await bump_version(session, "tasks")
+        await _bulk_write(results, indexes, write, delete_ids)
+    return results
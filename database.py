@@ -1,14 +1,285 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import asyncio
+import contextvars
+import os
+import time
+import zlib
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from backend import tracing
 
 DATABASE_URL = "sqlite:///./mcp.db"
+ASYNC_DATABASE_URL = "sqlite+aiosqlite:///./mcp.db"
+
+# Applied to every new connection. WAL lets readers run alongside the writer, and
+# with synchronous=NORMAL a commit only appends to the WAL file instead of syncing
+# the database file.
+SQLITE_PRAGMAS = {
+    # Only takes effect on a new database (or after VACUUM); lets task compaction
+    # return freed pages incrementally
+    "auto_vacuum": "INCREMENTAL",
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "temp_store": "MEMORY",
+    "cache_size": -16000,  # 16 MB page cache per connection
+    "mmap_size": 134217728,
+}
+
+READ_POOL_SIZE = int(os.environ.get("DB_READ_POOL_SIZE", "8"))
+WRITE_BATCH_SIZE = int(os.environ.get("DB_WRITE_BATCH_SIZE", "64"))
+
+def apply_pragmas(engine, pragmas: Dict[str, Any] = SQLITE_PRAGMAS, query_only: bool = False) -> None:
+    """Set SQLite pragmas on every connection the engine opens"""
+    sync_engine = engine.sync_engine if isinstance(engine, AsyncEngine) else engine
+
+    @event.listens_for(sync_engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        if query_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+def create_read_engine(url: str, pool_size: int = READ_POOL_SIZE) -> AsyncEngine:
+    """Pooled read-only connections in autocommit mode.
+
+    Without an open transaction each statement reads the latest committed data
+    instead of the snapshot taken by the session's first query.
+    """
+    read_engine = create_async_engine(
+        url, poolclass=AsyncAdaptedQueuePool, pool_size=pool_size, max_overflow=0,
+        isolation_level="AUTOCOMMIT"
+    )
+    apply_pragmas(read_engine, query_only=True)
+    return read_engine
+
+def create_write_engine(url: str) -> AsyncEngine:
+    """The single connection all writes go through; SQLite allows one writer at a time anyway"""
+    write_engine = create_async_engine(url, poolclass=AsyncAdaptedQueuePool, pool_size=1, max_overflow=0)
+    apply_pragmas(write_engine)
+    return write_engine
 
+# The sync engine is used for schema creation and migrations; request handling,
+# the task queue and MCPManager read through the async read pool and write
+# through the batch writer below.
 engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+apply_pragmas(engine)
+async_engine = create_read_engine(ASYNC_DATABASE_URL)
+async_write_engine = create_write_engine(ASYNC_DATABASE_URL)
+
+class TracedAsyncSession(AsyncSession):
+    """Async session whose queries and commits are recorded as tracing spans.
+
+    Spans are opened here rather than in engine events because those run inside
+    SQLAlchemy's greenlets, which do not see the caller's tracing context.
+    """
+    async def execute(self, *args, **kwargs):
+        with tracing.span("db.query"):
+            return await super().execute(*args, **kwargs)
+
+    async def scalar(self, *args, **kwargs):
+        with tracing.span("db.query"):
+            return await super().scalar(*args, **kwargs)
+
+    async def get(self, *args, **kwargs):
+        with tracing.span("db.query"):
+            return await super().get(*args, **kwargs)
+
+    async def refresh(self, *args, **kwargs):
+        with tracing.span("db.query"):
+            return await super().refresh(*args, **kwargs)
+
+    async def commit(self):
+        with tracing.span("db.commit"):
+            await super().commit()
+
+@event.listens_for(TracedAsyncSession.sync_session_class, "do_orm_execute")
+def _refresh_loaded_objects(orm_execute_state):
+    # Writes happen in the writer's session, so rows already loaded by a
+    # long-lived read session are overwritten by every query that returns them
+    if orm_execute_state.is_select:
+        orm_execute_state.update_execution_options(populate_existing=True)
+
+WriteOperation = Callable[[AsyncSession], Awaitable[Any]]
+
+class BatchWriter:
+    """Serializes writes through one session and commits them in groups.
+
+    Operations are coroutines taking the writer's session; they add or modify
+    objects and must not commit. Operations submitted while a commit is in
+    progress are applied together and committed once (group commit). If a
+    batch fails, its operations are retried one transaction each so that a
+    failing operation does not take the others down with it.
+    """
+
+    def __init__(self, session_factory: Callable[[], AsyncSession], max_batch: int = WRITE_BATCH_SIZE):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop = None
+        self.stats = {"writes": 0, "batches": 0, "failed": 0, "retried_batches": 0, "largest_batch": 0}
+
+    async def run(self, operation: WriteOperation) -> Any:
+        """Apply a write operation and return its result once it is committed"""
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._queue = asyncio.Queue()
+            self._loop = loop
+            # Empty context so batch spans are not attached to the caller that started the writer
+            self._task = contextvars.Context().run(loop.create_task, self._process())
+        future = loop.create_future()
+        self._queue.put_nowait((operation, future))
+        with tracing.span("db.write"):
+            return await future
+
+    async def _process(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            with tracing.span("db.write_batch", size=len(batch)):
+                try:
+                    results = await self._apply(batch)
+                except Exception:
+                    self.stats["retried_batches"] += 1
+                    for operation, future in batch:
+                        try:
+                            result = (await self._apply([(operation, future)]))[0]
+                        except Exception as e:
+                            self.stats["failed"] += 1
+                            if not future.done():
+                                future.set_exception(e)
+                        else:
+                            if not future.done():
+                                future.set_result(result)
+                    continue
+            self.stats["batches"] += 1
+            self.stats["writes"] += len(batch)
+            self.stats["largest_batch"] = max(self.stats["largest_batch"], len(batch))
+            for (operation, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    async def _apply(self, batch: List[Tuple[WriteOperation, asyncio.Future]]) -> List[Any]:
+        async with self.session_factory() as session:
+            results = []
+            for operation, future in batch:
+                results.append(await operation(session))
+                # Flush per operation so generated ids and defaults are set on returned objects
+                await session.flush()
+            await session.commit()
+            return results
+
+    async def close(self) -> None:
+        """Wait for queued writes to be committed and stop the writer"""
+        if self._task is None or self._task.done() or self._loop is not asyncio.get_running_loop():
+            return
+        async def flush(session):
+            pass
+        # Operations are applied in order, so everything queued before this is committed
+        await self.run(flush)
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats["queued"] = self._queue.qsize() if self._queue is not None else 0
+        stats["mean_batch"] = round(stats["writes"] / stats["batches"], 2) if stats["batches"] else 0.0
+        return stats
+
+# Objects stay usable after commit; reloading expired attributes would need an await
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=TracedAsyncSession, autoflush=False, expire_on_commit=False)
+WriteSessionLocal = async_sessionmaker(async_write_engine, class_=TracedAsyncSession, autoflush=False, expire_on_commit=False)
+writer = BatchWriter(WriteSessionLocal)
 Base = declarative_base()
 
-def create_db():
+async def close_db():
+    """Commit queued writes and close pooled connections (their threads keep the process alive)"""
+    await writer.close()
+    await async_engine.dispose()
+    await async_write_engine.dispose()
+
+@event.listens_for(engine, "before_cursor_execute")
+def _start_query_span(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_spans", []).append(tracing.start_span("db.query"))
+
+@event.listens_for(engine, "after_cursor_execute")
+def _end_query_span(conn, cursor, statement, parameters, context, executemany):
+    spans = conn.info.get("query_spans")
+    if spans:
+        tracing.end_span(spans.pop())
+
+@event.listens_for(engine, "handle_error")
+def _fail_query_span(exception_context):
+    # after_cursor_execute is skipped when the statement fails
+    conn = exception_context.connection
+    spans = conn.info.get("query_spans") if conn is not None else None
+    if spans:
+        span = spans.pop()
+        span.attrs["error"] = type(exception_context.original_exception).__name__
+        tracing.end_span(span)
+
+# Columns added after the first release; create_all() does not alter existing tables
+COLUMN_MIGRATIONS = [
+    ("tasks", "timings", "JSON"),
+]
+
+def migrate_db():
+    """Add columns and indexes missing from tables created by older versions"""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table, column, ddl_type in COLUMN_MIGRATIONS:
+            if not inspector.has_table(table):
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table)}
+            if column not in existing:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"))
+        # create_all() skips the indexes of tables that already exist
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+def schema_fingerprint() -> int:
+    """Checksum of the declared tables, columns and indexes"""
+    parts = []
+    for table in Base.metadata.sorted_tables:
+        columns = ",".join(column.name for column in table.columns)
+        indexes = ",".join(sorted(index.name for index in table.indexes))
+        parts.append(f"{table.name}({columns})[{indexes}]")
+    # PRAGMA user_version holds a signed 32-bit integer and is 0 in a new database
+    return zlib.crc32("|".join(parts).encode()) & 0x7FFFFFFF or 1
+
+def create_db() -> bool:
+    """Create and migrate the schema, unless the database records that it is
+    already at the current one. Returns whether anything had to be done.
+    """
     # Import models here to avoid circular imports
     from backend import models
-    Base.metadata.create_all(bind=engine)
+    fingerprint = schema_fingerprint()
+    with engine.connect() as conn:
+        if conn.exec_driver_sql("PRAGMA user_version").scalar() == fingerprint:
+            return False
+    for attempt in range(3):
+        try:
+            Base.metadata.create_all(bind=engine)
+            migrate_db()
+            break
+        except OperationalError:
+            # Another worker is creating the same tables; what it created is skipped on retry
+            if attempt == 2:
+                raise
+            time.sleep(0.2)
+    with engine.begin() as conn:
+        conn.exec_driver_sql(f"PRAGMA user_version = {fingerprint}")
+    return True
@@ -0,0 +1,110 @@
+# Streaming NDJSON exports
+#
+# Exports are produced a chunk of CHUNK_SIZE rows at a time, so one of any size
+# holds a single chunk in memory:
+#   tasks      keyset pages over (created_at, id), as GET /tasks pages, each read
+#              in its own session so no read transaction spans the whole export
+#   logs       pages of a server's command log, from the worker owning the server
+#   metrics    the host sampler's history
+# With gzip, each chunk is compressed as it is produced.
+import time
+import zlib
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterable, Optional
+
+from backend import crud, database, monitoring, utils
+from backend.mcp_manager import mcp_manager
+
+CHUNK_SIZE = 500
+
+# Timestamp format of command log entries (local time)
+LOG_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def ndjson(rows: Iterable[Dict[str, Any]]) -> bytes:
+    return b"".join(utils.dumps_json(row) + b"\n" for row in rows)
+
+
+async def gzip_chunks(chunks: AsyncIterator[bytes], level: int = 6) -> AsyncIterator[bytes]:
+    """Compress a stream into a single gzip member"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+async def task_chunks(
+    server_id: Optional[int] = None,
+    status: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    chunk_size: int = CHUNK_SIZE
+) -> AsyncIterator[bytes]:
+    """Tasks ordered by (created_at, id) as NDJSON"""
+    after = None
+    while True:
+        async with database.AsyncSessionLocal() as db:
+            rows = await crud.get_tasks(
+                db, limit=chunk_size, after=after, server_id=server_id, status=status,
+                created_after=created_after, created_before=created_before
+            )
+        if not rows:
+            return
+        yield ndjson(row._asdict() for row in rows)
+        if len(rows) < chunk_size:
+            return
+        after = (rows[-1].created_at, rows[-1].id)
+
+
+def _log_time(value: Optional[datetime]) -> Optional[str]:
+    """A datetime as a log entry timestamp, which compares correctly as a string"""
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone()
+    return value.strftime(LOG_TIME_FORMAT)
+
+
+async def log_chunks(
+    server_id: int,
+    success: Optional[bool] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    chunk_size: int = CHUNK_SIZE
+) -> AsyncIterator[bytes]:
+    """A server's command log, oldest first, as NDJSON"""
+    first, last = _log_time(since), _log_time(until)
+    offset = 0
+    while True:
+        async with database.AsyncSessionLocal() as db:
+            page = await mcp_manager.get_server_log_page(db, server_id, offset, chunk_size)
+        entries = page.get("logs") or []
+        if not entries:
+            return
+        offset += len(entries)
+        selected = [
+            entry for entry in entries
+            if (success is None or entry["success"] == success)
+            and (first is None or entry["timestamp"] >= first)
+            and (last is None or entry["timestamp"] < last)
+        ]
+        if selected:
+            yield ndjson(selected)
+        if len(entries) < chunk_size:
+            return
+
+
+async def metrics_chunks(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    chunk_size: int = CHUNK_SIZE
+) -> AsyncIterator[bytes]:
+    """Host metric samples, oldest first, as NDJSON"""
+    first = since.timestamp() if since is not None else 0
+    last = until.timestamp() if until is not None else time.time() + 1
+    # The history is bounded by METRICS_HISTORY, so a snapshot of it is small
+    samples = [sample for sample in list(monitoring.sampler.samples) if first <= sample["timestamp"] < last]
+    for start in range(0, len(samples), chunk_size):
+        yield ndjson(samples[start:start + chunk_size])
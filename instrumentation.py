@@ -0,0 +1,206 @@
+# Prometheus-style metrics registry (counters, gauges, fixed-bucket histograms)
+#
+# Recording is cheap enough to leave on under load: every thread updates its own
+# cell without taking a lock, and cells are only summed when the registry is scraped.
+import bisect
+import math
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._cells: List[dict] = []
+        self._cells_lock = threading.Lock()
+
+    def _cell(self) -> dict:
+        """This thread's private cell, registered on first use"""
+        cell = getattr(self._local, "cell", None)
+        if cell is None:
+            cell = {}
+            with self._cells_lock:
+                self._cells.append(cell)
+            self._local.cell = cell
+        return cell
+
+    def _key(self, labels: Dict) -> Tuple:
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def _snapshot_cells(self) -> List[dict]:
+        with self._cells_lock:
+            return [dict(cell) for cell in self._cells]
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"] + self._render_samples()
+
+    def _render_samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        cell = self._cell()
+        key = self._key(labels)
+        cell[key] = cell.get(key, 0) + amount
+
+    def values(self) -> Dict[Tuple, float]:
+        totals: Dict[Tuple, float] = {}
+        for cell in self._snapshot_cells():
+            for key, value in cell.items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def _render_samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(self.values().items())
+        ]
+
+
+class Gauge(Counter):
+    """Gauge from per-thread inc/dec deltas, absolute set() values or a callback read at scrape time"""
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._set_values: Dict[Tuple, float] = {}
+        self._function: Optional[Callable[[], float]] = None
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        self._set_values[self._key(labels)] = value
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._function = function
+
+    def values(self) -> Dict[Tuple, float]:
+        if self._function is not None:
+            return {(): self._function()}
+        totals = super().values()
+        for key, value in list(self._set_values.items()):
+            totals[key] = totals.get(key, 0) + value
+        return totals
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        cell = self._cell()
+        key = self._key(labels)
+        state = cell.get(key)
+        if state is None:
+            # Per-bucket counts (last slot is +Inf), sum of observations
+            state = cell[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        state[0][bisect.bisect_left(self.buckets, value)] += 1
+        state[1] += value
+
+    def values(self) -> Dict[Tuple, Tuple[List[int], float]]:
+        totals: Dict[Tuple, Tuple[List[int], float]] = {}
+        with self._cells_lock:
+            cells = [[(key, list(state[0]), state[1]) for key, state in list(cell.items())] for cell in self._cells]
+        for cell in cells:
+            for key, counts, total in cell:
+                if key in totals:
+                    merged, merged_sum = totals[key]
+                    totals[key] = ([a + b for a, b in zip(merged, counts)], merged_sum + total)
+                else:
+                    totals[key] = (counts, total)
+        return totals
+
+    def _render_samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total) in sorted(self.values().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric_class, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = metric_class(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, help, labelnames)
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, help, labelnames)
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, help, labelnames, buckets)
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# Metrics recorded on the hot paths
+http_requests = registry.counter("http_requests_total", "HTTP requests handled", ["method", "route", "status"])
+http_request_duration = registry.histogram("http_request_duration_seconds", "HTTP request latency", ["method", "route"])
+command_duration = registry.histogram("mcp_command_duration_seconds", "MCPManager.execute_command latency", ["server_id"])
+commands = registry.counter("mcp_commands_total", "Commands executed", ["server_id", "success"])
+connects = registry.counter("mcp_connects_total", "Connection attempts to MCP servers", ["server_id", "success"])
+reconnects = registry.counter("mcp_reconnects_total", "Forced reconnects after a failed operation", ["server_id"])
+task_queue_depth = registry.gauge("task_queue_depth", "Tasks waiting in the task queue")
+task_wait_duration = registry.histogram(
+    "task_queue_wait_seconds", "Time tasks spend queued before processing",
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+)
+websocket_clients = registry.gauge("websocket_clients", "Connected WebSocket clients")
+websocket_pending_sends = registry.gauge("websocket_pending_sends", "WebSocket messages waiting to be sent")
@@ -0,0 +1,139 @@
+# Structured logging with a queue-backed background writer
+#
+# Handlers on the request path only enqueue records; a listener thread formats and
+# writes them. Configure with environment variables:
+#   LOG_LEVEL   root level (default INFO)
+#   LOG_LEVELS  per-logger levels, e.g. "backend.crud=DEBUG,backend.websocket=WARNING"
+#   LOG_FORMAT  "json" (default) or "text"
+import json
+import logging
+import logging.handlers
+import os
+import sys
+import threading
+import time
+from queue import Full, Queue
+from typing import Dict, Optional, Tuple
+
+# Attributes every LogRecord has; anything else was passed through `extra` and is emitted as a field
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_setup_lock = threading.Lock()
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that drops records instead of blocking when the writer falls behind"""
+
+    def __init__(self, queue: Queue):
+        super().__init__(queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge args now but keep exc_info for the formatter, which runs on the writer thread
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except Full:
+            self.dropped += 1
+
+
+class RateLimitFilter(logging.Filter):
+    """Let through at most `burst` records per message template every `interval` seconds.
+
+    Attach to loggers of high-frequency events; the first record after a
+    suppressed period reports how many were dropped.
+    """
+
+    def __init__(self, burst: int = 10, interval: float = 60.0):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self._windows: Dict[Tuple[str, str], list] = {}  # (logger, template) -> [window start, count, suppressed]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = (record.name, str(record.msg))
+        now = time.monotonic()
+        window = self._windows.get(key)
+        if window is None or now - window[0] >= self.interval:
+            suppressed = window[2] if window else 0
+            self._windows[key] = [now, 1, 0]
+            if suppressed:
+                record.suppressed = suppressed
+            return True
+        if window[1] < self.burst:
+            window[1] += 1
+            return True
+        window[2] += 1
+        return False
+
+
+def _parse_levels(spec: str) -> Dict[str, str]:
+    levels = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging() -> None:
+    """Route all logging through the background writer (idempotent)"""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return
+        stream = logging.StreamHandler(sys.stderr)
+        if os.environ.get("LOG_FORMAT", "json").lower() == "text":
+            stream.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(name)s - %(message)s"))
+        else:
+            stream.setFormatter(JsonFormatter())
+
+        queue_handler = DroppingQueueHandler(Queue(maxsize=10000))
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+        root.setLevel(os.environ.get("LOG_LEVEL", "INFO").upper())
+        for name, level in _parse_levels(os.environ.get("LOG_LEVELS", "")).items():
+            logging.getLogger(name).setLevel(level)
+
+        _listener = logging.handlers.QueueListener(queue_handler.queue, stream, respect_handler_level=True)
+        _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def get_logger(name: str, rate_limit: Optional[Tuple[int, float]] = None) -> logging.Logger:
+    """Get a logger, optionally limited to (burst, interval seconds) records per message template"""
+    logger = logging.getLogger(name)
+    if rate_limit and not any(isinstance(f, RateLimitFilter) for f in logger.filters):
+        logger.addFilter(RateLimitFilter(*rate_limit))
+    return logger
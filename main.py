@@ -1,17 +1,38 @@
-from fastapi import FastAPI, Depends, HTTPException, WebSocket, Form, status
+# Imported first so that the startup report covers the import of everything else
+from backend import startup
+
+from fastapi import FastAPI, Depends, HTTPException, WebSocket, Form, Query, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from fastapi.responses import ORJSONResponse, PlainTextResponse, StreamingResponse
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime
+import asyncio
+import contextvars
+import os
 import time
 import json
+import hashlib
 
 # Import backend modules with correct paths
-from backend import models, database, schemas, crud, utils, monitoring, cache, queue
+from backend import models, database, schemas, crud, utils, monitoring, cache, queue, instrumentation, tracing, retention, auth, sharding
 from backend.websocket import websocket_endpoint
-from backend.auth import get_current_user, get_db
+from backend.auth import get_current_user, get_db, oauth2_scheme, require_admin
 from backend.mcp_manager import mcp_manager
+from backend.ratelimit import rate_limiter
+from backend.logs import setup_logging, shutdown_logging, get_logger
+
+setup_logging()
+logger = get_logger(__name__)
+startup.report.record("imports", startup.report.created)
+
+# With FAST_START set the server accepts requests as soon as the schema is in
+# place, and finishes initializing in the background (see GET /health/ready)
+FAST_START = os.environ.get("FAST_START", "").lower() in ("1", "true", "yes")
 
-app = FastAPI()
+# orjson encodes responses several times faster than the stdlib encoder
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # Add CORS middleware
 app.add_middleware(
@@ -24,81 +45,403 @@ app.add_middleware(
     max_age=600,  # Cache preflight requests for 10 minutes
 )
 
-database.create_db()
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    status_code = 500
+    request_span = tracing.start_span("http.request", method=request.method)
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        # Label by route template rather than raw path to keep label cardinality bounded
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        request_span.attrs.update(route=path, status=status_code)
+        tracing.end_span(request_span)
+        instrumentation.http_request_duration.observe(time.perf_counter() - started, method=request.method, route=path)
+        instrumentation.http_requests.inc(method=request.method, route=path, status=status_code)
+
+def admit_request(server_id: int, server_type: str, user_key: str) -> None:
+    """Apply rate limits and load shedding, raising 429/503 with a Retry-After hint"""
+    rate_limiter.configure(mcp_manager.load_settings().get("rate_limits"))
+    rejection = rate_limiter.try_acquire(server_id, server_type, user_key, queue_depth=queue.tasks_queue.qsize())
+    if rejection:
+        raise HTTPException(
+            status_code=rejection["status_code"],
+            detail=rejection["message"],
+            headers={"Retry-After": str(rejection["retry_after"])}
+        )
+
+async def initialize():
+    """Load servers, create the default user and sync config, then mark the instance ready"""
+    try:
+        async with database.AsyncSessionLocal() as db:
+            # Servers are served from memory; the database is only read for them here
+            with startup.report.phase("registry"):
+                await crud.server_registry(db)
+            
+            # Create default user if not exists
+            with startup.report.phase("default_user"):
+                await auth.default_principal()
+            
+            # Sync config.json with database
+            with startup.report.phase("config_sync"):
+                await mcp_manager.sync_config_with_db(db)
+        
+        # Connect configured servers before reporting ready, if enabled (off by default)
+        if (mcp_manager.load_settings().get("warmup") or {}).get("enabled"):
+            from backend import warmup
+            with startup.report.phase("warmup"):
+                await warmup.warmer.run()
+        
+        # Sample host metrics in the background so /metrics never blocks
+        monitoring.sampler.start()
+    except Exception as e:
+        startup.report.mark_failed(e)
+        logger.error("Startup initialization failed: %s", e, exc_info=True)
+        return
+    startup.report.mark_ready()
+
+initialization: Optional[asyncio.Task] = None
 
-# Create a default user and sync config
 @app.on_event("startup")
 async def startup_event():
-    db = database.SessionLocal()
+    global initialization
+    # Only runs DDL when the database is new or its schema is out of date
+    with startup.report.phase("schema"):
+        database.create_db()
+    
+    # Join the other workers before touching any server
+    await sharding.router.start(mcp_manager)
+    
+    if FAST_START:
+        # Empty context so the initialization's spans are not attached to the caller
+        initialization = contextvars.Context().run(asyncio.create_task, initialize())
+    else:
+        await initialize()
+        if startup.report.error:
+            raise RuntimeError(f"Startup initialization failed: {startup.report.error}")
+    
+    # Archive tasks past the retention policy in the background
+    retention.compactor.start(mcp_manager.load_settings)
+    startup.report.mark_serving()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if initialization is not None and not initialization.done():
+        initialization.cancel()
+    await sharding.router.stop()
+    monitoring.sampler.stop()
+    await retention.compactor.stop()
+    await database.close_db()
+    shutdown_logging()
+
+async def make_etag(db: AsyncSession, collection: str, *params) -> str:
+    """Strong ETag for a representation of a collection at its current version"""
+    params_hash = hashlib.sha1(repr(params).encode()).hexdigest()[:12]
+    return f'"{collection}-{await crud.get_version(db, collection)}-{params_hash}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check an If-None-Match header against an ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [c.strip() for c in header.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+def set_cache_headers(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    # Clients may keep the listing but must revalidate it on every use
+    response.headers["Cache-Control"] = "private, no-cache"
+
+def not_modified(etag: str) -> Response:
+    response = Response(status_code=304)
+    set_cache_headers(response, etag)
+    return response
+
+def set_page_headers(request: Request, response: Response, next_cursor: Optional[str]) -> None:
+    """Advertise the next page of a listing through X-Next-Cursor and a Link header"""
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+        response.headers["Link"] = f'<{request.url.include_query_params(cursor=next_cursor)}>; rel="next"'
+
+def json_response(body: bytes) -> Response:
+    """Response for a body that is already serialized JSON"""
+    return Response(content=body, media_type="application/json")
+
+def render_servers_page(servers, limit: int, **filters) -> Tuple[bytes, Optional[str]]:
+    """Serialized page of the server listing and the cursor of the next page"""
+    page = servers.list(limit=limit + 1, **filters)
+    next_cursor = None
+    if len(page) > limit:
+        page = page[:limit]
+        next_cursor = crud.mcpserver_cursor(page[-1])
+    return utils.dumps_json([record.to_dict() for record in page]), next_cursor
+
+def check_bulk_size(items: list) -> None:
+    if len(items) > crud.MAX_BULK_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {crud.MAX_BULK_ITEMS} items per bulk request")
+
+def parse_cursor(parse, cursor: Optional[str]):
+    if cursor is None:
+        return None
     try:
-        # Create default user if not exists
-        user = crud.get_user(db, user_id=1)
-        if not user:
-            hashed_password = utils.get_password_hash("default_password")
-            db_user = models.User(username="default_user", hashed_password=hashed_password)
-            db.add(db_user)
-            db.commit()
-            db.refresh(db_user)
-        
-        # Sync config.json with database
-        mcp_manager.sync_config_with_db(db)
-    finally:
-        db.close()
+        return parse(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def ndjson_download(chunks, filename: str, compress: bool) -> StreamingResponse:
+    """Stream NDJSON chunks as a file download, gzip-compressed if asked"""
+    from backend import export
+    if compress:
+        return StreamingResponse(
+            export.gzip_chunks(chunks), media_type="application/gzip",
+            headers={"Content-Disposition": f'attachment; filename="{filename}.ndjson.gz"'}
+        )
+    return StreamingResponse(
+        chunks, media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}.ndjson"'}
+    )
+
+@app.get("/health/live")
+async def liveness():
+    """The process is up and handling requests"""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness():
+    """Whether startup initialization has finished (503 until then), with the startup report"""
+    report = startup.report.to_dict()
+    if not startup.report.ready:
+        return ORJSONResponse(report, status_code=503)
+    return report
+
+@app.post("/token")
+async def login(form: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
+    """Exchange a username and password for a bearer token"""
+    user = await auth.authenticate_user(db, form.username, form.password)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect username or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return auth.create_access_token(user)
+
+@app.post("/logout")
+async def logout(token: Optional[str] = Depends(oauth2_scheme)):
+    """Revoke the request's bearer token"""
+    if not token or not await auth.revoke_token(token):
+        raise HTTPException(status_code=400, detail="No valid token to revoke")
+    return {"success": True, "message": "Token revoked"}
 
 @app.get("/")
 async def root(current_user: models.User = Depends(get_current_user)):
     return {"message": f"Hello {current_user.username}"}
 
 @app.get("/metrics")
-async def get_metrics(current_user: models.User = Depends(get_current_user)):
-    cached_metrics = cache.get_cached_data("metrics")
-    if cached_metrics:
-        return cached_metrics
-    
-    cpu_usage = monitoring.get_cpu_usage()
-    ram_usage = monitoring.get_ram_usage()
-    disk_usage = monitoring.get_disk_usage()
-    network_activity = monitoring.get_network_activity()
-    metrics = {
-        "cpu_usage": cpu_usage,
-        "ram_usage": ram_usage,
-        "disk_usage": disk_usage,
-        "network_activity": network_activity
-    }
-    cache.set_cached_data("metrics", metrics)
+async def get_metrics(window: int = 0, current_user: models.User = Depends(get_current_user)):
+    """Get the latest host metrics sample, optionally with the `window` most recent samples"""
+    metrics = dict(monitoring.get_host_metrics())
+    if window > 0:
+        metrics["history"] = monitoring.sampler.window(window)
     return metrics
 
+@app.get("/metrics/export")
+async def export_metrics(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    gzip: bool = False,
+    current_user: models.User = Depends(get_current_user)
+):
+    """Stream the host metrics history as NDJSON, optionally within a since/until time range"""
+    from backend import export
+    return ndjson_download(export.metrics_chunks(since, until), "metrics", gzip)
+
+@app.get("/metrics/rate_limits")
+async def get_rate_limit_metrics(current_user: models.User = Depends(get_current_user)):
+    """Get rate limiting and load shedding counters"""
+    stats = rate_limiter.get_stats()
+    stats["queue_depth"] = queue.tasks_queue.qsize()
+    return stats
+
+@app.get("/metrics/command_cache")
+async def get_command_cache_metrics(current_user: models.User = Depends(get_current_user)):
+    """Get hit/miss statistics of the command result cache"""
+    return mcp_manager.result_cache.get_stats()
+
+@app.get("/metrics/prometheus", response_class=PlainTextResponse)
+async def get_prometheus_metrics(current_user: models.User = Depends(get_current_user)):
+    """Get request, command, queue and WebSocket metrics in the Prometheus text format"""
+    return PlainTextResponse(instrumentation.registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/traces")
+async def get_traces(limit: int = 100, name: str = None, current_user: models.User = Depends(get_current_user)):
+    """Get the most recent tracing spans, optionally only those with a given name"""
+    return tracing.tracer.recent(limit=limit, name=name)
+
+@app.get("/traces/summary")
+async def get_trace_summary(current_user: models.User = Depends(get_current_user)):
+    """Get p50/p95/p99 command latency per server and per command from recent spans"""
+    return {
+        "by_server": tracing.tracer.summary("mcp.execute_command", "server_id"),
+        "by_command": tracing.tracer.summary("mcp.execute_command", "command"),
+        "by_route": tracing.tracer.summary("http.request", "route"),
+    }
+
+@app.post("/admin/profile")
+async def run_profiler(
+    seconds: float = 5.0,
+    interval: float = 0.005,
+    format: str = "json",
+    current_user: models.User = Depends(require_admin)
+):
+    """Sample all threads and the event loop for `seconds` (at most 60) every
+    `interval` seconds (0.001 to 1).
+
+    Returns collapsed stacks (format=collapsed, for flamegraph.pl/speedscope) or a JSON
+    report with the hottest functions, event-loop lag and the slowest callbacks.
+    """
+    from backend import profiler
+    try:
+        report = await profiler.profile(duration=seconds, interval=min(max(interval, 0.001), profiler.MAX_INTERVAL))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    stacks = report.pop("stacks")
+    if format == "collapsed":
+        return PlainTextResponse(profiler.collapsed(stacks))
+    report["top_functions"] = profiler.top_functions(stacks)
+    return report
+
+@app.get("/metrics/retention")
+async def get_retention_metrics(current_user: models.User = Depends(get_current_user)):
+    """Get task compaction counters, the retention policy and the archive partitions"""
+    return retention.compactor.get_stats()
+
+@app.get("/metrics/shards")
+async def get_shard_metrics(current_user: models.User = Depends(get_current_user)):
+    """Get this worker's view of the shard ring and its forwarding counters"""
+    return sharding.router.get_stats()
+
+@app.get("/metrics/warmup")
+async def get_warmup_metrics(current_user: models.User = Depends(get_current_user)):
+    """Get the progress of the current or last connection warm-up and its policy"""
+    from backend import warmup
+    return {**warmup.warmer.progress, "policy": warmup.warmer.policy()}
+
+@app.post("/admin/servers/warmup")
+async def warm_up_servers(tags: Optional[str] = None, current_user: models.User = Depends(require_admin)):
+    """Connect configured servers now, optionally only those with one of the comma-separated tags"""
+    from backend import warmup
+    return await warmup.warmer.run(tags.split(",") if tags else None)
+
+@app.post("/admin/tasks/compact")
+async def compact_tasks(current_user: models.User = Depends(require_admin)):
+    """Archive and delete tasks past the retention policy now"""
+    return await retention.compactor.run_once()
+
+@app.get("/metrics/cache")
+async def get_cache_metrics(current_user: models.User = Depends(get_current_user)):
+    """Get hit/miss/eviction statistics of the in-process cache"""
+    return cache.get_cache_stats()
+
+@app.get("/metrics/auth")
+async def get_auth_metrics(current_user: models.User = Depends(get_current_user)):
+    """Get statistics of the token caches and revocations"""
+    return await auth.get_stats()
+
 @app.get("/servers", response_model=List[schemas.MCPServer])
 async def get_servers(
-    skip: int = 0, 
-    limit: int = 100, 
-    db: Session = Depends(get_db),
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    status: Optional[bool] = None,
+    type: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Get MCP servers ordered by id, a page at a time.
+
+    The cursor of the next page is returned in the X-Next-Cursor and Link headers.
+    Pages are serialized once and reused until a server changes.
+    """
+    etag = await make_etag(db, "servers", cursor, limit, status, type)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    after_id = parse_cursor(crud.parse_mcpserver_cursor, cursor)
+    servers = await crud.server_registry(db)
+    body, next_cursor = servers.view(
+        ("servers", after_id, limit, status, type),
+        lambda: render_servers_page(servers, limit, after_id=after_id, status=status, server_type=type)
+    )
+    response = json_response(body)
+    set_cache_headers(response, etag)
+    set_page_headers(request, response, next_cursor)
+    return response
+
+# Bulk routes are registered before /servers/{server_id} so "bulk" is not taken for an id
+@app.post("/servers/bulk", response_model=List[schemas.BulkItemResult])
+async def bulk_create_servers(
+    servers: List[schemas.MCPServerCreate],
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Create many MCP servers in one transaction, returning a result per item"""
+    check_bulk_size(servers)
+    return await crud.bulk_create_mcpservers(db, servers)
+
+@app.put("/servers/bulk", response_model=List[schemas.BulkItemResult])
+async def bulk_update_servers(
+    servers: List[schemas.MCPServerBulkUpdate],
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    """Get all MCP servers"""
-    servers = crud.get_mcpservers(db, skip=skip, limit=limit)
-    return servers
+    """Update many MCP servers in one transaction, returning a result per item"""
+    check_bulk_size(servers)
+    return await crud.bulk_update_mcpservers(db, servers)
+
+@app.post("/servers/bulk_delete", response_model=List[schemas.BulkItemResult])
+async def bulk_delete_servers(
+    request: schemas.BulkDelete,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Delete many disconnected MCP servers in one transaction, returning a result per item"""
+    check_bulk_size(request.ids)
+    results = await crud.bulk_delete_mcpservers(db, request.ids)
+    for result in results:
+        if result["success"]:
+            mcp_manager.release_server(result["id"])
+    return results
 
 @app.get("/servers/{server_id}", response_model=schemas.MCPServer)
 async def get_server(
     server_id: int, 
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """Get a specific MCP server by ID"""
-    db_server = crud.get_mcpserver(db, mcpserver_id=server_id)
+    etag = await make_etag(db, "servers", server_id)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    db_server = await crud.get_mcpserver(db, mcpserver_id=server_id)
     if db_server is None:
         raise HTTPException(status_code=404, detail="Server not found")
+    set_cache_headers(response, etag)
     return db_server
 
 @app.post("/create_server_test/", response_model=schemas.MCPServer)
 async def create_server(
     server: schemas.MCPServerCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """Create a new MCP server"""
-    db_server = crud.create_mcpserver(db=db, mcpserver=server)
+    db_server = await crud.create_mcpserver(db=db, mcpserver=server)
     mcp_manager.load_config()
     return db_server
 
@@ -106,26 +449,26 @@ async def create_server(
 async def update_server(
     server_id: int,
     mcpserver: schemas.MCPServerUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """Update an existing MCP server"""
-    db_server = crud.get_mcpserver(db, mcpserver_id=server_id)
+    db_server = await crud.get_mcpserver(db, mcpserver_id=server_id)
     if db_server is None:
         raise HTTPException(status_code=404, detail="Server not found")
     
-    updated_server = crud.update_mcpserver(db=db, mcpserver_id=server_id, mcpserver=mcpserver)
+    updated_server = await crud.update_mcpserver(db=db, mcpserver_id=server_id, mcpserver=mcpserver)
     mcp_manager.load_config()
     return updated_server
 
 @app.delete("/servers/{server_id}")
 async def delete_server(
     server_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """Delete an MCP server"""
-    db_server = crud.get_mcpserver(db, mcpserver_id=server_id)
+    db_server = await crud.get_mcpserver(db, mcpserver_id=server_id)
     if db_server is None:
         raise HTTPException(status_code=404, detail="Server not found")
     
@@ -133,18 +476,19 @@ async def delete_server(
     if db_server.status:
         raise HTTPException(status_code=400, detail="Cannot delete a connected server. Please disconnect first.")
     
-    crud.delete_mcpserver(db=db, mcpserver_id=server_id)
+    await crud.delete_mcpserver(db=db, mcpserver_id=server_id)
+    mcp_manager.release_server(server_id)
     mcp_manager.load_config()
     return {"message": f"Server {server_id} deleted successfully"}
 
 @app.post("/servers/connect/{server_id}")
 async def connect_server(
     server_id: int, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """Connect to an MCP server"""
-    result = mcp_manager.connect_server(db, server_id)
+    result = await mcp_manager.connect_server(db, server_id)
     if not result["success"]:
         raise HTTPException(status_code=400, detail=result["message"])
     monitoring.log_event(f"Connected to server {server_id}")
@@ -153,11 +497,11 @@ async def connect_server(
 @app.post("/servers/disconnect/{server_id}")
 async def disconnect_server(
     server_id: int, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """Disconnect from an MCP server"""
-    result = mcp_manager.disconnect_server(db, server_id)
+    result = await mcp_manager.disconnect_server(db, server_id)
     if not result["success"]:
         raise HTTPException(status_code=400, detail=result["message"])
     monitoring.log_event(f"Disconnected from server {server_id}")
@@ -167,39 +511,75 @@ async def disconnect_server(
 async def execute_command(
     server_id: int, 
     command: str = Form(...), 
-    db: Session = Depends(get_db), 
+    db: AsyncSession = Depends(get_db), 
     current_user: models.User = Depends(get_current_user)
 ):
     """Execute a command on an MCP server"""
-    result = mcp_manager.execute_command(db, server_id, command)
+    db_server = await crud.get_mcpserver(db, mcpserver_id=server_id)
+    admit_request(server_id, db_server.type if db_server else None, f"user:{current_user.id}")
+    try:
+        result = await mcp_manager.execute_command(db, server_id, command)
+    finally:
+        rate_limiter.release()
     if not result["success"]:
         raise HTTPException(status_code=400, detail=result["message"])
-    monitoring.log_event(f"Command '{command}' executed on server {server_id}")
+    logger.debug("Command %r executed on server %s", command, server_id)
     return result
 
 @app.get("/servers/{server_id}/logs")
 async def get_server_logs(
     server_id: int,
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """Get logs for a specific MCP server"""
-    result = mcp_manager.get_server_logs(server_id)
+    result = await mcp_manager.get_server_logs(db, server_id)
     if not result["success"]:
         raise HTTPException(status_code=400, detail=result["message"])
     return result['logs']
 
+@app.get("/servers/{server_id}/logs/export")
+async def export_server_logs(
+    server_id: int,
+    success: Optional[bool] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    gzip: bool = False,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Stream a server's command log as NDJSON, optionally filtered by success
+    and a since/until time range
+    """
+    if not await crud.get_mcpserver(db, server_id):
+        raise HTTPException(status_code=404, detail="Server not found")
+    from backend import export
+    return ndjson_download(export.log_chunks(server_id, success, since, until), f"server-{server_id}-logs", gzip)
+
 @app.get("/servers/{server_id}/metrics")
 async def get_server_metrics(
     server_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """Get metrics for a specific MCP server"""
-    result = mcp_manager.get_server_metrics(db, server_id)
+    result = await mcp_manager.get_server_metrics(db, server_id)
     if not result["success"]:
         raise HTTPException(status_code=400, detail=result["message"])
     return result
 
+@app.get("/servers/{server_id}/catalog")
+async def get_server_catalog(
+    server_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Get the tools exposed by a specific MCP server"""
+    result = await mcp_manager.get_server_catalog(db, server_id)
+    if not result["success"]:
+        raise HTTPException(status_code=400, detail=result["message"])
+    return result["tools"]
+
 @app.websocket("/ws/{client_id}")
 async def websocket_handler(websocket: WebSocket, client_id: int):
     await websocket_endpoint(websocket, client_id)
@@ -211,101 +591,205 @@ async def test_post():
 # Task API endpoints
 @app.get("/tasks", response_model=List[schemas.Task])
 async def get_tasks(
-    skip: int = 0, 
-    limit: int = 100, 
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    server_id: int = None,
+    status: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Get tasks ordered by creation time, a page at a time, optionally filtered
+    by server_id, status and a created_after/created_before time range.
+
+    The cursor of the next page is returned in the X-Next-Cursor and Link headers.
+    """
+    etag = await make_etag(db, "tasks", cursor, limit, server_id, status, created_after, created_before)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    after = parse_cursor(crud.parse_task_cursor, cursor)
+    tasks = await crud.get_tasks(
+        db, limit=limit + 1, after=after, server_id=server_id, status=status,
+        created_after=created_after, created_before=created_before
+    )
+    next_cursor = None
+    if len(tasks) > limit:
+        tasks = tasks[:limit]
+        next_cursor = crud.task_cursor(tasks[-1])
+    # Rows already have the response model's fields, so skip validating them again
+    response = ORJSONResponse([task._asdict() for task in tasks])
+    set_cache_headers(response, etag)
+    set_page_headers(request, response, next_cursor)
+    return response
+
+@app.get("/tasks/export")
+async def export_tasks(
     server_id: int = None,
-    db: Session = Depends(get_db),
+    status: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    gzip: bool = False,
     current_user: models.User = Depends(get_current_user)
 ):
-    """Get all tasks, optionally filtered by server_id"""
-    tasks = crud.get_tasks(db, skip=skip, limit=limit, server_id=server_id)
-    return tasks
+    """Stream all tasks matching the GET /tasks filters as NDJSON, in creation order"""
+    from backend import export
+    chunks = export.task_chunks(server_id, status, created_after, created_before)
+    return ndjson_download(chunks, "tasks", gzip)
+
+@app.get("/tasks/archive")
+async def get_archived_tasks(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    server_id: int = None,
+    status: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    current_user: models.User = Depends(get_current_user)
+):
+    """Query tasks moved to the archive by the retention policy, with the same
+    ordering, filters and cursors as GET /tasks
+    """
+    after = parse_cursor(crud.parse_task_cursor, cursor)
+    archive_dir = retention.compactor.policy()["archive_dir"]
+    rows = await asyncio.to_thread(
+        retention.read_archive, archive_dir, limit + 1, after, server_id, status, created_after, created_before
+    )
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        set_page_headers(request, response, crud.encode_cursor(last["created_at"], last["id"]))
+    return rows
+
+# Bulk routes are registered before /tasks/{task_id} so "bulk" is not taken for an id
+@app.post("/tasks/bulk", response_model=List[schemas.BulkItemResult])
+async def bulk_create_tasks(
+    tasks: List[schemas.TaskCreate],
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Create many tasks in one transaction, returning a result per item"""
+    check_bulk_size(tasks)
+    return await crud.bulk_create_tasks(db, tasks)
+
+@app.put("/tasks/bulk", response_model=List[schemas.BulkItemResult])
+async def bulk_update_tasks(
+    tasks: List[schemas.TaskBulkUpdate],
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Update many tasks (e.g. their status) in one transaction, returning a result per item"""
+    check_bulk_size(tasks)
+    return await crud.bulk_update_tasks(db, tasks)
+
+@app.post("/tasks/bulk_delete", response_model=List[schemas.BulkItemResult])
+async def bulk_delete_tasks(
+    request: schemas.BulkDelete,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Delete many tasks in one transaction, returning a result per item"""
+    check_bulk_size(request.ids)
+    return await crud.bulk_delete_tasks(db, request.ids)
 
 @app.get("/tasks/{task_id}", response_model=schemas.Task)
 async def get_task(
     task_id: int, 
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """Get a specific task by ID"""
-    db_task = crud.get_task(db, task_id=task_id)
+    etag = await make_etag(db, "tasks", task_id)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    db_task = await crud.get_task(db, task_id=task_id)
     if db_task is None:
         raise HTTPException(status_code=404, detail="Task not found")
+    set_cache_headers(response, etag)
     return db_task
 
 @app.post("/tasks", response_model=schemas.Task)
 async def create_task(
     task: schemas.TaskCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """Create a new task"""
     # Check if server exists
-    db_server = crud.get_mcpserver(db, mcpserver_id=task.server_id)
+    db_server = await crud.get_mcpserver(db, mcpserver_id=task.server_id)
     if db_server is None:
         raise HTTPException(status_code=404, detail="Server not found")
     
-    db_task = crud.create_task(db=db, task=task)
+    db_task = await crud.create_task(db=db, task=task)
     return db_task
 
 @app.put("/tasks/{task_id}", response_model=schemas.Task)
 async def update_task(
     task_id: int,
     task: schemas.TaskUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """Update an existing task"""
-    db_task = crud.get_task(db, task_id=task_id)
+    db_task = await crud.get_task(db, task_id=task_id)
     if db_task is None:
         raise HTTPException(status_code=404, detail="Task not found")
     
     # If server_id is being updated, check if server exists
     if task.server_id is not None:
-        db_server = crud.get_mcpserver(db, mcpserver_id=task.server_id)
+        db_server = await crud.get_mcpserver(db, mcpserver_id=task.server_id)
         if db_server is None:
             raise HTTPException(status_code=404, detail="Server not found")
     
-    updated_task = crud.update_task(db=db, task_id=task_id, task=task)
+    updated_task = await crud.update_task(db=db, task_id=task_id, task=task)
     return updated_task
 
 @app.delete("/tasks/{task_id}")
 async def delete_task(
     task_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """Delete a task"""
-    db_task = crud.get_task(db, task_id=task_id)
+    db_task = await crud.get_task(db, task_id=task_id)
     if db_task is None:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    crud.delete_task(db=db, task_id=task_id)
+    await crud.delete_task(db=db, task_id=task_id)
     return {"message": f"Task {task_id} deleted successfully"}
 
 @app.post("/tasks/{task_id}/run", response_model=schemas.Task)
 async def run_task(
     task_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """Run a task"""
-    db_task = crud.get_task(db, task_id=task_id)
+    db_task = await crud.get_task(db, task_id=task_id)
     if db_task is None:
         raise HTTPException(status_code=404, detail="Task not found")
     
     # Check if server exists and is connected
-    db_server = crud.get_mcpserver(db, mcpserver_id=db_task.server_id)
+    db_server = await crud.get_mcpserver(db, mcpserver_id=db_task.server_id)
     if db_server is None:
         raise HTTPException(status_code=404, detail="Server not found")
     
     if not db_server.status:
         raise HTTPException(status_code=400, detail="Server is not connected")
     
+    # Queued tasks count towards the limits but not towards in-flight requests
+    admit_request(db_server.id, db_server.type, f"user:{current_user.id}")
+    rate_limiter.release()
+    
     # Run the task
-    db_task = crud.run_task(db=db, task_id=task_id)
+    db_task = await crud.run_task(db=db, task_id=task_id)
     
     # Execute the command asynchronously
-    task_queue.add_task(db_task.id, db_task.server_id, db_task.command)
+    queue.add_task(db_task.id, db_task.server_id, db_task.command)
     
     return db_task
@@ -0,0 +1,125 @@
+# JSON-RPC client for MCP servers
+#
+# One connection per server speaking newline-delimited JSON-RPC 2.0 over TCP,
+# as served by simulator.py. Requests are pipelined: each gets an id and its
+# reply is matched by a reader task, so concurrent commands share the
+# connection. Progress notifications are passed to the caller's callback.
+import asyncio
+import contextvars
+import itertools
+from typing import Any, Callable, Dict, Optional
+
+import orjson
+
+from backend import utils
+
+PROTOCOL_VERSION = "2024-11-05"
+# Longest message accepted, as one line of JSON
+MAX_MESSAGE_BYTES = 16 * 1024 * 1024
+
+
+class RPCError(Exception):
+    """An error reply, or a tool result flagged isError"""
+
+
+class MCPClient:
+    def __init__(self, host: str, port: int, timeout: float = 30):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.server_info: Dict[str, Any] = {}
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._progress: Dict[int, Callable[[int, Optional[int]], None]] = {}
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def connect(self) -> None:
+        """Open the connection and perform the initialize handshake"""
+        reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, limit=MAX_MESSAGE_BYTES), self.timeout
+        )
+        # Empty context so the reader outlives the request that connected without inheriting its span
+        self._reader_task = contextvars.Context().run(asyncio.create_task, self._read(reader))
+        try:
+            result = await self.request("initialize", {
+                "protocolVersion": PROTOCOL_VERSION,
+                "clientInfo": {"name": "mcp-switchboard", "version": "1.0"},
+                "capabilities": {},
+            })
+            self.server_info = result.get("serverInfo") or {}
+            self._writer.write(utils.dumps_json({"jsonrpc": "2.0", "method": "notifications/initialized"}) + b"\n")
+        except BaseException:
+            # A failed or cancelled handshake must not leave the socket and reader behind
+            self.close()
+            raise
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+
+    async def request(self, method: str, params: Optional[Dict[str, Any]] = None,
+                      on_progress: Optional[Callable[[int, Optional[int]], None]] = None) -> Any:
+        """Send a request and wait for its result; raises RPCError, ConnectionError or TimeoutError"""
+        if not self.connected:
+            raise ConnectionError(f"Not connected to {self.host}:{self.port}")
+        request_id = next(self._ids)
+        params = dict(params or {})
+        if on_progress is not None:
+            params["_meta"] = {"progressToken": request_id}
+            self._progress[request_id] = on_progress
+        reply = self._pending[request_id] = asyncio.get_running_loop().create_future()
+        try:
+            self._writer.write(utils.dumps_json({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params}) + b"\n")
+            await self._writer.drain()
+            try:
+                return await asyncio.wait_for(reply, self.timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"No reply to {method} from {self.host}:{self.port} within {self.timeout} s")
+        finally:
+            self._pending.pop(request_id, None)
+            self._progress.pop(request_id, None)
+
+    async def call_tool(self, name: str, args: str = "", on_progress: Optional[Callable[[int, Optional[int]], None]] = None) -> str:
+        """Call a tool and return its text output"""
+        result = await self.request("tools/call", {"name": name, "arguments": {"args": args}}, on_progress)
+        text = "".join(item.get("text", "") for item in result.get("content") or [] if item.get("type") == "text")
+        if result.get("isError"):
+            raise RPCError(text)
+        return text
+
+    async def _read(self, reader: asyncio.StreamReader) -> None:
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                message = orjson.loads(line)
+                if "method" in message:
+                    params = message.get("params") or {}
+                    callback = self._progress.get(params.get("progressToken"))
+                    if message["method"] == "notifications/progress" and callback is not None:
+                        callback(params.get("progress"), params.get("total"))
+                    continue
+                reply = self._pending.get(message.get("id"))
+                if reply is None or reply.done():
+                    continue
+                if "error" in message:
+                    reply.set_exception(RPCError(message["error"].get("message", "Unknown error")))
+                else:
+                    reply.set_result(message.get("result"))
+        except (OSError, ValueError):
+            pass
+        finally:
+            # Fail whatever is still waiting instead of letting it run into the timeout
+            for reply in self._pending.values():
+                if not reply.done():
+                    reply.set_exception(ConnectionError(f"Connection to {self.host}:{self.port} closed"))
+            if self._writer is not None:
+                self._writer.close()
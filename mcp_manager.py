@@ -1,23 +1,172 @@
+import abc
 import json
 import os
 import time
 import uuid
-import random
-from typing import Dict, List, Optional, Any
-from sqlalchemy.orm import Session
-from mcp.client.session import ClientSession
-from mcp.client.stdio import StdioServerParameters, stdio_client
-from mcp.shared.exceptions import McpError
-from mcp.types import INVALID_REQUEST, INVALID_PARAMS, METHOD_NOT_FOUND, PARSE_ERROR, INTERNAL_ERROR
+from typing import TYPE_CHECKING, Dict, List, Optional, Any
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # Import backend modules with correct paths
 from backend import models, schemas, crud
+from backend.singleflight import SingleFlight
+from backend.result_cache import ResultCache, split_command
+from backend.sharding import routed
+from backend import database, instrumentation, tracing
+
+if TYPE_CHECKING:
+    from backend.mcp_client import MCPClient
+
+# Commands that only read state; concurrent identical calls may share one execution.
+# Can be overridden with "idempotent_commands" in config.json.
+DEFAULT_IDEMPOTENT_COMMANDS = ["ls", "dir", "cat", "type", "ps", "tasklist"]
+
+# Which backend runs connects and commands: "mock" (the simulator's default tools,
+# in-process) or "rpc" (JSON-RPC to each server's host and port, e.g. simulator.py)
+MCP_BACKEND = os.environ.get("MCP_BACKEND", "mock")
+# Seconds to wait for an MCP server's reply over RPC
+MCP_RPC_TIMEOUT = float(os.environ.get("MCP_RPC_TIMEOUT", "30"))
+# How often config.json is checked for changes (seconds); settings are read on
+# every command, so they are not checked on every read
+SETTINGS_CHECK_INTERVAL = float(os.environ.get("SETTINGS_CHECK_INTERVAL", "1"))
+
+# Outputs, tool catalog and metrics of the mock backend, created on first use
+_mock = None
+
+def mock_simulator():
+    global _mock
+    if _mock is None:
+        from backend.simulator import Simulator
+        _mock = Simulator(name="mock")
+    return _mock
+
+class CommandBackend(abc.ABC):
+    """Extension point for what actually runs on an MCP server.
+
+    MCPManager keeps its bookkeeping (status, error counters, logs, caches) and
+    calls the installed backend for the connection, commands, tool catalog and
+    metrics. Exceptions raised here are handled like failed connects and commands.
+    """
+
+    async def connect(self, server) -> None:
+        pass
+
+    async def disconnect(self, server) -> None:
+        self.release(server.id)
+
+    def release(self, server_id: int) -> None:
+        """Drop any connection state for the server without talking to it"""
+        pass
+
+    @abc.abstractmethod
+    async def execute(self, server, command: str) -> str:
+        """Run a command and return its output"""
+
+    async def list_tools(self, server) -> List[Dict[str, Any]]:
+        return mock_simulator().list_tools()
+
+    async def metrics(self, server) -> Dict[str, Any]:
+        """Resource usage of the server; simulated unless overridden"""
+        return mock_simulator().metrics(server.type)
+
+class MockBackend(CommandBackend):
+    """The simulator's default tools, run in-process without latency"""
+
+    async def execute(self, server, command: str) -> str:
+        parts = command.strip().split(" ", 1)
+        return await mock_simulator().call(parts[0], parts[1] if len(parts) > 1 else "", server=server.name)
+
+class RPCBackend(CommandBackend):
+    """JSON-RPC to the MCP server at each server's host and port (see mcp_client.py)"""
+
+    def __init__(self, timeout: float = MCP_RPC_TIMEOUT):
+        self.timeout = timeout
+        self.clients: Dict[int, "MCPClient"] = {}
+
+    async def connect(self, server) -> None:
+        from backend.mcp_client import MCPClient
+        self.release(server.id)
+        client = MCPClient(server.host, server.port, self.timeout)
+        await client.connect()
+        self.clients[server.id] = client
+
+    def release(self, server_id: int) -> None:
+        client = self.clients.pop(server_id, None)
+        if client is not None:
+            client.close()
+
+    def _client(self, server) -> "MCPClient":
+        client = self.clients.get(server.id)
+        if client is None or not client.connected:
+            raise ConnectionError(f"No open connection to {server.name}")
+        return client
+
+    async def execute(self, server, command: str) -> str:
+        name, args = split_command(command)
+        progress_updates = 0
+
+        def on_progress(done, total):
+            nonlocal progress_updates
+            progress_updates += 1
+
+        with tracing.span("mcp.rpc", server_id=server.id, tool=name) as current:
+            output = await self._client(server).call_tool(name, args, on_progress)
+            current.attrs["progress_updates"] = progress_updates
+        return output
+
+    async def list_tools(self, server) -> List[Dict[str, Any]]:
+        return (await self._client(server).request("tools/list"))["tools"]
+
+    async def metrics(self, server) -> Dict[str, Any]:
+        return (await self._client(server).request("metrics/get"))["metrics"]
+
+def create_backend(name: str) -> CommandBackend:
+    if name == "rpc":
+        return RPCBackend()
+    return MockBackend()
 
 class MCPManager:
     def __init__(self):
         self.connections = {}
         self.command_logs = {}  # Dictionary to store command logs, server_id -> list of logs
         self.config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "config.json")
+        self.inflight = SingleFlight()  # Coalesces identical concurrent reads
+        self.result_cache = ResultCache()  # TTL cache for idempotent command results
+        self._settings = {}
+        self._settings_mtime = None
+        self._settings_checked = 0.0
+        self.backend: CommandBackend = create_backend(MCP_BACKEND)
+
+    def set_backend(self, backend: Optional[CommandBackend]) -> None:
+        """Install the backend for connects and commands (None for the mock), dropping state from the previous one"""
+        for server_id in list(self.connections):
+            self.release_server(server_id)
+        self.backend = backend if backend is not None else MockBackend()
+
+    def load_settings(self, refresh: bool = False) -> Dict[str, Any]:
+        """Load the whole config.json document, re-reading it only when it changes.
+
+        Changes are picked up within SETTINGS_CHECK_INTERVAL seconds, or at once with `refresh`.
+        """
+        now = time.monotonic()
+        if not refresh and now - self._settings_checked < SETTINGS_CHECK_INTERVAL:
+            return self._settings
+        self._settings_checked = now
+        try:
+            mtime = os.path.getmtime(self.config_path)
+        except OSError:
+            self._settings, self._settings_mtime = {}, None
+            return self._settings
+        if mtime != self._settings_mtime:
+            with open(self.config_path, "r") as f:
+                self._settings = json.load(f)
+            self._settings_mtime = mtime
+        return self._settings
+
+    def is_idempotent(self, command: str) -> bool:
+        """Check whether a command is marked as idempotent (read-only)"""
+        verb, _ = split_command(command)
+        idempotent = self.load_settings().get("idempotent_commands", DEFAULT_IDEMPOTENT_COMMANDS)
+        return verb in idempotent
 
     def load_config(self) -> List[Dict[str, Any]]:
         """Load server configurations from config.json"""
@@ -29,16 +178,20 @@ class MCPManager:
     
     def save_config(self, servers: List[Dict[str, Any]]) -> None:
         """Save server configurations to config.json"""
+        config = dict(self.load_settings(refresh=True))
+        config["servers"] = servers
         with open(self.config_path, "w") as f:
-            json.dump({"servers": servers}, f, indent=2)
+            json.dump(config, f, indent=2)
+        # Read back on next use
+        self._settings_checked = 0.0
     
-    def sync_config_with_db(self, db: Session) -> None:
+    async def sync_config_with_db(self, db: AsyncSession) -> None:
         """Synchronize config.json with database"""
         config_servers = self.load_config()
         
         # Update or create servers from config
         for server_config in config_servers:
-            db_server = crud.get_mcpserver(db, server_config["id"])
+            db_server = await crud.get_mcpserver(db, server_config["id"])
             
             if db_server:
                 # Update existing server
@@ -49,7 +202,7 @@ class MCPManager:
                     type=server_config["type"],
                     api_key=server_config.get("apiKey")
                 )
-                crud.update_mcpserver(db, db_server.id, server_update)
+                await crud.update_mcpserver(db, db_server.id, server_update)
             else:
                 # Create new server
                 server_create = schemas.MCPServerCreate(
@@ -59,38 +212,66 @@ class MCPManager:
                     type=server_config["type"],
                     api_key=server_config.get("apiKey")
                 )
-                crud.create_mcpserver(db, server_create)
+                await crud.create_mcpserver(db, server_create)
                 
-        db.commit()
+        await db.commit()
     
-    def connect_server(self, db: Session, server_id: int, retry_count: int = 3) -> Dict[str, Any]:
-        """Connect to an MCP server with retry logic (mock implementation)"""
-        db_server = crud.get_mcpserver(db, server_id)
+    def release_server(self, server_id: int) -> None:
+        """Forget a server that was deleted or is now owned by another worker; its stored status is left for the new owner"""
+        self.connections.pop(server_id, None)
+        self.backend.release(server_id)
+        self.command_logs.pop(server_id, None)
+        self.result_cache.forget_server(server_id)
+
+    @staticmethod
+    async def _in_own_session(fn, *args) -> Any:
+        """Run fn(db, *args) in a session of its own. Calls shared through `inflight`
+        use this: they outlive the request that started them, whose session is
+        closed when that request ends.
+        """
+        async with database.AsyncSessionLocal() as db:
+            return await fn(db, *args)
+
+    def is_connected(self, db_server) -> bool:
+        # The stored status may have been set by another process (or a previous one)
+        return bool(db_server.status) and db_server.id in self.connections
+
+    @routed
+    async def connect_server(self, db: AsyncSession, server_id: int, retry_count: int = 3) -> Dict[str, Any]:
+        """Connect to an MCP server with retry logic"""
+        with tracing.span("mcp.connect", server_id=server_id):
+            return await self._connect_server(db, server_id, retry_count)
+
+    async def _connect_server(self, db: AsyncSession, server_id: int, retry_count: int = 3) -> Dict[str, Any]:
+        """Connect to an MCP server through the installed backend"""
+        db_server = await crud.get_mcpserver(db, server_id)
         if not db_server:
             return {"success": False, "message": "Server not found"}
         
         # Check if server is already connected
-        if db_server.status:
+        if self.is_connected(db_server):
             return {"success": True, "message": f"Already connected to {db_server.name}", "connection_id": db_server.connection_id}
         
-        # For mock implementation, we'll simulate a successful connection
+        # The backend opens the connection; the rest is bookkeeping
         try:
-            # Generate a mock connection ID
+            await self.backend.connect(db_server)
+            
+            # Identifies this connection to clients
             connection_id = str(uuid.uuid4())
             
             # Update server status in database
-            db_server.status = True
-            db_server.connection_id = connection_id
-            db_server.connection_errors = 0  # Reset error count
-            db_server.last_connected = int(time.time())  # Set last connected timestamp
-            db_server.last_error = None  # Clear last error
-            db.commit()
+            await crud.update_mcpserver_state(
+                db, server_id,
+                status=True,
+                connection_id=connection_id,
+                connection_errors=0,  # Reset error count
+                last_connected=int(time.time()),  # Set last connected timestamp
+                last_error=None  # Clear last error
+            )
             
-            # Store mock connection in memory
+            # Track the connection in memory; server state is read from the registry
             self.connections[server_id] = {
                 "id": connection_id,
-                "server": db_server,
-                "client": {"mock": True},  # Mock client
                 "last_error": None,
                 "retry_count": 0
             }
@@ -102,28 +283,33 @@ class MCPManager:
             self.command_logs[server_id].append({
                 "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
                 "command": "connect",
-                "output": f"Connected to {db_server.name} (mock connection)",
+                "output": f"Connected to {db_server.name}",
                 "success": True
             })
             
+            instrumentation.connects.inc(server_id=server_id, success="true")
             return {
                 "success": True,
-                "message": f"Connected to {db_server.name} (mock connection)",
+                "message": f"Connected to {db_server.name}",
                 "connection_id": connection_id
             }
         except Exception as e:
             error_message = str(e)
             
             # Update error information in database
-            db_server.connection_errors = (db_server.connection_errors or 0) + 1
-            db_server.last_error = error_message
-            db.commit()
+            await crud.update_mcpserver_state(
+                db, server_id,
+                connection_errors=(db_server.connection_errors or 0) + 1,
+                last_error=error_message
+            )
             
+            instrumentation.connects.inc(server_id=server_id, success="false")
             return {"success": False, "message": f"Connection failed: {error_message}"}
     
-    def disconnect_server(self, db: Session, server_id: int, force: bool = False) -> Dict[str, Any]:
-        """Disconnect from an MCP server (mock implementation)"""
-        db_server = crud.get_mcpserver(db, server_id)
+    @routed
+    async def disconnect_server(self, db: AsyncSession, server_id: int, force: bool = False) -> Dict[str, Any]:
+        """Disconnect from an MCP server, closing its connection in the installed backend"""
+        db_server = await crud.get_mcpserver(db, server_id)
         if not db_server:
             return {"success": False, "message": "Server not found"}
         
@@ -132,14 +318,16 @@ class MCPManager:
             return {"success": True, "message": f"Already disconnected from {db_server.name}"}
         
         try:
+            if server_id in self.connections:
+                await self.backend.disconnect(db_server)
+            
             # Update server status in database
-            db_server.status = False
-            db_server.connection_id = None
-            db.commit()
+            await crud.update_mcpserver_state(db, server_id, status=False, connection_id=None)
             
             # Remove connection from memory
             if server_id in self.connections:
                 del self.connections[server_id]
+            self.result_cache.invalidate_server(server_id)
             
             # Add a log entry
             if server_id not in self.command_logs:
@@ -148,25 +336,24 @@ class MCPManager:
             self.command_logs[server_id].append({
                 "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
                 "command": "disconnect",
-                "output": f"Disconnected from {db_server.name} (mock connection)",
+                "output": f"Disconnected from {db_server.name}",
                 "success": True
             })
             
             return {
                 "success": True,
-                "message": f"Disconnected from {db_server.name} (mock connection)"
+                "message": f"Disconnected from {db_server.name}"
             }
         except Exception as e:
             error_message = str(e)
             
             # If force disconnect is requested, update the database anyway
             if force:
-                db_server.status = False
-                db_server.connection_id = None
-                db.commit()
+                await crud.update_mcpserver_state(db, server_id, status=False, connection_id=None)
                 
                 if server_id in self.connections:
                     del self.connections[server_id]
+                self.backend.release(server_id)
                 
                 return {
                     "success": True,
@@ -175,65 +362,63 @@ class MCPManager:
             
             return {"success": False, "message": f"Disconnection failed: {error_message}"}
     
-    def execute_command(self, db: Session, server_id: int, command: str, auto_reconnect: bool = True) -> Dict[str, Any]:
-        """Execute a command on an MCP server (mock implementation)"""
-        db_server = crud.get_mcpserver(db, server_id)
+    @routed
+    async def execute_command(self, db: AsyncSession, server_id: int, command: str, auto_reconnect: bool = True) -> Dict[str, Any]:
+        """Execute a command on an MCP server, recording its latency and outcome"""
+        started = time.perf_counter()
+        with tracing.span("mcp.execute_command", server_id=server_id, command=split_command(command)[0]):
+            result = await self._execute_with_cache(db, server_id, command, auto_reconnect)
+        instrumentation.command_duration.observe(time.perf_counter() - started, server_id=server_id)
+        instrumentation.commands.inc(server_id=server_id, success=str(result["success"]).lower())
+        return result
+
+    async def _execute_with_cache(self, db: AsyncSession, server_id: int, command: str, auto_reconnect: bool = True) -> Dict[str, Any]:
+        """Execute a command, using the result cache and in-flight sharing for idempotent ones.
+
+        Results of idempotent commands are served from the result cache when fresh, and
+        identical ones already in flight are shared. Any other command is treated as a
+        write and invalidates the server's cached results.
+        """
+        self.result_cache.configure(self.load_settings().get("command_cache"))
+        if self.is_idempotent(command):
+            cached = self.result_cache.get(server_id, command)
+            if cached is not None:
+                return cached
+            key = (server_id, "execute_command", command, auto_reconnect)
+            return await self.inflight.do_async(key, self._in_own_session, self._execute_and_cache, server_id, command, auto_reconnect)
+        self.result_cache.invalidate_server(server_id)
+        return await self._execute_command(db, server_id, command, auto_reconnect)
+
+    async def _execute_and_cache(self, db: AsyncSession, server_id: int, command: str, auto_reconnect: bool = True) -> Dict[str, Any]:
+        """Execute an idempotent command and cache a successful result"""
+        generation = self.result_cache.generation(server_id)
+        result = await self._execute_command(db, server_id, command, auto_reconnect)
+        if result["success"]:
+            self.result_cache.set(server_id, command, dict(result, cached=True), generation)
+        return result
+
+    async def _execute_command(self, db: AsyncSession, server_id: int, command: str, auto_reconnect: bool = True) -> Dict[str, Any]:
+        """Execute a command on an MCP server through the backend"""
+        db_server = await crud.get_mcpserver(db, server_id)
         if not db_server:
             return {"success": False, "message": "Server not found"}
         
         # Check if server is connected
-        if not db_server.status:
+        if not self.is_connected(db_server):
             # Try to reconnect if auto_reconnect is enabled
             if auto_reconnect:
-                connect_result = self.connect_server(db, server_id)
+                connect_result = await self.connect_server(db, server_id)
                 if not connect_result["success"]:
                     return {"success": False, "message": f"Server is not connected and auto-reconnect failed: {connect_result['message']}"}
             else:
                 return {"success": False, "message": "Server is not connected"}
         
         try:
-            # Generate mock command output based on the command
-            if command.lower().startswith("ls") or command.lower().startswith("dir"):
-                result = """
-file1.txt
-file2.txt
-directory1/
-directory2/
-config.json
-README.md
-"""
-            elif command.lower().startswith("cat") or command.lower().startswith("type"):
-                file_name = command.split(" ", 1)[1] if len(command.split(" ", 1)) > 1 else "unknown"
-                result = f"Contents of {file_name}:\nThis is a mock file content for demonstration purposes.\nLine 2 of the file.\nLine 3 of the file."
-            elif command.lower().startswith("ps") or command.lower().startswith("tasklist"):
-                result = """
-PID   COMMAND
-1     system
-100   mcp_server
-200   database
-300   web_server
-"""
-            elif command.lower().startswith("ping"):
-                host = command.split(" ", 1)[1] if len(command.split(" ", 1)) > 1 else "localhost"
-                result = f"""
-Pinging {host} with 32 bytes of data:
-Reply from {host}: bytes=32 time=10ms TTL=64
-Reply from {host}: bytes=32 time=12ms TTL=64
-Reply from {host}: bytes=32 time=9ms TTL=64
-Reply from {host}: bytes=32 time=11ms TTL=64
-
-Ping statistics for {host}:
-    Packets: Sent = 4, Received = 4, Lost = 0 (0% loss),
-Approximate round trip times in milli-seconds:
-    Minimum = 9ms, Maximum = 12ms, Average = 10.5ms
-"""
-            else:
-                result = f"Executed command '{command}' on {db_server.name} (mock execution)"
+            result = await self.backend.execute(db_server, command)
 
             # Reset error count on successful command execution
-            if "command_errors" in db_server.__dict__:
-                db_server.command_errors = 0
-                db.commit()
+            if db_server.command_errors:
+                await crud.update_mcpserver_state(db, server_id, command_errors=0)
             
             # Add to command logs
             log_entry = {
@@ -264,58 +449,24 @@ Approximate round trip times in milli-seconds:
             self.command_logs[server_id].append(log_entry)
             
             # Increment command error count and update last_error
-            if "command_errors" in db_server.__dict__:
-                db_server.command_errors = (db_server.command_errors or 0) + 1
-                db_server.last_error = error_message
-                db.commit()
+            await crud.update_mcpserver_state(
+                db, server_id,
+                command_errors=(db_server.command_errors or 0) + 1,
+                last_error=error_message
+            )
             
             # Try to reconnect and retry once if connection might be stale
             if auto_reconnect:
                 try:
                     # Force disconnect and reconnect
-                    self.disconnect_server(db, server_id, force=True)
-                    connect_result = self.connect_server(db, server_id)
+                    instrumentation.reconnects.inc(server_id=server_id)
+                    with tracing.span("mcp.reconnect", server_id=server_id):
+                        await self.disconnect_server(db, server_id, force=True)
+                        connect_result = await self.connect_server(db, server_id)
                     
                     if connect_result["success"]:
-                        # Retry the command with a different mock output
-                        if command.lower().startswith("ls") or command.lower().startswith("dir"):
-                            result = """
-file1.txt
-file2.txt
-directory1/
-directory2/
-config.json
-README.md
-logs/
-"""
-                        elif command.lower().startswith("cat") or command.lower().startswith("type"):
-                            file_name = command.split(" ", 1)[1] if len(command.split(" ", 1)) > 1 else "unknown"
-                            result = f"Contents of {file_name} (after reconnection):\nThis is a mock file content for demonstration purposes.\nLine 2 of the file.\nLine 3 of the file."
-                        elif command.lower().startswith("ps") or command.lower().startswith("tasklist"):
-                            result = """
-PID   COMMAND
-1     system
-100   mcp_server
-200   database
-300   web_server
-400   background_task
-"""
-                        elif command.lower().startswith("ping"):
-                            host = command.split(" ", 1)[1] if len(command.split(" ", 1)) > 1 else "localhost"
-                            result = f"""
-Pinging {host} with 32 bytes of data (after reconnection):
-Reply from {host}: bytes=32 time=8ms TTL=64
-Reply from {host}: bytes=32 time=9ms TTL=64
-Reply from {host}: bytes=32 time=7ms TTL=64
-Reply from {host}: bytes=32 time=10ms TTL=64
-
-Ping statistics for {host}:
-    Packets: Sent = 4, Received = 4, Lost = 0 (0% loss),
-Approximate round trip times in milli-seconds:
-    Minimum = 7ms, Maximum = 10ms, Average = 8.5ms
-"""
-                        else:
-                            result = f"Executed command '{command}' on {db_server.name} (after reconnection)"
+                        # Retry the command on the new connection
+                        result = await self.backend.execute(db_server, command)
                         
                         # Add to command logs
                         log_entry = {
@@ -342,70 +493,69 @@ Approximate round trip times in milli-seconds:
             
             return {"success": False, "message": f"Command execution failed: {error_message}"}
     
-    def get_server_logs(self, server_id: int) -> Dict[str, Any]:
+    @routed
+    async def get_server_logs(self, db: AsyncSession, server_id: int) -> Dict[str, Any]:
         """Get command execution logs for a specific server"""
         if server_id not in self.command_logs:
             return {"success": False, "message": "Server ID not found in logs"}
         return {"success": True, "logs": self.command_logs[server_id]}
 
-    def get_server_metrics(self, db: Session, server_id: int, auto_reconnect: bool = True) -> Dict[str, Any]:
-        """Get metrics for an MCP server (mock implementation)"""
-        db_server = crud.get_mcpserver(db, server_id)
+    @routed
+    async def get_server_log_page(self, db: AsyncSession, server_id: int, offset: int, limit: int) -> Dict[str, Any]:
+        """Get `limit` command log entries of a server from `offset` on, for reading a long log in pages"""
+        if server_id not in self.command_logs:
+            return {"success": False, "message": "Server ID not found in logs"}
+        return {"success": True, "logs": self.command_logs[server_id][offset:offset + limit]}
+
+    @routed
+    async def get_server_catalog(self, db: AsyncSession, server_id: int) -> Dict[str, Any]:
+        """Get the tools exposed by an MCP server, sharing in-flight fetches"""
+        return await self.inflight.do_async((server_id, "get_server_catalog"), self._in_own_session, self._get_server_catalog, server_id)
+
+    async def _get_server_catalog(self, db: AsyncSession, server_id: int) -> Dict[str, Any]:
+        """Get the tools exposed by an MCP server"""
+        db_server = await crud.get_mcpserver(db, server_id)
+        if not db_server:
+            return {"success": False, "message": "Server not found"}
+        if not self.is_connected(db_server):
+            return {"success": False, "message": "Server is not connected"}
+        try:
+            return {"success": True, "tools": await self.backend.list_tools(db_server)}
+        except Exception as e:
+            return {"success": False, "message": f"Failed to list tools: {e}"}
+
+    @routed
+    async def get_server_metrics(self, db: AsyncSession, server_id: int, auto_reconnect: bool = True) -> Dict[str, Any]:
+        """Get metrics for an MCP server, sharing in-flight fetches for the same server"""
+        key = (server_id, "get_server_metrics", auto_reconnect)
+        with tracing.span("mcp.get_server_metrics", server_id=server_id):
+            return await self.inflight.do_async(key, self._in_own_session, self._get_server_metrics, server_id, auto_reconnect)
+
+    async def _get_server_metrics(self, db: AsyncSession, server_id: int, auto_reconnect: bool = True) -> Dict[str, Any]:
+        """Get metrics for an MCP server"""
+        db_server = await crud.get_mcpserver(db, server_id)
         if not db_server:
             return {"success": False, "message": "Server not found"}
         
         # Check if server is connected
-        if not db_server.status:
+        if not self.is_connected(db_server):
             # Try to reconnect if auto_reconnect is enabled
             if auto_reconnect:
-                connect_result = self.connect_server(db, server_id)
+                connect_result = await self.connect_server(db, server_id)
                 if not connect_result["success"]:
                     return {"success": False, "message": f"Server is not connected and auto-reconnect failed: {connect_result['message']}"}
             else:
                 return {"success": False, "message": "Server is not connected"}
         
         try:
-            # Generate mock metrics with some randomization
-            server_type = db_server.type.lower()
-            
-            # Base metrics with some randomization based on server type
-            if "database" in server_type:
-                # Database servers have higher memory usage
-                cpu_usage = 35.5 + random.uniform(-8, 8)
-                memory_usage = 1024.3 + random.uniform(-100, 100)
-                disk_usage = 2048.7 + random.uniform(-200, 200)
-                network_in = 128.2 + random.uniform(-20, 20)
-                network_out = 64.9 + random.uniform(-10, 10)
-            elif "web" in server_type:
-                # Web servers have higher network activity
-                cpu_usage = 25.5 + random.uniform(-5, 5)
-                memory_usage = 512.3 + random.uniform(-50, 50)
-                disk_usage = 1024.7 + random.uniform(-100, 100)
-                network_in = 512.2 + random.uniform(-50, 50)
-                network_out = 256.9 + random.uniform(-25, 25)
-            else:
-                # Default metrics
-                cpu_usage = 25.5 + random.uniform(-5, 5)
-                memory_usage = 512.3 + random.uniform(-50, 50)
-                disk_usage = 1024.7 + random.uniform(-100, 100)
-                network_in = 256.2 + random.uniform(-25, 25)
-                network_out = 128.9 + random.uniform(-12, 12)
-            
             metrics = {
-                "cpu_usage": max(0, min(100, cpu_usage)),  # Ensure between 0-100%
-                "memory_usage": max(0, memory_usage),
-                "disk_usage": max(0, disk_usage),
-                "network_in": max(0, network_in),
-                "network_out": max(0, network_out),
+                **await self.backend.metrics(db_server),
                 "timestamp": int(time.time()),
                 "uptime": int(time.time()) - (db_server.last_connected or int(time.time())),
-                "connections": random.randint(5, 50),
-                "processes": random.randint(3, 15)
             }
             
             # Update metrics in database
-            db_server.metrics = metrics
-            db.commit()
+            await crud.update_mcpserver_state(db, server_id, metrics=metrics)
             
             return {
                 "success": True,
@@ -413,55 +563,28 @@ Approximate round trip times in milli-seconds:
             }
         except Exception as e:
             error_message = str(e)
-            db_server.last_error = error_message
-            db.commit()
+            await crud.update_mcpserver_state(db, server_id, last_error=error_message)
             
             # Try to reconnect and retry once if connection might be stale
             if auto_reconnect:
                 try:
                     # Force disconnect and reconnect
-                    self.disconnect_server(db, server_id, force=True)
-                    connect_result = self.connect_server(db, server_id)
+                    instrumentation.reconnects.inc(server_id=server_id)
+                    with tracing.span("mcp.reconnect", server_id=server_id):
+                        await self.disconnect_server(db, server_id, force=True)
+                        connect_result = await self.connect_server(db, server_id)
                     
                     if connect_result["success"]:
-                        # Retry getting metrics with slightly different values
-                        server_type = db_server.type.lower()
-                        
-                        if "database" in server_type:
-                            cpu_usage = 32.5 + random.uniform(-7, 7)
-                            memory_usage = 950.3 + random.uniform(-90, 90)
-                            disk_usage = 1950.7 + random.uniform(-180, 180)
-                            network_in = 120.2 + random.uniform(-18, 18)
-                            network_out = 60.9 + random.uniform(-9, 9)
-                        elif "web" in server_type:
-                            cpu_usage = 22.5 + random.uniform(-4, 4)
-                            memory_usage = 480.3 + random.uniform(-45, 45)
-                            disk_usage = 980.7 + random.uniform(-90, 90)
-                            network_in = 480.2 + random.uniform(-45, 45)
-                            network_out = 240.9 + random.uniform(-22, 22)
-                        else:
-                            cpu_usage = 22.5 + random.uniform(-4, 4)
-                            memory_usage = 480.3 + random.uniform(-45, 45)
-                            disk_usage = 980.7 + random.uniform(-90, 90)
-                            network_in = 240.2 + random.uniform(-22, 22)
-                            network_out = 120.9 + random.uniform(-11, 11)
-                        
+                        # Retry getting metrics on the new connection
                         metrics = {
-                            "cpu_usage": max(0, min(100, cpu_usage)),
-                            "memory_usage": max(0, memory_usage),
-                            "disk_usage": max(0, disk_usage),
-                            "network_in": max(0, network_in),
-                            "network_out": max(0, network_out),
+                            **await self.backend.metrics(db_server),
                             "timestamp": int(time.time()),
                             "uptime": int(time.time()) - (db_server.last_connected or int(time.time())),
-                            "connections": random.randint(5, 50),
-                            "processes": random.randint(3, 15),
                             "reconnected": True
                         }
                         
                         # Update metrics in database
-                        db_server.metrics = metrics
-                        db.commit()
+                        await crud.update_mcpserver_state(db, server_id, metrics=metrics)
                         
                         return {
                             "success": True,
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, JSON, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, JSON, DateTime, Index
 from datetime import datetime
 from sqlalchemy.orm import relationship
 from backend.database import Base
@@ -21,6 +21,12 @@ class MCPServer(Base):
     last_error = Column(String, nullable=True)
     credentials = relationship("Credential", back_populates="mcpserver")
 
+    # Listings are ordered by id and filtered by status or type
+    __table_args__ = (
+        Index("ix_mcpservers_status_id", "status", "id"),
+        Index("ix_mcpservers_type_id", "type", "id"),
+    )
+
 class Credential(Base):
     __tablename__ = "credentials"
 
@@ -48,3 +54,27 @@ class Task(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     last_run = Column(DateTime, nullable=True)
     result = Column(String, nullable=True)
+    timings = Column(JSON, nullable=True)  # Seconds spent per stage of the last run
+
+    # Listings are ordered by (created_at, id) and filtered by server, status and time range
+    __table_args__ = (
+        Index("ix_tasks_created_at_id", "created_at", "id"),
+        Index("ix_tasks_server_created_at", "server_id", "created_at", "id"),
+        Index("ix_tasks_status_created_at", "status", "created_at", "id"),
+        Index("ix_tasks_server_status_created_at", "server_id", "status", "created_at", "id"),
+    )
+
+class CollectionVersion(Base):
+    __tablename__ = "collection_versions"
+
+    # Bumped by every write to the collection (see crud.bump_version)
+    collection = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False)
+
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+
+    # Tokens revoked before they expired (see auth.revoke_token), checked by
+    # every worker when it verifies a token; dropped once they have expired
+    token_id = Column(String, primary_key=True)
+    expires_at = Column(Integer, nullable=False, index=True)  # Unix timestamp
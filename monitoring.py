@@ -1,23 +1,123 @@
-import psutil
 import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+from backend.logs import get_logger
+
+# psutil is imported by the functions that use it, once host metrics are first needed
+
+logger = get_logger(__name__)
+events_logger = get_logger("backend.events")
+
+class HostMetricsSampler:
+    """Samples host CPU, RAM, disk and network usage in a background thread.
+
+    Samples are kept in a small ring buffer so request handlers can return the
+    latest one instantly instead of blocking on psutil.
+    """
+
+    def __init__(self, interval: float = 2.0, history: int = 150):
+        self.interval = interval
+        self.samples = deque(maxlen=history)
+        self._last_net = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        import psutil
+        # Prime cpu_percent so the first sample measures since now instead of since boot
+        psutil.cpu_percent(interval=None, percpu=True)
+        self._last_net = (time.monotonic(), psutil.net_io_counters())
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="host-metrics-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.samples.append(self.sample())
+            except Exception as e:
+                logger.warning("Host metrics sampling failed: %s", e)
+
+    def sample(self) -> Dict[str, Any]:
+        """Take one sample; CPU usage and network rates cover the time since the previous one"""
+        import psutil
+        per_core = psutil.cpu_percent(interval=None, percpu=True)
+        now = time.monotonic()
+        net = psutil.net_io_counters()
+        sent_rate = recv_rate = 0.0
+        if self._last_net is not None:
+            last_time, last_net = self._last_net
+            elapsed = now - last_time
+            if elapsed > 0:
+                # Counters can wrap or reset, never report negative rates
+                sent_rate = max(0, net.bytes_sent - last_net.bytes_sent) / elapsed
+                recv_rate = max(0, net.bytes_recv - last_net.bytes_recv) / elapsed
+        self._last_net = (now, net)
+        return {
+            "timestamp": time.time(),
+            "cpu_usage": round(sum(per_core) / len(per_core), 1) if per_core else 0.0,
+            "cpu_per_core": per_core,
+            "ram_usage": get_ram_usage(),
+            "disk_usage": get_disk_usage(),
+            "network_activity": {
+                "bytes_sent": net.bytes_sent,
+                "bytes_recv": net.bytes_recv,
+                "bytes_sent_per_sec": round(sent_rate, 1),
+                "bytes_recv_per_sec": round(recv_rate, 1),
+            },
+        }
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        return self.samples[-1] if self.samples else None
+
+    def window(self, count: int) -> List[Dict[str, Any]]:
+        """Return up to `count` most recent samples, oldest first"""
+        if count <= 0:
+            return []
+        return list(self.samples)[-count:]
+
+sampler = HostMetricsSampler(
+    interval=float(os.environ.get("METRICS_SAMPLE_INTERVAL", "2")),
+    history=int(os.environ.get("METRICS_HISTORY", "150")),
+)
+
+def get_host_metrics() -> Dict[str, Any]:
+    """Latest host sample, taking one on the spot if the sampler has none yet"""
+    latest = sampler.latest()
+    if latest is None:
+        latest = sampler.sample()
+        sampler.samples.append(latest)
+    return latest
 
 def get_cpu_usage():
-    return psutil.cpu_percent(interval=1)
+    return get_host_metrics()["cpu_usage"]
 
 def get_ram_usage():
+    import psutil
     ram = psutil.virtual_memory()
     return ram.percent
 
 def get_disk_usage():
+    import psutil
     disk = psutil.disk_usage('/')
     return disk.percent
 
 def get_network_activity():
+    import psutil
     net = psutil.net_io_counters()
     return {"bytes_sent": net.bytes_sent, "bytes_recv": net.bytes_recv}
 
 def log_event(message, level=logging.INFO):
-    logging.log(level, message)
+    events_logger.log(level, message)
@@ -0,0 +1,166 @@
+# On-demand sampling profiler for live instances
+#
+# A background thread snapshots the stacks of all threads with sys._current_frames()
+# at a fixed interval, so the profiled code runs unmodified. Event-loop lag is
+# measured by a coroutine that checks how late its sleeps wake up, and slow
+# callbacks are those the event-loop thread was seen running for several
+# consecutive samples.
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+MAX_DURATION = 60.0
+# Coarsest sampling interval accepted by /admin/profile (seconds)
+MAX_INTERVAL = 1.0
+_profile_lock = asyncio.Lock()
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def _running_callback(frame) -> Optional[tuple]:
+    """Identify the callback the event loop is running: (handle frame id, description)"""
+    chain = []
+    while frame is not None:
+        if frame.f_code.co_name == "_run" and frame.f_code.co_filename.endswith("events.py"):
+            # Describe the callback by where it entered and where it currently is, skipping asyncio internals
+            outside = [f for f in reversed(chain) if "asyncio" not in f.f_code.co_filename] or chain[-1:] or [frame]
+            if len(outside) > 1:
+                return id(frame), f"{_frame_name(outside[0])} > ... > {_frame_name(outside[-1])}"
+            return id(frame), _frame_name(outside[0])
+        chain.append(frame)
+        frame = frame.f_back
+    return None
+
+
+def _stack_key(frame, loop_thread_id: int, thread_id: int, thread_names: Dict[int, str]) -> str:
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    names.reverse()
+    thread = "event-loop" if thread_id == loop_thread_id else thread_names.get(thread_id, f"thread-{thread_id}")
+    return ";".join([thread] + names)
+
+
+def _sample_stacks(duration: float, interval: float, loop_thread_id: int, stop: threading.Event,
+                   stacks: Counter, callbacks: List[Dict[str, Any]], slow_callback: float) -> None:
+    me = threading.get_ident()
+    deadline = time.monotonic() + duration
+    current = None  # [handle frame id, description, first seen, last seen]
+
+    def finish(run):
+        seconds = run[3] - run[2] + interval
+        if seconds >= slow_callback:
+            callbacks.append({"callback": run[1], "seconds": round(seconds, 4)})
+
+    while not stop.is_set() and time.monotonic() < deadline:
+        now = time.monotonic()
+        thread_names = {t.ident: t.name for t in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == me:
+                continue
+            stacks[_stack_key(frame, loop_thread_id, thread_id, thread_names)] += 1
+            if thread_id == loop_thread_id:
+                running = _running_callback(frame)
+                if current is not None and (running is None or running[0] != current[0]):
+                    finish(current)
+                    current = None
+                if running is not None:
+                    if current is None:
+                        current = [running[0], running[1], now, now]
+                    else:
+                        current[3] = now
+        if stop.wait(interval):
+            break
+    if current is not None:
+        finish(current)
+
+
+async def _measure_loop_lag(duration: float, interval: float) -> List[float]:
+    lags = []
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        started = time.monotonic()
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, time.monotonic() - started - interval))
+    return lags
+
+
+async def profile(duration: float = 5.0, interval: float = 0.005, slow_callback: float = 0.05) -> Dict[str, Any]:
+    """Profile all threads and the running event loop for `duration` seconds.
+
+    Only one profile runs at a time; a second request raises RuntimeError.
+    """
+    if _profile_lock.locked():
+        raise RuntimeError("A profile is already running")
+    duration = max(0.1, min(duration, MAX_DURATION))
+    async with _profile_lock:
+        stacks: Counter = Counter()
+        callbacks: List[Dict[str, Any]] = []
+        stop = threading.Event()
+        sampler = threading.Thread(
+            target=_sample_stacks,
+            args=(duration, interval, threading.get_ident(), stop, stacks, callbacks, slow_callback),
+            name="profiler-sampler", daemon=True
+        )
+        started = time.monotonic()
+        try:
+            sampler.start()
+            lags = await _measure_loop_lag(duration, 0.05)
+        finally:
+            stop.set()
+            await asyncio.to_thread(sampler.join)
+        elapsed = time.monotonic() - started
+
+    lags.sort()
+    return {
+        "duration": round(elapsed, 3),
+        "interval": interval,
+        "samples": sum(stacks.values()),
+        "stacks": stacks,
+        "loop_lag": {
+            "samples": len(lags),
+            "mean": round(sum(lags) / len(lags), 6) if lags else 0.0,
+            "p99": round(lags[min(len(lags) - 1, int(len(lags) * 0.99))], 6) if lags else 0.0,
+            "max": round(lags[-1], 6) if lags else 0.0,
+        },
+        "slow_callbacks": sorted(callbacks, key=lambda c: c["seconds"], reverse=True)[:20],
+    }
+
+
+def collapsed(stacks: Counter, skip_idle: bool = True) -> str:
+    """Render stacks in the collapsed format used by flamegraph.pl and speedscope"""
+    lines = []
+    for stack, count in stacks.most_common():
+        if skip_idle and _is_idle(stack):
+            continue
+        lines.append(f"{stack} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def _is_idle(stack: str) -> bool:
+    # Threads parked waiting for work rather than running code
+    leaf = stack.rsplit(";", 1)[-1]
+    return leaf.startswith(("wait (threading.py", "select (selectors.py", "_worker (thread.py", "get (queue.py"))
+
+
+def top_functions(stacks: Counter, limit: int = 25, skip_idle: bool = True) -> List[Dict[str, Any]]:
+    """Functions that were on-CPU (at the top of a stack) most often"""
+    leaves: Counter = Counter()
+    total = 0
+    for stack, count in stacks.items():
+        if skip_idle and _is_idle(stack):
+            continue
+        leaves[stack.rsplit(";", 1)[-1]] += count
+        total += count
+    return [
+        {"function": name, "samples": count, "percent": round(100.0 * count / total, 1)}
+        for name, count in leaves.most_common(limit)
+    ]
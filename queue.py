@@ -1,74 +1,84 @@
 # Placeholder for RabbitMQ/Kafka integration
 import asyncio
+import contextvars
 from datetime import datetime
 from typing import Dict, Any, List
-import threading
 import time
 
-# In-memory task queue for development
-tasks_queue = []
+from backend import instrumentation, tracing
+from backend.logs import get_logger
+
+logger = get_logger(__name__)
+
+# In-memory task queue for development, consumed by a task on the event loop
+tasks_queue: asyncio.Queue = asyncio.Queue()
 running_tasks = {}
+instrumentation.task_queue_depth.set_function(lambda: tasks_queue.qsize())
+_processor = None
 
 def send_task(task_name, task_data):
-    print(f"Sending task {task_name} with data {task_data} to queue")
+    logger.debug("Sending task %s with data %s to queue", task_name, task_data)
     # In a real application, this would send the task to RabbitMQ/Kafka
     return True
 
 def add_task(task_id: int, server_id: int, command: str):
-    """Add a task to the queue"""
+    """Add a task to the queue (must be called from the event loop)"""
+    global _processor
     task = {
         "id": task_id,
         "server_id": server_id,
         "command": command,
         "status": "pending",
-        "created_at": datetime.utcnow().isoformat()
+        "created_at": datetime.utcnow().isoformat(),
+        "enqueued_at": time.monotonic()
     }
-    tasks_queue.append(task)
-    print(f"Added task {task_id} to queue: {command}")
+    tasks_queue.put_nowait(task)
+    logger.debug("Added task %s to queue: %s", task_id, command)
     
-    # Start the task processor if it's not already running
-    if not hasattr(add_task, "processor_running") or not add_task.processor_running:
-        add_task.processor_running = True
-        threading.Thread(target=process_tasks, daemon=True).start()
+    # Start the task processor if it's not already running. It gets an empty context
+    # so its spans are not attached to the request that happened to start it.
+    if _processor is None or _processor.done():
+        _processor = contextvars.Context().run(asyncio.create_task, process_tasks())
     
     return task
 
-def process_tasks():
+async def process_tasks():
     """Process tasks in the queue"""
     from backend import database, crud
+    from backend.mcp_manager import mcp_manager
     
-    print("Task processor started")
+    logger.info("Task processor started")
     
     while True:
-        if tasks_queue:
-            task = tasks_queue.pop(0)
-            print(f"Processing task {task['id']}: {task['command']}")
+        task = await tasks_queue.get()
+        queue_wait = time.monotonic() - task["enqueued_at"]
+        instrumentation.task_wait_duration.observe(queue_wait)
+        logger.debug("Processing task %s: %s", task['id'], task['command'])
+        
+        with tracing.span("task.run", task_id=task['id'], server_id=task['server_id']) as task_span:
+            tracing.record_span("task.queue_wait", queue_wait)
             
-            # Update task status to running
-            db = database.SessionLocal()
-            try:
-                db_task = crud.get_task(db, task_id=task['id'])
-                if db_task:
-                    # Update task status to running
-                    crud.update_task_status(db, task['id'], "running")
-                    
-                    # Execute the command
-                    from backend.mcp_manager import mcp_manager
-                    result = mcp_manager.execute_command(db, task['server_id'], task['command'])
-                    
-                    # Update task status based on result
-                    status = "completed" if result["success"] else "failed"
-                    crud.update_task_status(db, task['id'], status, result.get("output", ""))
-                    
-                    print(f"Task {task['id']} completed with status: {status}")
-            except Exception as e:
-                print(f"Error processing task {task['id']}: {e}")
+            async with database.AsyncSessionLocal() as db:
                 try:
-                    crud.update_task_status(db, task['id'], "failed", str(e))
-                except:
-                    pass
-            finally:
-                db.close()
-        
-        # Sleep for a short time before checking for more tasks
-        time.sleep(1)
+                    db_task = await crud.get_task(db, task_id=task['id'])
+                    if db_task:
+                        # Update task status to running
+                        await crud.update_task_status(db, task['id'], "running")
+                        
+                        # Execute the command
+                        result = await mcp_manager.execute_command(db, task['server_id'], task['command'])
+                        
+                        # Update task status based on result, with the time spent per stage
+                        status = "completed" if result["success"] else "failed"
+                        timings = task_span.breakdown()
+                        timings["total"] = round(time.perf_counter() - task_span.started + queue_wait, 6)
+                        await crud.update_task_status(db, task['id'], status, result.get("output", ""), timings=timings)
+                        
+                        logger.debug("Task %s completed with status: %s", task['id'], status)
+                except Exception as e:
+                    logger.error("Error processing task %s: %s", task['id'], e, exc_info=True)
+                    try:
+                        await db.rollback()
+                        await crud.update_task_status(db, task['id'], "failed", str(e))
+                    except Exception:
+                        pass
@@ -0,0 +1,191 @@
+import math
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from backend.logs import get_logger
+
+logger = get_logger("backend.ratelimit")
+
+# Used for any limit not set under "rate_limits" in config.json
+DEFAULT_LIMITS = {
+    "global": {"rate": 500, "burst": 1000},
+    "per_user": {"rate": 50, "burst": 100},
+    "per_server": {"default": {"rate": 100, "burst": 200}},
+    "max_inflight": 256,
+    "max_queue_depth": 1000,
+}
+
+# Buckets are swept this often (seconds). A bucket that has refilled to its burst
+# behaves like a new one, so it is dropped and the bucket map stays bounded by
+# the users and servers active within the interval.
+SWEEP_INTERVAL = 60.0
+
+
+def _bucket_limit(override: Any, default: Dict[str, float], name: str) -> Dict[str, float]:
+    """A bucket's {"rate", "burst"}, each taken from `override` when set there"""
+    if not isinstance(override, dict):
+        if override is not None:
+            logger.warning("Ignoring rate limit %s: expected an object", name)
+        return dict(default)
+    unknown = set(override) - {"rate", "burst"}
+    if unknown:
+        logger.warning("Ignoring unknown keys in rate limit %s: %s", name, ", ".join(sorted(unknown)))
+    return {key: override.get(key, value) for key, value in default.items()}
+
+
+def merge_limits(config: Dict[str, Any]) -> Dict[str, Any]:
+    """DEFAULT_LIMITS with the "rate_limits" section of config.json laid over it.
+
+    Each bucket is merged key by key, so a partial override such as
+    {"per_user": {"rate": 5}} keeps the default burst. Per-server types
+    missing a key take it from the (merged) "default" entry. Unknown keys are
+    logged and ignored.
+    """
+    unknown = set(config) - set(DEFAULT_LIMITS)
+    if unknown:
+        logger.warning("Ignoring unknown rate limits: %s", ", ".join(sorted(unknown)))
+    limits = {
+        "global": _bucket_limit(config.get("global"), DEFAULT_LIMITS["global"], "global"),
+        "per_user": _bucket_limit(config.get("per_user"), DEFAULT_LIMITS["per_user"], "per_user"),
+        "max_inflight": config.get("max_inflight", DEFAULT_LIMITS["max_inflight"]),
+        "max_queue_depth": config.get("max_queue_depth", DEFAULT_LIMITS["max_queue_depth"]),
+    }
+    per_server = config.get("per_server") or {}
+    if not isinstance(per_server, dict):
+        logger.warning("Ignoring rate limit per_server: expected an object")
+        per_server = {}
+    default = _bucket_limit(per_server.get("default"), DEFAULT_LIMITS["per_server"]["default"], "per_server.default")
+    limits["per_server"] = {"default": default}
+    for server_type, override in per_server.items():
+        if server_type != "default":
+            limits["per_server"][server_type] = _bucket_limit(override, default, f"per_server.{server_type}")
+    return limits
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at `rate` tokens/s up to `burst` tokens"""
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float, now: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic() if now is None else now
+
+    def is_full(self, now: float) -> bool:
+        return self.tokens + (now - self.updated) * self.rate >= self.burst
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self) -> float:
+        """Seconds until one token is available (0 if one is available now)"""
+        if self.tokens >= 1:
+            return 0.0
+        if self.rate <= 0:
+            return float("inf")
+        return (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """Token-bucket limits per server, per user and globally, plus load shedding"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._config = None
+        self._limits = DEFAULT_LIMITS
+        self._buckets: Dict[Any, TokenBucket] = {}
+        self._next_sweep = time.monotonic() + SWEEP_INTERVAL
+        self.inflight = 0
+        self.stats = {
+            "allowed": 0,
+            "rejected_global": 0,
+            "rejected_user": 0,
+            "rejected_server": 0,
+            "shed_inflight": 0,
+            "shed_queue": 0,
+            "buckets_evicted": 0,
+        }
+
+    def configure(self, config: Optional[Dict[str, Any]]) -> None:
+        """Apply the "rate_limits" section of config.json (no-op if unchanged)"""
+        if config is self._config:
+            return
+        limits = merge_limits(config or {})
+        with self._lock:
+            self._limits = limits
+            self._config = config
+            self._buckets.clear()
+
+    def _bucket(self, key, limit: Dict[str, float], now: float) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(limit["rate"], limit["burst"], now)
+            self._buckets[key] = bucket
+        return bucket
+
+    def _sweep(self, now: float) -> None:
+        full = [key for key, bucket in self._buckets.items() if bucket.is_full(now)]
+        for key in full:
+            del self._buckets[key]
+        self.stats["buckets_evicted"] += len(full)
+        self._next_sweep = now + SWEEP_INTERVAL
+
+    def try_acquire(self, server_id: int, server_type: Optional[str], user_key: str, queue_depth: int = 0) -> Optional[Dict[str, Any]]:
+        """Admit a request, or return a rejection with status code and Retry-After hint.
+
+        Admitted requests count as in-flight until `release()` is called.
+        """
+        with self._lock:
+            limits = self._limits
+            # Shed load before queues grow long enough for latency to collapse
+            if self.inflight >= limits["max_inflight"]:
+                self.stats["shed_inflight"] += 1
+                return {"status_code": 503, "message": "Server is overloaded, try again later", "retry_after": 1}
+            if queue_depth >= limits["max_queue_depth"]:
+                self.stats["shed_queue"] += 1
+                return {"status_code": 503, "message": "Task queue is full, try again later", "retry_after": 5}
+
+            now = time.monotonic()
+            if now >= self._next_sweep:
+                self._sweep(now)
+            server_limits = limits["per_server"]
+            server_limit = server_limits.get((server_type or "").lower(), server_limits["default"])
+            buckets = [
+                ("global", self._bucket("global", limits["global"], now)),
+                ("user", self._bucket(("user", user_key), limits["per_user"], now)),
+                ("server", self._bucket(("server", server_id), server_limit, now)),
+            ]
+            wait, scope = 0.0, None
+            for name, bucket in buckets:
+                bucket.refill(now)
+                if bucket.wait_time() > wait:
+                    wait, scope = bucket.wait_time(), name
+            if scope is not None:
+                self.stats[f"rejected_{scope}"] += 1
+                return {
+                    "status_code": 429,
+                    "message": f"Rate limit exceeded ({scope})",
+                    "retry_after": max(1, math.ceil(wait)) if wait != float("inf") else 60,
+                }
+
+            for _, bucket in buckets:
+                bucket.tokens -= 1
+            self.inflight += 1
+            self.stats["allowed"] += 1
+            return None
+
+    def release(self) -> None:
+        """Mark an admitted request as finished"""
+        with self._lock:
+            self.inflight -= 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, "inflight": self.inflight, "buckets": len(self._buckets)}
+
+
+# Create a singleton instance
+rate_limiter = RateLimiter()
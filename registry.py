@@ -0,0 +1,166 @@
+# In-memory registry of MCP servers
+#
+# Loaded at startup and kept current by the crud layer, which writes each
+# committed server mutation through to it and reloads it when the servers
+# version in the database shows that another worker process changed servers.
+# Lookups by id or name and listings do not read the servers table. Records are
+# replaced rather than modified, so a record a caller holds is a consistent
+# snapshot of one committed state.
+#
+# Values derived from the whole registry, such as serialized listings, can be
+# kept with view(); they are reused until the next change to any server.
+from bisect import bisect_right, insort
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+SERVER_FIELDS = (
+    "id", "name", "host", "port", "type", "api_key", "status", "connection_id", "metrics",
+    "connection_errors", "command_errors", "last_connected", "last_error",
+)
+
+# Views are keyed by request parameters, so bound how many are kept at once
+MAX_VIEWS = 256
+
+
+class ServerRecord:
+    """Compact copy of an MCPServer row"""
+    __slots__ = SERVER_FIELDS
+
+    def __init__(self, **fields):
+        for name in SERVER_FIELDS:
+            setattr(self, name, fields.get(name))
+
+    @classmethod
+    def from_row(cls, row) -> "ServerRecord":
+        return cls(**{name: getattr(row, name) for name in SERVER_FIELDS})
+
+    def replace(self, **changes) -> "ServerRecord":
+        fields = self.to_dict()
+        fields.update((name, value) for name, value in changes.items() if name in SERVER_FIELDS)
+        return ServerRecord(**fields)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in SERVER_FIELDS}
+
+
+class ServerRegistry:
+    def __init__(self):
+        self.loaded = False
+        self._by_id: Dict[int, ServerRecord] = {}
+        self._ids_by_name: Dict[str, int] = {}
+        self._ids: List[int] = []  # sorted, for listings in id order
+        self.version = 0
+        # Servers version in the database that the contents match, and when that was last checked
+        self.db_version = 0
+        self.checked_at = 0.0
+        self._views: Dict[Hashable, Any] = {}
+        self.view_stats = {"hits": 0, "misses": 0}
+        self._listeners: List[Callable[[int], None]] = []
+
+    def subscribe(self, listener: Callable[[int], None]) -> None:
+        """Call `listener(server_id)` after every change to a server made through put or remove"""
+        self._listeners.append(listener)
+
+    def _changed(self) -> None:
+        self.version += 1
+        self._views.clear()
+
+    async def load(self, db) -> None:
+        """Replace the registry contents with all servers in the database"""
+        from sqlalchemy import select
+        from backend import models
+        rows = (await db.scalars(select(models.MCPServer).order_by(models.MCPServer.id))).all()
+        self._by_id = {row.id: ServerRecord.from_row(row) for row in rows}
+        self._ids_by_name = {record.name: record.id for record in self._by_id.values()}
+        self._ids = sorted(self._by_id)
+        self.loaded = True
+        self._changed()
+
+    def get(self, server_id: int) -> Optional[ServerRecord]:
+        return self._by_id.get(server_id)
+
+    def get_by_name(self, name: str) -> Optional[ServerRecord]:
+        server_id = self._ids_by_name.get(name)
+        return self._by_id.get(server_id) if server_id is not None else None
+
+    def list(
+        self,
+        limit: Optional[int] = None,
+        after_id: Optional[int] = None,
+        status: Optional[bool] = None,
+        server_type: Optional[str] = None
+    ) -> List[ServerRecord]:
+        """Servers ordered by id, starting after `after_id`"""
+        start = bisect_right(self._ids, after_id) if after_id is not None else 0
+        records = []
+        for server_id in self._ids[start:]:
+            record = self._by_id[server_id]
+            if status is not None and record.status != status:
+                continue
+            if server_type is not None and record.type != server_type:
+                continue
+            records.append(record)
+            if limit is not None and len(records) >= limit:
+                break
+        return records
+
+    def put(self, row, notify: bool = True) -> ServerRecord:
+        """Store the committed state of a server (an ORM row or a record).
+
+        `notify` is False for changes that listeners already know about.
+        """
+        record = row if isinstance(row, ServerRecord) else ServerRecord.from_row(row)
+        previous = self._by_id.get(record.id)
+        if previous is None:
+            insort(self._ids, record.id)
+        elif previous.name != record.name:
+            self._ids_by_name.pop(previous.name, None)
+        self._by_id[record.id] = record
+        self._ids_by_name[record.name] = record.id
+        self._changed()
+        if notify:
+            self._notify(record.id)
+        return record
+
+    def update(self, server_id: int, **changes) -> Optional[ServerRecord]:
+        record = self._by_id.get(server_id)
+        if record is None:
+            return None
+        return self.put(record.replace(**changes))
+
+    def remove(self, server_id: int, notify: bool = True) -> None:
+        record = self._by_id.pop(server_id, None)
+        if record is not None:
+            self._ids_by_name.pop(record.name, None)
+            del self._ids[bisect_right(self._ids, server_id) - 1]
+            self._changed()
+            if notify:
+                self._notify(server_id)
+
+    def _notify(self, server_id: int) -> None:
+        for listener in self._listeners:
+            listener(server_id)
+
+    def ids(self) -> List[int]:
+        return list(self._ids)
+
+    def view(self, key: Hashable, build: Callable[[], Any]) -> Any:
+        """The value `build` derives from the current contents, built once per key
+        and reused until the registry changes
+        """
+        try:
+            value = self._views[key]
+            self.view_stats["hits"] += 1
+            return value
+        except KeyError:
+            pass
+        self.view_stats["misses"] += 1
+        if len(self._views) >= MAX_VIEWS:
+            self._views.clear()
+        value = self._views[key] = build()
+        return value
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+
+registry = ServerRegistry()
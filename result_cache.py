@@ -0,0 +1,137 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# Used for any setting not given under "command_cache" in config.json
+DEFAULT_SETTINGS = {
+    "max_entries": 1024,
+    "default_ttl": 30,  # Seconds; 0 disables caching for commands without their own TTL
+    "ttls": {},  # Command or tool name -> TTL in seconds
+}
+
+
+def split_command(command: str) -> Tuple[str, str]:
+    """Split a command into its lower-cased verb (command or tool name) and arguments"""
+    parts = command.strip().split(" ", 1)
+    return parts[0].lower(), parts[1] if len(parts) > 1 else ""
+
+
+class ResultCache:
+    """Size-bounded LRU cache of command results with per-command TTLs.
+
+    Entries are keyed by (server_id, command, hash of arguments). Writes to a
+    server move it to a new generation, which drops its entries and keeps results
+    that were already in flight from being stored afterwards.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._config = None
+        self._settings = DEFAULT_SETTINGS
+        self._entries: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+        self._server_keys: Dict[int, set] = {}
+        self._generations: Dict[int, int] = {}
+        self._last_generation = 0
+        # Generation of the servers without an entry in _generations
+        self._base_generation = 0
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def configure(self, config: Optional[Dict[str, Any]]) -> None:
+        """Apply the "command_cache" section of config.json (no-op if unchanged)"""
+        if config is self._config:
+            return
+        with self._lock:
+            settings = dict(DEFAULT_SETTINGS)
+            settings.update(config or {})
+            self._settings = settings
+            self._config = config
+            while len(self._entries) > settings["max_entries"]:
+                self._evict_oldest()
+
+    def ttl_for(self, command: str) -> float:
+        verb, _ = split_command(command)
+        return self._settings["ttls"].get(verb, self._settings["default_ttl"])
+
+    @staticmethod
+    def make_key(server_id: int, command: str) -> Tuple[int, str, str]:
+        verb, args = split_command(command)
+        return (server_id, verb, hashlib.sha1(args.encode()).hexdigest())
+
+    def generation(self, server_id: int) -> int:
+        return self._generations.get(server_id, self._base_generation)
+
+    def get(self, server_id: int, command: str) -> Optional[Any]:
+        key = self.make_key(server_id, command)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            expires_at, result = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.stats["expirations"] += 1
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return result
+
+    def set(self, server_id: int, command: str, result: Any, generation: Optional[int] = None) -> bool:
+        """Store a result unless its TTL is 0 or the server was written to since `generation`"""
+        ttl = self.ttl_for(command)
+        if ttl <= 0:
+            return False
+        key = self.make_key(server_id, command)
+        with self._lock:
+            if generation is not None and generation != self.generation(server_id):
+                return False
+            self._entries[key] = (time.monotonic() + ttl, result)
+            self._entries.move_to_end(key)
+            self._server_keys.setdefault(server_id, set()).add(key)
+            while len(self._entries) > self._settings["max_entries"]:
+                self._evict_oldest()
+        return True
+
+    def invalidate_server(self, server_id: int) -> None:
+        """Drop every cached result for a server"""
+        with self._lock:
+            self._last_generation += 1
+            self._generations[server_id] = self._last_generation
+            self._drop_entries(server_id)
+
+    def forget_server(self, server_id: int) -> None:
+        """Drop every cached result for a server that was deleted or released, and its generation"""
+        with self._lock:
+            self._last_generation += 1
+            self._generations.pop(server_id, None)
+            # Servers without an entry move on together, so results in flight for this one are still rejected
+            self._base_generation = self._last_generation
+            self._drop_entries(server_id)
+
+    def _drop_entries(self, server_id: int) -> None:
+        for key in self._server_keys.pop(server_id, ()):
+            self._entries.pop(key, None)
+        self.stats["invalidations"] += 1
+
+    def _remove(self, key) -> None:
+        self._entries.pop(key, None)
+        keys = self._server_keys.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+
+    def _evict_oldest(self) -> None:
+        key, _ = self._entries.popitem(last=False)
+        self._server_keys.get(key[0], set()).discard(key)
+        self.stats["evictions"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "entries": len(self._entries),
+                "hit_rate": self.stats["hits"] / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,301 @@
+# Task history retention and archival
+#
+# Finished tasks that fall outside the retention policy are moved out of the
+# database into gzip-compressed NDJSON files partitioned by creation day
+# (<archive_dir>/tasks-YYYY-MM-DD.ndjson.gz), where GET /tasks/archive can still
+# query them. A background compactor works in small batches, each deleted and
+# appended to the archive in its own short write transaction, so the writer is
+# never held for long.
+#
+# The delete repeats the status condition and archives the rows it actually
+# removed, so a task re-run between selecting and deleting a batch is kept. With
+# several workers, a lock file in the archive directory lets one of them run a
+# pass at a time.
+import asyncio
+import contextvars
+import glob
+import gzip
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, select, text
+
+from backend import crud, database, models
+from backend.logs import get_logger
+
+logger = get_logger(__name__)
+
+# Overridden by "task_retention" in config.json
+DEFAULT_POLICY = {
+    "enabled": False,  # deleting task history is opt-in
+    "statuses": ["completed", "failed"],  # only tasks in these states ever expire
+    "max_age_days": 30,  # days, or {"completed": 7, "failed": 30}; null keeps tasks regardless of age
+    "max_per_server": 1000,  # newest finished tasks kept per server; null for no limit
+    "interval": 300,  # seconds between compaction passes
+    "batch_size": 500,  # tasks archived and deleted per transaction
+    "archive_dir": "task_archive",
+}
+
+ARCHIVE_PREFIX = "tasks-"
+ARCHIVE_SUFFIX = ".ndjson.gz"
+LOCK_FILE = ".compactor.lock"
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """A datetime as naive UTC, the way created_at is stored"""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def task_to_dict(task) -> Dict[str, Any]:
+    return {
+        "id": task.id,
+        "name": task.name,
+        "command": task.command,
+        "server_id": task.server_id,
+        "status": task.status,
+        "created_at": _iso(task.created_at),
+        "last_run": _iso(task.last_run),
+        "result": task.result,
+        "timings": task.timings,
+    }
+
+
+def _partition_path(archive_dir: str, day: str) -> str:
+    return os.path.join(archive_dir, f"{ARCHIVE_PREFIX}{day}{ARCHIVE_SUFFIX}")
+
+
+def write_archive(archive_dir: str, rows: List[Dict[str, Any]]) -> None:
+    """Append rows to their day partitions (each append adds a gzip member)"""
+    os.makedirs(archive_dir, exist_ok=True)
+    by_day: Dict[str, List[str]] = {}
+    for row in rows:
+        day = (row["created_at"] or "undated")[:10]
+        by_day.setdefault(day, []).append(json.dumps(row, default=str))
+    for day, lines in by_day.items():
+        with gzip.open(_partition_path(archive_dir, day), "at", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+
+@contextmanager
+def _pass_lock(archive_dir: str) -> Iterator[bool]:
+    """Hold the archive's lock file for a pass; yields False if another process holds it"""
+    os.makedirs(archive_dir, exist_ok=True)
+    with open(os.path.join(archive_dir, LOCK_FILE), "a+b") as f:
+        try:
+            if os.name == "nt":
+                import msvcrt
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            yield False
+            return
+        # Closing the file releases the lock, also when the process dies
+        yield True
+
+
+def list_partitions(archive_dir: str) -> List[Dict[str, Any]]:
+    partitions = []
+    for path in sorted(glob.glob(os.path.join(archive_dir, f"{ARCHIVE_PREFIX}*{ARCHIVE_SUFFIX}"))):
+        name = os.path.basename(path)
+        partitions.append({"day": name[len(ARCHIVE_PREFIX):-len(ARCHIVE_SUFFIX)], "bytes": os.path.getsize(path)})
+    return partitions
+
+
+def read_archive(
+    archive_dir: str,
+    limit: int = 100,
+    after: Optional[Tuple[datetime, int]] = None,
+    server_id: Optional[int] = None,
+    status: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None
+) -> List[Dict[str, Any]]:
+    """Archived tasks ordered by (created_at, id), starting after the `after` key.
+
+    Only the partitions of days in the requested range are opened. Times with a
+    time zone are compared in UTC.
+    """
+    created_after, created_before = _naive_utc(created_after), _naive_utc(created_before)
+    if after is not None:
+        after = (_naive_utc(after[0]), after[1])
+    lower_bounds = [d for d in (created_after, after[0] if after else None) if d is not None]
+    first_day = max(lower_bounds).date().isoformat() if lower_bounds else None
+    last_day = created_before.date().isoformat() if created_before else None
+    rows: List[Dict[str, Any]] = []
+    seen = set()
+    for partition in list_partitions(archive_dir):
+        day = partition["day"]
+        if (first_day and day < first_day) or (last_day and day > last_day):
+            continue
+        matches = []
+        with gzip.open(_partition_path(archive_dir, day), "rt", encoding="utf-8") as f:
+            for line in f:
+                row = json.loads(line)
+                # A batch archived again after an interrupted delete appears twice
+                if row["id"] in seen:
+                    continue
+                seen.add(row["id"])
+                created_at = datetime.fromisoformat(row["created_at"]) if row["created_at"] else datetime.min
+                if server_id is not None and row["server_id"] != server_id:
+                    continue
+                if status is not None and row["status"] != status:
+                    continue
+                if created_after is not None and created_at < created_after:
+                    continue
+                if created_before is not None and created_at >= created_before:
+                    continue
+                if after is not None and (created_at, row["id"]) <= after:
+                    continue
+                matches.append((created_at, row["id"], row))
+        matches.sort(key=lambda match: match[:2])
+        rows.extend(row for _, _, row in matches)
+        # Partitions are read in day order, so later ones cannot sort before these
+        if len(rows) >= limit:
+            break
+    return rows[:limit]
+
+
+class Compactor:
+    """Moves expired tasks to the archive in the background"""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self._settings: Callable[[], Dict[str, Any]] = dict
+        self.stats = {"passes": 0, "archived": 0, "skipped_passes": 0, "errors": 0, "last_pass": None, "last_duration": None}
+
+    def policy(self) -> Dict[str, Any]:
+        return {**DEFAULT_POLICY, **(self._settings().get("task_retention") or {})}
+
+    def start(self, settings: Callable[[], Dict[str, Any]]) -> None:
+        """Run compaction passes every `interval` seconds; `settings` returns the config.json document"""
+        self._settings = settings
+        if self._task is None or self._task.done():
+            # Empty context so the passes' spans are not attached to the caller
+            self._task = contextvars.Context().run(asyncio.create_task, self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            policy = self.policy()
+            if policy["enabled"]:
+                try:
+                    await self.run_once()
+                except Exception as e:
+                    self.stats["errors"] += 1
+                    logger.error("Task compaction failed: %s", e, exc_info=True)
+            await asyncio.sleep(policy["interval"])
+
+    async def run_once(self) -> Dict[str, Any]:
+        """Archive and delete all expired tasks, one batch per transaction"""
+        async with self._lock:
+            policy = self.policy()
+            with _pass_lock(policy["archive_dir"]) as acquired:
+                if not acquired:
+                    self.stats["skipped_passes"] += 1
+                    return {"archived": 0, "duration": 0.0, "skipped": "another process is compacting"}
+                return await self._run_pass(policy)
+
+    async def _run_pass(self, policy: Dict[str, Any]) -> Dict[str, Any]:
+        started = time.monotonic()
+        archived = 0
+        # Ids already written to the archive, in case the writer retries a batch
+        written: Set[int] = set()
+        while True:
+            async with database.AsyncSessionLocal() as db:
+                batch = await self._expired_batch(db, policy)
+            if not batch:
+                break
+            removed = await database.writer.run(
+                lambda session: _archive_batch(session, policy, [task.id for task in batch], written)
+            )
+            archived += removed
+            await database.writer.run(_reclaim_pages)
+            # Let other writers in between batches
+            await asyncio.sleep(0.01)
+            if removed == 0:
+                # Every task of the batch changed meanwhile; the next pass looks again
+                break
+        self.stats["passes"] += 1
+        self.stats["archived"] += archived
+        self.stats["last_pass"] = int(time.time())
+        self.stats["last_duration"] = round(time.monotonic() - started, 3)
+        if archived:
+            logger.info("Archived %d expired tasks", archived)
+        return {"archived": archived, "duration": self.stats["last_duration"]}
+
+    async def _expired_batch(self, db, policy: Dict[str, Any]) -> List[models.Task]:
+        batch_size = policy["batch_size"]
+        statuses = policy["statuses"]
+        batch: Dict[int, models.Task] = {}
+
+        max_age = policy["max_age_days"]
+        for status in statuses:
+            days = max_age.get(status) if isinstance(max_age, dict) else max_age
+            if days is None or len(batch) >= batch_size:
+                continue
+            cutoff = datetime.utcnow() - timedelta(days=days)
+            query = select(models.Task).where(models.Task.status == status, models.Task.created_at < cutoff) \
+                .order_by(models.Task.created_at, models.Task.id).limit(batch_size - len(batch))
+            batch.update((task.id, task) for task in (await db.scalars(query)).all())
+
+        keep = policy["max_per_server"]
+        if keep is not None and len(batch) < batch_size:
+            server_ids = (await db.scalars(select(models.Task.server_id).distinct())).all()
+            for server_id in server_ids:
+                if len(batch) >= batch_size:
+                    break
+                query = select(models.Task).where(models.Task.server_id == server_id, models.Task.status.in_(statuses)) \
+                    .order_by(models.Task.created_at.desc(), models.Task.id.desc()) \
+                    .offset(keep).limit(batch_size - len(batch))
+                batch.update((task.id, task) for task in (await db.scalars(query)).all())
+        return list(batch.values())
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats["policy"] = self.policy()
+        stats["partitions"] = list_partitions(stats["policy"]["archive_dir"])
+        return stats
+
+
+async def _archive_batch(session, policy: Dict[str, Any], ids: List[int], written: Set[int]) -> int:
+    """Delete the tasks that are still finished and archive them as deleted, in one transaction"""
+    table = models.Task.__table__
+    statement = delete(table).where(table.c.id.in_(ids), table.c.status.in_(policy["statuses"])).returning(*table.c)
+    rows = [task_to_dict(row) for row in (await session.execute(statement)).all()]
+    if rows:
+        await crud.bump_version(session, "tasks")
+    # Written before the commit, so a failed write rolls the delete back
+    fresh = [row for row in rows if row["id"] not in written]
+    await asyncio.to_thread(write_archive, policy["archive_dir"], fresh)
+    written.update(row["id"] for row in fresh)
+    return len(rows)
+
+
+async def _reclaim_pages(session) -> None:
+    # Databases created with auto_vacuum=INCREMENTAL give freed pages back to the
+    # file system a bounded number at a time; on others this is a no-op
+    await session.execute(text("PRAGMA incremental_vacuum(2000)"))
+
+
+compactor = Compactor()
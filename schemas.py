@@ -36,6 +36,19 @@ class MCPServerInDBBase(MCPServerBase):
 class MCPServer(MCPServerInDBBase):
     pass
 
+# Bulk operations
+class MCPServerBulkUpdate(MCPServerUpdate):
+    id: int
+
+class BulkDelete(BaseModel):
+    ids: List[int]
+
+class BulkItemResult(BaseModel):
+    index: int
+    success: bool
+    id: Optional[int] = None
+    message: Optional[str] = None
+
 class UserBase(BaseModel):
     username: str
 
@@ -64,12 +77,16 @@ class TaskUpdate(BaseModel):
     server_id: Optional[int] = None
     status: Optional[str] = None
 
+class TaskBulkUpdate(TaskUpdate):
+    id: int
+
 class Task(TaskBase):
     id: int
     status: str
     created_at: datetime
     last_run: Optional[datetime] = None
     result: Optional[str] = None
+    timings: Optional[Dict[str, float]] = None
 
     class Config:
         orm_mode = True
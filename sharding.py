@@ -0,0 +1,320 @@
+# Server ownership across worker processes
+#
+# With several uvicorn workers, each MCP server is owned by exactly one of them:
+# the worker its id maps to on a consistent-hash ring of the live workers. Only
+# the owner holds the server's connection, command logs and cached results;
+# MCPManager operations on it that arrive at another worker are forwarded to
+# the owner over a Unix socket and run there. If the owner cannot be reached, a
+# worker that now owns the server runs the operation itself; once the request
+# has been sent it never does, as the owner may be running it.
+#
+# Workers announce themselves with a socket file in SHARD_DIR and re-read the
+# directory every SHARD_REFRESH_INTERVAL seconds. When a worker joins or leaves,
+# the ring changes, the servers that moved are released by their old owner and
+# the new owner connects them on first use. Until every worker has seen the
+# change, two of them may briefly both act as owner of a moved server.
+#
+# Each worker also tells the others which servers it wrote, so that their
+# in-memory registries follow changes made elsewhere.
+#
+# Sharding is off unless SHARD_DIR is set; every server is then local.
+import asyncio
+import contextvars
+import functools
+import glob
+import hashlib
+import os
+from bisect import bisect_right
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+import orjson
+from sqlalchemy import select
+
+from backend import database, models, tracing, utils
+from backend.logs import get_logger
+from backend.registry import registry
+
+logger = get_logger(__name__)
+
+SHARD_DIR = os.environ.get("SHARD_DIR")
+REFRESH_INTERVAL = float(os.environ.get("SHARD_REFRESH_INTERVAL", "1"))
+FORWARD_TIMEOUT = float(os.environ.get("SHARD_FORWARD_TIMEOUT", "30"))
+# Points per worker on the ring; more points spread servers more evenly
+VIRTUAL_NODES = 64
+# Registry changes are sent to the other workers in batches this often (seconds)
+CHANGE_FLUSH_DELAY = 0.05
+
+SOCKET_PREFIX = "worker-"
+SOCKET_SUFFIX = ".sock"
+
+# Set while running an operation forwarded by another worker, so it is never forwarded again
+_forwarded = contextvars.ContextVar("shard_forwarded", default=False)
+
+# MCPManager operations that may be forwarded, by name
+ROUTED_OPERATIONS: Set[str] = set()
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class HashRing:
+    """Consistent-hash ring; adding or removing a node only moves the keys of that node"""
+
+    def __init__(self, nodes: Iterable[str], virtual_nodes: int = VIRTUAL_NODES):
+        self.nodes = tuple(sorted(set(nodes)))
+        points = sorted((_hash(f"{node}#{i}"), node) for node in self.nodes for i in range(virtual_nodes))
+        self._points = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+
+    def owner(self, key: Any) -> Optional[str]:
+        if not self._points:
+            return None
+        return self._owners[bisect_right(self._points, _hash(str(key))) % len(self._points)]
+
+
+class ShardRouter:
+    def __init__(self, shard_dir: Optional[str]):
+        self.shard_dir = shard_dir
+        self.worker_id = f"{SOCKET_PREFIX}{os.getpid()}"
+        self.ring = HashRing([self.worker_id])
+        self.stats = {"forwarded": 0, "served": 0, "forward_errors": 0, "rebalances": 0, "peer_changes": 0}
+        self._manager = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._task: Optional[asyncio.Task] = None
+        self._changed: Set[int] = set()
+        self._flush: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.shard_dir is not None
+
+    def _socket_path(self, worker_id: str) -> str:
+        return os.path.join(self.shard_dir, f"{worker_id}{SOCKET_SUFFIX}")
+
+    def is_local(self, server_id: int) -> bool:
+        """Whether this worker runs operations on the server itself"""
+        if not self.enabled or _forwarded.get():
+            return True
+        return self.ring.owner(server_id) == self.worker_id
+
+    async def start(self, manager) -> None:
+        """Listen for forwarded operations and join the ring; `manager` runs them"""
+        if not self.enabled:
+            return
+        self._manager = manager
+        os.makedirs(self.shard_dir, exist_ok=True)
+        path = self._socket_path(self.worker_id)
+        if os.path.exists(path):
+            os.unlink(path)
+        self._server = await asyncio.start_unix_server(self._handle, path)
+        registry.subscribe(self._server_changed)
+        self.refresh()
+        # Empty context so the refresh loop's spans are not attached to the caller
+        self._task = contextvars.Context().run(asyncio.create_task, self._run())
+        logger.info("Worker %s joined the shard ring with %d workers", self.worker_id, len(self.ring.nodes))
+
+    async def stop(self) -> None:
+        if not self.enabled:
+            return
+        for task in (self._task, self._flush):
+            if task is not None:
+                task.cancel()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        # Leaving the directory lets the other workers take over on their next refresh
+        try:
+            os.unlink(self._socket_path(self.worker_id))
+        except OSError:
+            pass
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(REFRESH_INTERVAL)
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning("Shard membership refresh failed: %s", e)
+
+    def _live_workers(self) -> List[str]:
+        workers = []
+        for path in glob.glob(os.path.join(self.shard_dir, f"{SOCKET_PREFIX}*{SOCKET_SUFFIX}")):
+            worker_id = os.path.basename(path)[:-len(SOCKET_SUFFIX)]
+            try:
+                pid = int(worker_id[len(SOCKET_PREFIX):])
+            except ValueError:
+                continue
+            if not _pid_alive(pid):
+                # Left behind by a worker that did not shut down cleanly
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+                continue
+            workers.append(worker_id)
+        return workers
+
+    def refresh(self) -> None:
+        """Rebuild the ring from the live workers, releasing servers that moved away"""
+        ring = HashRing(self._live_workers() + [self.worker_id])
+        if ring.nodes == self.ring.nodes:
+            return
+        self.ring = ring
+        self.stats["rebalances"] += 1
+        logger.info("Shard ring changed to %d workers", len(ring.nodes))
+        for server_id in list(self._manager.connections):
+            if ring.owner(server_id) != self.worker_id:
+                self._manager.release_server(server_id)
+
+    async def forward(self, operation: str, server_id: int, args: tuple, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Run an operation on the worker owning the server"""
+        owner = self.ring.owner(server_id)
+        message = {"op": operation, "server_id": server_id, "args": args, "kwargs": kwargs}
+        with tracing.span("shard.forward", operation=operation, server_id=server_id, owner=owner):
+            try:
+                reader, writer = await asyncio.wait_for(self._connect(owner), FORWARD_TIMEOUT)
+            except (OSError, asyncio.TimeoutError) as e:
+                self.stats["forward_errors"] += 1
+                logger.warning("Could not reach %s to forward %s for server %s: %s", owner, operation, server_id, e)
+            else:
+                try:
+                    result = await asyncio.wait_for(self._exchange(reader, writer, message), FORWARD_TIMEOUT)
+                    self.stats["forwarded"] += 1
+                    return result
+                except (OSError, EOFError, ValueError, asyncio.TimeoutError) as e:
+                    # The owner may have started the operation, so running it here could run it twice
+                    self.stats["forward_errors"] += 1
+                    logger.warning("Forwarding %s for server %s to %s failed: %s", operation, server_id, owner, e)
+                    return self._unavailable(server_id)
+        # The request never reached the owner, which may have gone away; if the server is ours now, run it here
+        self.refresh()
+        if self.is_local(server_id):
+            return await self._run_local(operation, server_id, args, kwargs)
+        return self._unavailable(server_id)
+
+    @staticmethod
+    def _unavailable(server_id: int) -> Dict[str, Any]:
+        return {"success": False, "message": f"Worker owning server {server_id} is unavailable"}
+
+    async def _connect(self, worker_id: str):
+        return await asyncio.open_unix_connection(self._socket_path(worker_id))
+
+    @staticmethod
+    async def _exchange(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, message: Dict[str, Any]) -> Any:
+        try:
+            writer.write(utils.dumps_json(message) + b"\n")
+            await writer.drain()
+            line = await reader.readline()
+            if not line:
+                raise EOFError("connection closed without a reply")
+            return orjson.loads(line)
+        finally:
+            writer.close()
+
+    async def _request(self, worker_id: str, message: Dict[str, Any]) -> Any:
+        reader, writer = await self._connect(worker_id)
+        return await self._exchange(reader, writer, message)
+
+    async def _run_local(self, operation: str, server_id: int, args, kwargs) -> Dict[str, Any]:
+        token = _forwarded.set(True)
+        try:
+            async with database.AsyncSessionLocal() as db:
+                return await getattr(self._manager, operation)(db, server_id, *args, **kwargs)
+        finally:
+            _forwarded.reset(token)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            message = orjson.loads(await reader.readline())
+            if message["op"] == "servers_changed":
+                await self._apply_changes(message["server_ids"])
+                result = {"success": True}
+            elif message["op"] in ROUTED_OPERATIONS:
+                result = await self._run_local(message["op"], message["server_id"], message["args"], message["kwargs"])
+                self.stats["served"] += 1
+            else:
+                result = {"success": False, "message": f"Unknown operation {message['op']!r}"}
+        except Exception as e:
+            logger.error("Forwarded operation failed: %s", e, exc_info=True)
+            result = {"success": False, "message": f"Forwarded operation failed: {e}"}
+        try:
+            writer.write(utils.dumps_json(result) + b"\n")
+            await writer.drain()
+        finally:
+            writer.close()
+
+    def _server_changed(self, server_id: int) -> None:
+        # Collect changes for a moment and send them to the other workers together
+        self._changed.add(server_id)
+        if self._flush is None or self._flush.done():
+            self._flush = contextvars.Context().run(asyncio.create_task, self._send_changes())
+
+    async def _send_changes(self) -> None:
+        # Changes made while a batch is being sent go out with the next one
+        while self._changed:
+            await asyncio.sleep(CHANGE_FLUSH_DELAY)
+            server_ids, self._changed = sorted(self._changed), set()
+            message = {"op": "servers_changed", "server_ids": server_ids}
+            peers = [worker_id for worker_id in self.ring.nodes if worker_id != self.worker_id]
+            results = await asyncio.gather(
+                *(asyncio.wait_for(self._request(worker_id, message), FORWARD_TIMEOUT) for worker_id in peers),
+                return_exceptions=True
+            )
+            for worker_id, result in zip(peers, results):
+                if isinstance(result, BaseException):
+                    logger.warning("Could not send server changes to %s: %s", worker_id, result)
+
+    async def _apply_changes(self, server_ids: List[int]) -> None:
+        """Reload servers written by another worker into the registry"""
+        if not registry.loaded:
+            return
+        async with database.AsyncSessionLocal() as db:
+            rows = (await db.scalars(select(models.MCPServer).where(models.MCPServer.id.in_(server_ids)))).all()
+        found = {row.id: row for row in rows}
+        for server_id in server_ids:
+            if server_id in found:
+                registry.put(found[server_id], notify=False)
+            else:
+                registry.remove(server_id, notify=False)
+                self._manager.release_server(server_id)
+        self.stats["peer_changes"] += len(server_ids)
+
+    def get_stats(self) -> Dict[str, Any]:
+        owned = [server_id for server_id in registry.ids() if self.is_local(server_id)]
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "worker_id": self.worker_id,
+            "workers": list(self.ring.nodes),
+            "owned_servers": len(owned),
+        }
+
+
+router = ShardRouter(SHARD_DIR)
+
+
+def routed(method: Callable) -> Callable:
+    """Run an MCPManager operation taking (db, server_id, ...) on the worker owning
+    the server, forwarding it when that is another worker. Arguments and results
+    must be JSON-serializable.
+    """
+    ROUTED_OPERATIONS.add(method.__name__)
+
+    @functools.wraps(method)
+    async def wrapper(manager, db, server_id: int, *args, **kwargs):
+        if router.is_local(server_id):
+            return await method(manager, db, server_id, *args, **kwargs)
+        return await router.forward(method.__name__, server_id, args, kwargs)
+    return wrapper
@@ -0,0 +1,369 @@
+# MCP server simulator
+#
+# A stand-in for real MCP servers that speaks newline-delimited JSON-RPC 2.0
+# (initialize, ping, tools/list, tools/call with notifications/progress, and
+# metrics/get) over TCP. Each tool has a scripted latency distribution,
+# output size, number of progress notifications and failure rates, so the
+# switchboard's real client path can be exercised and profiled at scale without
+# any external service. MCPManager's built-in mock backend uses the same tools
+# in-process.
+#
+# Uses only the standard library and can run outside the switchboard:
+#   python -m backend.simulator --port 9001 --count 50 --latency-ms 20 --error-rate 0.01
+#   python -m backend.simulator --config tools.json
+#
+# --config takes a JSON file {"defaults": {...}, "tools": [...]}. Tools are
+# merged by name over DEFAULT_TOOLS, and "defaults" over every tool. Tool fields:
+#   name, description, idempotent, aliases
+#   output         template; {args}, {command}, {server} and {tool} are substituted
+#   default_args   used for {args} when the call has none
+#   latency        {"distribution": "fixed" | "uniform" | "normal" | "lognormal" |
+#                  "exponential", "ms": ..., "spread": ...}; "ms" is the value
+#                  (fixed), center (uniform, normal), median (lognormal) or mean
+#                  (exponential); "spread" is the half-width (uniform) or standard
+#                  deviation (normal) in ms, or sigma (lognormal)
+#   payload_bytes  pad the output to at least this many bytes
+#   progress_steps progress notifications sent while the call runs
+#   error_rate     probability the call returns a tool error
+#   crash_rate     probability the connection is dropped without a reply
+#   hang_rate      probability the call never replies
+# A tool named "*" answers commands no other tool matches.
+import argparse
+import asyncio
+import copy
+import json
+import logging
+import math
+import random
+import sys
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PROTOCOL_VERSION = "2024-11-05"
+# Longest message accepted, as one line of JSON
+MAX_MESSAGE_BYTES = 16 * 1024 * 1024
+
+DEFAULT_SETTINGS = {
+    "latency": {"distribution": "fixed", "ms": 0, "spread": 0},
+    "payload_bytes": 0,
+    "progress_steps": 0,
+    "error_rate": 0.0,
+    "crash_rate": 0.0,
+    "hang_rate": 0.0,
+}
+
+DEFAULT_TOOLS = [
+    {
+        "name": "ls",
+        "aliases": ["dir"],
+        "description": "List directory contents",
+        "idempotent": True,
+        "output": "\nfile1.txt\nfile2.txt\ndirectory1/\ndirectory2/\nconfig.json\nREADME.md\n",
+    },
+    {
+        "name": "cat",
+        "aliases": ["type"],
+        "description": "Print file contents",
+        "idempotent": True,
+        "default_args": "unknown",
+        "output": "Contents of {args}:\nThis is a mock file content for demonstration purposes.\nLine 2 of the file.\nLine 3 of the file.",
+    },
+    {
+        "name": "ps",
+        "aliases": ["tasklist"],
+        "description": "List running processes",
+        "idempotent": True,
+        "output": "\nPID   COMMAND\n1     system\n100   mcp_server\n200   database\n300   web_server\n",
+    },
+    {
+        "name": "ping",
+        "description": "Check reachability of a host",
+        "idempotent": False,
+        "default_args": "localhost",
+        "output": (
+            "\nPinging {args} with 32 bytes of data:\n"
+            "Reply from {args}: bytes=32 time=10ms TTL=64\n"
+            "Reply from {args}: bytes=32 time=12ms TTL=64\n"
+            "Reply from {args}: bytes=32 time=9ms TTL=64\n"
+            "Reply from {args}: bytes=32 time=11ms TTL=64\n\n"
+            "Ping statistics for {args}:\n"
+            "    Packets: Sent = 4, Received = 4, Lost = 0 (0% loss),\n"
+            "Approximate round trip times in milli-seconds:\n"
+            "    Minimum = 9ms, Maximum = 12ms, Average = 10.5ms\n"
+        ),
+    },
+    {
+        "name": "*",
+        "description": "Any other command",
+        "idempotent": False,
+        "output": "Executed command '{command}' on {server} (mock execution)",
+    },
+]
+
+# Typical load per server type: base value and +/- range of each metric
+METRIC_PROFILES = {
+    "database": {"cpu_usage": (35.5, 8), "memory_usage": (1024.3, 100), "disk_usage": (2048.7, 200),
+                 "network_in": (128.2, 20), "network_out": (64.9, 10)},
+    "web": {"cpu_usage": (25.5, 5), "memory_usage": (512.3, 50), "disk_usage": (1024.7, 100),
+            "network_in": (512.2, 50), "network_out": (256.9, 25)},
+    "default": {"cpu_usage": (25.5, 5), "memory_usage": (512.3, 50), "disk_usage": (1024.7, 100),
+                "network_in": (256.2, 25), "network_out": (128.9, 12)},
+}
+
+
+class ToolError(Exception):
+    """A tool call that failed; reported to the client as a tool result with isError"""
+
+
+class SimulatedCrash(Exception):
+    """The simulated server went away in the middle of a call"""
+
+
+def merge_tools(overrides: List[Dict[str, Any]], defaults: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """DEFAULT_TOOLS with `overrides` merged in by name and `defaults` applied to every tool"""
+    tools = {tool["name"]: copy.deepcopy(tool) for tool in DEFAULT_TOOLS}
+    for tool in overrides:
+        tools.setdefault(tool["name"], {}).update(copy.deepcopy(tool))
+    settings = {**DEFAULT_SETTINGS, **(defaults or {})}
+    return [{**settings, **tool} for tool in tools.values()]
+
+
+class Simulator:
+    """The tools of one simulated server"""
+
+    def __init__(self, tools: Optional[List[Dict[str, Any]]] = None, name: str = "simulator",
+                 server_type: str = "default", seed: Optional[int] = None):
+        self.name = name
+        self.server_type = server_type
+        self.random = random.Random(seed)
+        self.tools: Dict[str, Dict[str, Any]] = {}
+        for tool in tools if tools is not None else merge_tools([]):
+            self.tools[tool["name"].lower()] = tool
+            for alias in tool.get("aliases") or []:
+                self.tools[alias.lower()] = tool
+
+    def resolve(self, name: str) -> Optional[Dict[str, Any]]:
+        return self.tools.get(name.lower()) or self.tools.get("*")
+
+    def list_tools(self) -> List[Dict[str, Any]]:
+        seen = []
+        for tool in self.tools.values():
+            if tool["name"] != "*" and tool not in seen:
+                seen.append(tool)
+        return [{"name": t["name"], "description": t.get("description", ""), "idempotent": t.get("idempotent", False)}
+                for t in seen]
+
+    def latency(self, tool: Dict[str, Any]) -> float:
+        """Seconds a call to the tool takes, drawn from its latency distribution"""
+        spec = {**DEFAULT_SETTINGS["latency"], **(tool.get("latency") or {})}
+        ms, spread = spec["ms"], spec["spread"]
+        distribution = spec["distribution"]
+        if distribution == "uniform":
+            value = self.random.uniform(ms - spread, ms + spread)
+        elif distribution == "normal":
+            value = self.random.gauss(ms, spread)
+        elif distribution == "lognormal":
+            value = self.random.lognormvariate(math.log(ms), spread) if ms > 0 else 0
+        elif distribution == "exponential":
+            value = self.random.expovariate(1 / ms) if ms > 0 else 0
+        else:
+            value = ms
+        return max(0.0, value) / 1000
+
+    def render(self, tool: Dict[str, Any], command: str, args: str, server: Optional[str] = None) -> str:
+        output = tool.get("output", "").format(
+            args=args or tool.get("default_args", ""), command=command, server=server or self.name, tool=tool["name"]
+        )
+        missing = tool.get("payload_bytes", 0) - len(output)
+        if missing > 0:
+            line = "x" * 79 + "\n"
+            output += (line * (missing // len(line) + 1))[:missing]
+        return output
+
+    async def call(self, name: str, args: str = "", server: Optional[str] = None,
+                   progress: Optional[Callable[[int, int], Awaitable[None]]] = None) -> str:
+        """Run a tool: wait out its latency (sending progress on the way), then fail or return its output"""
+        tool = self.resolve(name)
+        if tool is None:
+            raise ToolError(f"Unknown tool {name!r}")
+        command = f"{name} {args}" if args else name
+        roll = self.random.random()
+        if roll < tool["hang_rate"]:
+            await asyncio.Event().wait()
+        roll -= tool["hang_rate"]
+
+        steps = tool["progress_steps"]
+        delay = self.latency(tool)
+        for step in range(steps):
+            await asyncio.sleep(delay / (steps + 1))
+            if progress is not None:
+                await progress(step + 1, steps)
+        await asyncio.sleep(delay / (steps + 1))
+
+        if roll < tool["crash_rate"]:
+            raise SimulatedCrash(f"{self.name} dropped the connection")
+        roll -= tool["crash_rate"]
+        if roll < tool["error_rate"]:
+            raise ToolError(f"Simulated failure of {command!r} on {server or self.name}")
+        return self.render(tool, command, args, server)
+
+    def metrics(self, server_type: Optional[str] = None) -> Dict[str, Any]:
+        """Resource usage around the typical values of the server type"""
+        server_type = (server_type or self.server_type).lower()
+        profile = next((METRIC_PROFILES[key] for key in ("database", "web") if key in server_type), METRIC_PROFILES["default"])
+        metrics = {name: max(0, base + self.random.uniform(-spread, spread)) for name, (base, spread) in profile.items()}
+        metrics["cpu_usage"] = min(100, metrics["cpu_usage"])
+        metrics["connections"] = self.random.randint(5, 50)
+        metrics["processes"] = self.random.randint(3, 15)
+        return metrics
+
+
+class RPCServer:
+    """Serves a Simulator over newline-delimited JSON-RPC 2.0 streams"""
+
+    def __init__(self, simulator: Simulator):
+        self.simulator = simulator
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        lock = asyncio.Lock()
+        calls = set()
+
+        async def send(message: Dict[str, Any]) -> None:
+            async with lock:
+                writer.write(json.dumps(message).encode() + b"\n")
+                await writer.drain()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    await send({"jsonrpc": "2.0", "id": None, "error": {"code": -32700, "message": "Parse error"}})
+                    continue
+                # Requests run concurrently, so a slow call does not hold up the others
+                call = asyncio.create_task(self._dispatch(message, send, writer))
+                calls.add(call)
+                call.add_done_callback(calls.discard)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for call in calls:
+                call.cancel()
+            writer.close()
+
+    async def _dispatch(self, message: Dict[str, Any], send, writer: asyncio.StreamWriter) -> None:
+        request_id = message.get("id")
+        if request_id is None:
+            return  # notifications such as notifications/initialized need no reply
+        method = message.get("method")
+        params = message.get("params") or {}
+        try:
+            if method == "initialize":
+                result = {
+                    "protocolVersion": PROTOCOL_VERSION,
+                    "serverInfo": {"name": self.simulator.name, "version": "simulated"},
+                    "capabilities": {"tools": {}},
+                }
+            elif method == "ping":
+                result = {}
+            elif method == "tools/list":
+                result = {"tools": self.simulator.list_tools()}
+            elif method == "tools/call":
+                result = await self._call_tool(params, send)
+            elif method == "metrics/get":
+                result = {"metrics": self.simulator.metrics()}
+            else:
+                await send({"jsonrpc": "2.0", "id": request_id, "error": {"code": -32601, "message": f"Method not found: {method}"}})
+                return
+        except SimulatedCrash:
+            writer.close()
+            return
+        except Exception as e:
+            logger.exception("Request %s failed", method)
+            await send({"jsonrpc": "2.0", "id": request_id, "error": {"code": -32603, "message": str(e)}})
+            return
+        await send({"jsonrpc": "2.0", "id": request_id, "result": result})
+
+    async def _call_tool(self, params: Dict[str, Any], send) -> Dict[str, Any]:
+        token = (params.get("_meta") or {}).get("progressToken")
+
+        async def progress(done: int, total: int) -> None:
+            if token is not None:
+                await send({"jsonrpc": "2.0", "method": "notifications/progress",
+                            "params": {"progressToken": token, "progress": done, "total": total}})
+
+        arguments = params.get("arguments") or {}
+        try:
+            text = await self.simulator.call(params["name"], arguments.get("args", ""), progress=progress)
+            return {"content": [{"type": "text", "text": text}], "isError": False}
+        except ToolError as e:
+            return {"content": [{"type": "text", "text": str(e)}], "isError": True}
+
+
+async def serve_tcp(simulators: List[Simulator], host: str, port: int) -> None:
+    servers = [
+        await asyncio.start_server(RPCServer(simulator).handle, host, port + i, limit=MAX_MESSAGE_BYTES)
+        for i, simulator in enumerate(simulators)
+    ]
+    logger.info("Serving %d simulated servers on %s:%d-%d", len(servers), host, port, port + len(servers) - 1)
+    await asyncio.gather(*(server.serve_forever() for server in servers))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Simulated MCP servers speaking JSON-RPC over TCP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9001, help="port of the first server")
+    parser.add_argument("--count", type=int, default=1, help="servers to run, on consecutive ports")
+    parser.add_argument("--name", default="simulator")
+    parser.add_argument("--type", default="default", help="server type, which shapes metrics/get")
+    parser.add_argument("--config", help="JSON file with tool definitions and defaults")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--latency-distribution", choices=["fixed", "uniform", "normal", "lognormal", "exponential"])
+    parser.add_argument("--latency-ms", type=float)
+    parser.add_argument("--latency-spread", type=float)
+    parser.add_argument("--payload-bytes", type=int)
+    parser.add_argument("--progress-steps", type=int)
+    parser.add_argument("--error-rate", type=float)
+    parser.add_argument("--crash-rate", type=float)
+    parser.add_argument("--hang-rate", type=float)
+    parser.add_argument("--print-servers", action="store_true", help="print a POST /servers/bulk body for the servers and exit")
+    args = parser.parse_args()
+
+    config = {}
+    if args.config:
+        with open(args.config) as f:
+            config = json.load(f)
+    defaults = dict(config.get("defaults") or {})
+    latency = dict(defaults.get("latency") or {})
+    for option, key in (("latency_distribution", "distribution"), ("latency_ms", "ms"), ("latency_spread", "spread")):
+        if getattr(args, option) is not None:
+            latency[key] = getattr(args, option)
+    if latency:
+        defaults["latency"] = latency
+    for key in ("payload_bytes", "progress_steps", "error_rate", "crash_rate", "hang_rate"):
+        if getattr(args, key) is not None:
+            defaults[key] = getattr(args, key)
+    tools = merge_tools(config.get("tools") or [], defaults)
+
+    names = [args.name if args.count == 1 else f"{args.name}-{i + 1}" for i in range(args.count)]
+    if args.print_servers:
+        print(json.dumps([{"name": name, "host": args.host, "port": args.port + i, "type": args.type} for i, name in enumerate(names)]))
+        return
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr, format="%(asctime)s %(levelname)s %(message)s")
+    simulators = [
+        Simulator(tools, name=name, server_type=args.type, seed=None if args.seed is None else args.seed + i)
+        for i, name in enumerate(names)
+    ]
+    try:
+        asyncio.run(serve_tcp(simulators, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
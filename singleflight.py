@@ -0,0 +1,75 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class _Call:
+    """An in-flight execution that followers can wait on"""
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesce concurrent identical calls into a single execution.
+
+    The first caller for a key runs the function; callers arriving with the same
+    key while it is still running wait for it and receive the same result (or
+    exception). Results are shared between callers and must be treated as read-only.
+    `do` coalesces calls from threads, `do_async` coalesces coroutines on the event loop.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._async_calls: Dict[Hashable, asyncio.Task] = {}
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    async def do_async(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        task = self._async_calls.get(key)
+        if task is None:
+            # The shared execution runs in its own task, so cancelling any caller,
+            # the first one included, does not cancel it for the others
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._async_calls[key] = task
+            task.add_done_callback(lambda done: self._finish_async(key, done))
+        return await asyncio.shield(task)
+
+    def _finish_async(self, key: Hashable, task: asyncio.Future) -> None:
+        if self._async_calls.get(key) is task:
+            del self._async_calls[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved in case every caller was cancelled
+            task.exception()
+
+    def in_flight(self) -> int:
+        """Number of distinct keys currently executing"""
+        with self._lock:
+            return len(self._calls) + len(self._async_calls)
@@ -0,0 +1,70 @@
+# Startup timing and readiness
+#
+# main.py imports this module first, so the "imports" phase covers importing
+# the backend modules needed to serve requests. Optional parts (profiler,
+# exports, warm-up, the MCP client and the simulator) are imported on first
+# use. The report is returned by GET /health/ready and
+# logged once the instance becomes ready.
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from backend.logs import get_logger
+
+logger = get_logger(__name__)
+
+
+class StartupReport:
+    """Durations of the startup phases and whether initialization has finished"""
+
+    def __init__(self):
+        self.created = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.serving_after: Optional[float] = None
+        self.ready_after: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.ready_after is not None
+
+    def _since_created(self) -> float:
+        return round((time.perf_counter() - self.created) * 1000, 1)
+
+    def record(self, name: str, started: float) -> None:
+        self.phases[name] = round((time.perf_counter() - started) * 1000, 1)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, started)
+
+    def mark_serving(self) -> None:
+        self.serving_after = self._since_created()
+        if not self.ready:
+            logger.info("Accepting requests %.1f ms after import (%s)", self.serving_after, self._format_phases())
+
+    def mark_ready(self) -> None:
+        self.ready_after = self._since_created()
+        logger.info("Ready %.1f ms after import (%s)", self.ready_after, self._format_phases())
+
+    def mark_failed(self, error: Exception) -> None:
+        self.error = f"{type(error).__name__}: {error}"
+
+    def _format_phases(self) -> str:
+        return ", ".join(f"{name} {ms} ms" for name, ms in self.phases.items())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "status": "ready" if self.ready else "failed" if self.error else "starting",
+            "serving_after_ms": self.serving_after,
+            "ready_after_ms": self.ready_after,
+            "phases_ms": dict(self.phases),
+            "error": self.error,
+        }
+
+
+report = StartupReport()
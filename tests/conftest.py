@@ -0,0 +1,105 @@
+# Test setup
+#
+# The modules import each other as the `backend` package, which is the
+# repository root. The root is registered under that name here rather than put
+# on sys.path, where its queue.py would shadow the standard library's.
+#
+# Tests run in a scratch directory holding the database, config.json and the
+# task archive. The database is shared by the session and emptied by the
+# `client` fixture; the engines are closed after every test that used them, as
+# each test runs its own event loop.
+import asyncio
+import atexit
+import json
+import os
+import shutil
+import sys
+import tempfile
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path[:] = [path for path in sys.path if os.path.abspath(path or os.curdir) != ROOT]
+if getattr(sys.modules.get("queue"), "__file__", "").startswith(ROOT + os.sep):
+    del sys.modules["queue"]
+if list(getattr(sys.modules.get("backend"), "__path__", [])) != [ROOT]:
+    package = types.ModuleType("backend")
+    package.__path__ = [ROOT]
+    sys.modules["backend"] = package
+
+WORKDIR = tempfile.mkdtemp(prefix="mcp-tests-")
+os.chdir(WORKDIR)
+atexit.register(shutil.rmtree, WORKDIR, True)
+
+import pytest
+
+
+def reset_database() -> None:
+    """Create the schema if needed and delete every row, then forget what was cached from it"""
+    from backend import auth, crud, database
+    from backend.registry import registry
+    database.create_db()
+    with database.engine.begin() as connection:
+        for table in reversed(database.Base.metadata.sorted_tables):
+            connection.execute(table.delete())
+    registry.loaded = False
+    crud._versions.clear()
+    auth.principals.clear()
+    auth.rejected.clear()
+
+
+@pytest.fixture
+def write_config():
+    """Write config.json for the app; returns the function taking the document"""
+    from backend.mcp_manager import mcp_manager
+    path = os.path.join(WORKDIR, "config.json")
+
+    def write(document):
+        with open(path, "w") as f:
+            json.dump(document, f)
+        mcp_manager.config_path = path
+        mcp_manager._settings_checked = 0.0
+    write({"servers": []})
+    yield write
+    os.remove(path)
+
+
+@pytest.fixture
+def run():
+    """Runs a coroutine on a new event loop, closing the database engines after it"""
+    from backend import database
+
+    def run(coroutine):
+        async def main():
+            try:
+                return await coroutine
+            finally:
+                await database.close_db()
+        return asyncio.run(main())
+    return run
+
+
+@pytest.fixture
+def database(write_config):
+    """An empty database"""
+    from backend import database
+    reset_database()
+    yield database
+
+
+@pytest.fixture
+def client(database):
+    """A client of the app, started on an empty database"""
+    from fastapi.testclient import TestClient
+    from backend.main import app
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def token(client):
+    """A bearer token of the default user"""
+    from backend import auth
+    response = client.post("/token", data={"username": auth.DEFAULT_USERNAME, "password": auth.DEFAULT_PASSWORD})
+    assert response.status_code == 200
+    return response.json()["access_token"]
@@ -0,0 +1,100 @@
+import asyncio
+import threading
+import time
+from collections import Counter
+
+import pytest
+
+from backend import auth, crud, profiler, schemas
+from backend.database import AsyncSessionLocal
+
+
+def bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def admin_token(client, monkeypatch):
+    """A bearer token of the user "admin", the only one in ADMIN_USERS"""
+    async def add_admin():
+        async with AsyncSessionLocal() as db:
+            await crud.create_user(db, schemas.UserCreate(username="admin", password="secret"))
+    client.portal.call(add_admin)
+    monkeypatch.setattr(auth, "ADMIN_USERS", {"admin"})
+    response = client.post("/token", data={"username": "admin", "password": "secret"})
+    return response.json()["access_token"]
+
+
+def test_admin_routes_need_a_token(client, token):
+    assert client.post("/admin/tasks/compact").status_code == 401
+    assert client.post("/admin/tasks/compact", headers=bearer("bad")).status_code == 401
+
+
+def test_nobody_is_an_admin_unless_listed(client, token, monkeypatch):
+    monkeypatch.setattr(auth, "ADMIN_USERS", set())
+    assert client.post("/admin/tasks/compact", headers=bearer(token)).status_code == 403
+
+
+def test_admin_routes_are_limited_to_admin_users(client, token, admin_token, monkeypatch):
+    assert client.post("/admin/tasks/compact", headers=bearer(admin_token)).status_code == 200
+    assert client.post("/admin/tasks/compact", headers=bearer(token)).status_code == 403
+    # The default user's password is public, so it is never an admin
+    monkeypatch.setattr(auth, "ADMIN_USERS", {"admin", auth.DEFAULT_USERNAME})
+    assert client.post("/admin/tasks/compact", headers=bearer(token)).status_code == 403
+
+
+def busy(seconds):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        pass
+
+
+def test_profile_finds_busy_threads_and_blocking_callbacks(run):
+    async def main():
+        worker = threading.Thread(target=busy, args=(0.4,), name="busy-worker")
+        worker.start()
+        asyncio.get_running_loop().call_later(0.1, busy, 0.15)
+        try:
+            return await profiler.profile(duration=0.4, interval=0.005, slow_callback=0.05)
+        finally:
+            worker.join()
+
+    report = run(main())
+    assert report["samples"] > 0
+    assert any(stack.startswith("busy-worker;") and "busy (test_admin.py" in stack for stack in report["stacks"])
+    assert any("busy (test_admin.py" in callback["callback"] for callback in report["slow_callbacks"])
+    assert report["loop_lag"]["max"] >= 0.1
+    top = profiler.top_functions(report["stacks"])
+    assert top[0]["function"].startswith("busy (test_admin.py")
+
+
+def test_sampler_stops_without_waiting_out_its_interval():
+    stop = threading.Event()
+    sampler = threading.Thread(
+        target=profiler._sample_stacks,
+        args=(60, 30, threading.get_ident(), stop, Counter(), [], 0.05)
+    )
+    sampler.start()
+    time.sleep(0.05)
+    started = time.monotonic()
+    stop.set()
+    sampler.join(timeout=5)
+    assert not sampler.is_alive() and time.monotonic() - started < 1
+
+
+def test_collapsed_stacks_skip_idle_threads():
+    stacks = Counter({"event-loop;main (app.py:1);handle (app.py:9)": 3, "pool;_worker (thread.py:80)": 5})
+    assert profiler.collapsed(stacks) == "event-loop;main (app.py:1);handle (app.py:9) 3\n"
+    assert profiler.top_functions(stacks) == [{"function": "handle (app.py:9)", "samples": 3, "percent": 100.0}]
+
+
+def test_profile_route_clamps_its_interval(client, admin_token):
+    started = time.monotonic()
+    response = client.post("/admin/profile", params={"seconds": 0.2, "interval": 3600}, headers=bearer(admin_token))
+    assert response.status_code == 200
+    assert response.json()["interval"] == profiler.MAX_INTERVAL
+    assert time.monotonic() - started < 5
+    response = client.post(
+        "/admin/profile", params={"seconds": 0.1, "format": "collapsed"}, headers=bearer(admin_token)
+    )
+    assert response.status_code == 200 and response.headers["content-type"].startswith("text/plain")
@@ -0,0 +1,115 @@
+import time
+
+import pytest
+from jose import jwt
+from sqlalchemy import select
+
+from backend import auth, models
+from backend.cache import TTLCache
+
+
+def bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_requests_without_a_token_are_the_default_user(client):
+    assert client.get("/tasks").status_code == 200
+
+
+def test_login_rejects_a_wrong_password(client):
+    response = client.post("/token", data={"username": auth.DEFAULT_USERNAME, "password": "wrong"})
+    assert response.status_code == 401
+
+
+@pytest.mark.parametrize("token", [
+    "not-a-jwt",
+    jwt.encode({"sub": "1", "jti": "x", "exp": int(time.time()) + 60}, "another key", algorithm=auth.ALGORITHM),
+    jwt.encode({"sub": "1", "jti": "x", "exp": int(time.time()) - 1}, auth.SECRET_KEY, algorithm=auth.ALGORITHM),
+    jwt.encode({"sub": "none", "jti": "x", "exp": int(time.time()) + 60}, auth.SECRET_KEY, algorithm=auth.ALGORITHM),
+])
+def test_bad_tokens_are_rejected(client, token):
+    for _ in range(2):
+        response = client.get("/tasks", headers=bearer(token))
+        assert response.status_code == 401
+        assert response.json()["detail"] == "Invalid or expired token"
+        assert response.headers["www-authenticate"] == 'Bearer error="invalid_token"'
+    # The failed verification is cached apart from the principals of good tokens
+    assert auth.rejected.get(token) is True
+    assert auth.principals.get(token, "missing") == "missing"
+
+
+def test_tokens_are_verified_once_while_cached(client, token, monkeypatch):
+    verify = auth._verify_token
+    verified = []
+
+    async def counting(token):
+        verified.append(token)
+        return await verify(token)
+
+    monkeypatch.setattr(auth, "_verify_token", counting)
+    for _ in range(3):
+        assert client.get("/tasks", headers=bearer(token)).status_code == 200
+    assert verified == [token]
+    assert auth.principals.get(token).username == auth.DEFAULT_USERNAME
+
+
+def test_cached_tokens_expire_with_the_token(client, monkeypatch):
+    monkeypatch.setattr(auth, "ACCESS_TOKEN_EXPIRE_MINUTES", 2 / 60)
+    token = client.post("/token", data={"username": auth.DEFAULT_USERNAME, "password": auth.DEFAULT_PASSWORD}).json()["access_token"]
+    assert client.get("/tasks", headers=bearer(token)).status_code == 200
+    expires_at = jwt.get_unverified_claims(token)["exp"]
+    # Expiry is checked in whole seconds
+    time.sleep(expires_at - time.time() + 1.1)
+    assert client.get("/tasks", headers=bearer(token)).status_code == 401
+
+
+def test_revoked_tokens_are_rejected(client, token):
+    assert client.get("/tasks", headers=bearer(token)).status_code == 200
+    assert client.post("/logout", headers=bearer(token)).json()["success"]
+    assert client.get("/tasks", headers=bearer(token)).status_code == 401
+    assert client.get("/metrics/auth").json()["revoked_tokens"] == 1
+    assert client.post("/logout").status_code == 400
+
+
+def test_revocations_by_other_workers_are_seen_on_the_next_verification(client, token, database):
+    assert client.get("/tasks", headers=bearer(token)).status_code == 200
+    # Another worker handles the logout
+    claims = jwt.get_unverified_claims(token)
+    with database.engine.begin() as connection:
+        connection.execute(models.RevokedToken.__table__.insert(), {"token_id": claims["jti"], "expires_at": claims["exp"]})
+    assert client.get("/tasks", headers=bearer(token)).status_code == 200
+    # Once the cached principal expires, the token is verified again
+    auth.principals.clear()
+    assert client.get("/tasks", headers=bearer(token)).status_code == 401
+
+
+def test_expired_revocations_are_dropped(client, token, database):
+    with database.engine.begin() as connection:
+        connection.execute(models.RevokedToken.__table__.insert(), {"token_id": "old", "expires_at": int(time.time()) - 1})
+    assert client.post("/logout", headers=bearer(token)).status_code == 200
+    with database.engine.connect() as connection:
+        stored = connection.scalars(select(models.RevokedToken.token_id)).all()
+    assert stored == [jwt.get_unverified_claims(token)["jti"]]
+
+
+def test_bad_tokens_cannot_evict_good_ones(client, token, monkeypatch):
+    monkeypatch.setattr(auth, "rejected", TTLCache(max_entries=5))
+    assert client.get("/tasks", headers=bearer(token)).status_code == 200
+    for i in range(20):
+        assert client.get("/tasks", headers=bearer(f"bad-{i}")).status_code == 401
+    assert auth.rejected.get_stats()["entries"] == 5
+    assert auth.principals.get(token).username == auth.DEFAULT_USERNAME
+
+
+def test_tokens_of_deleted_users_are_rejected(client, token, database):
+    with database.engine.begin() as connection:
+        connection.execute(models.User.__table__.delete())
+    auth.principals.clear()
+    assert client.get("/tasks", headers=bearer(token)).status_code == 401
+
+
+def test_tokens_can_be_required(client, token, monkeypatch):
+    monkeypatch.setattr(auth, "AUTH_REQUIRED", True)
+    response = client.get("/tasks")
+    assert response.status_code == 401 and response.headers["www-authenticate"] == "Bearer"
+    assert client.get("/tasks", headers=bearer(token)).status_code == 200
@@ -0,0 +1,75 @@
+from backend import crud
+
+
+def server(name, type="web", port=1):
+    return {"name": name, "host": "localhost", "port": port, "type": type}
+
+
+def test_bulk_create_reports_each_item(client):
+    assert client.post("/servers/bulk", json=[server("taken")]).json()[0]["success"]
+    results = client.post("/servers/bulk", json=[server("alpha"), server("taken"), server("beta"), server("alpha")]).json()
+    assert [result["success"] for result in results] == [True, False, True, False]
+    assert [result["index"] for result in results] == [0, 1, 2, 3]
+    assert results[1]["message"] == "A server named 'taken' already exists"
+    assert results[0]["id"] < results[2]["id"]
+    assert [item["name"] for item in client.get("/servers").json()] == ["taken", "alpha", "beta"]
+
+    tasks = client.post("/tasks/bulk", json=[
+        {"name": "one", "command": "ls", "server_id": results[0]["id"]},
+        {"name": "two", "command": "ls", "server_id": 999},
+    ]).json()
+    assert tasks[0]["success"] and tasks[1] == {"index": 1, "success": False, "id": None, "message": "Server not found"}
+
+
+def test_bulk_update_validates_ids_and_names(client):
+    alpha, beta = [result["id"] for result in client.post("/servers/bulk", json=[server("alpha"), server("beta")]).json()]
+    results = client.put("/servers/bulk", json=[
+        dict(server("gamma", port=2), id=alpha),
+        dict(server("delta"), id=999),
+        dict(server("other"), id=alpha),
+        # Taken by an earlier item of the batch
+        dict(server("gamma"), id=beta),
+        dict(server("beta", port=3), id=beta),
+    ]).json()
+    assert [result["success"] for result in results] == [True, False, False, False, True]
+    assert results[1]["message"] == "Server not found"
+    assert results[2]["message"] == "Server is updated more than once in this batch"
+    assert results[3]["message"] == "A server named 'gamma' already exists"
+    assert {item["name"]: item["port"] for item in client.get("/servers").json()} == {"gamma": 2, "beta": 3}
+
+
+def test_bulk_delete_skips_connected_and_missing_servers(client):
+    ids = [result["id"] for result in client.post("/servers/bulk", json=[server("alpha"), server("beta")]).json()]
+    assert client.post(f"/servers/connect/{ids[1]}").json()["success"]
+    results = client.post("/servers/bulk_delete", json={"ids": [ids[0], ids[1], ids[0], 999]}).json()
+    assert [result["success"] for result in results] == [True, False, False, False]
+    assert results[1]["message"] == "Cannot delete a connected server. Please disconnect first."
+    assert results[2]["message"] == results[3]["message"] == "Server not found"
+    assert [item["id"] for item in client.get("/servers").json()] == [ids[1]]
+
+
+def test_bulk_task_updates_and_deletes(client):
+    server_id = client.post("/servers/bulk", json=[server("alpha")]).json()[0]["id"]
+    ids = [result["id"] for result in client.post("/tasks/bulk", json=[
+        {"name": f"task-{i}", "command": "ls", "server_id": server_id} for i in range(3)
+    ]).json()]
+    results = client.put("/tasks/bulk", json=[
+        {"id": ids[0], "status": "completed"},
+        {"id": ids[1], "server_id": 999},
+        {"id": ids[0], "status": "failed"},
+    ]).json()
+    assert [result["message"] for result in results] == [None, "Server not found", "Task is updated more than once in this batch"]
+    assert client.get(f"/tasks/{ids[0]}").json()["status"] == "completed"
+
+    results = client.post("/tasks/bulk_delete", json={"ids": [ids[2], ids[2], 999]}).json()
+    assert [result["success"] for result in results] == [True, False, False]
+    assert [task["id"] for task in client.get("/tasks").json()] == ids[:2]
+
+
+def test_bulk_requests_are_limited_in_size(client, monkeypatch):
+    monkeypatch.setattr(crud, "MAX_BULK_ITEMS", 2)
+    response = client.post("/servers/bulk", json=[server(f"server-{i}") for i in range(3)])
+    assert response.status_code == 413
+    assert response.json()["detail"] == "At most 2 items per bulk request"
+    assert client.post("/tasks/bulk_delete", json={"ids": [1, 2, 3]}).status_code == 413
+    assert client.get("/servers").json() == []
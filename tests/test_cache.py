@@ -0,0 +1,58 @@
+import threading
+import time
+
+from backend.cache import TTLCache, _sizeof
+
+
+def test_entries_expire():
+    cache = TTLCache()
+    cache.set("key", "value", expiry=0.05)
+    cache.set("kept", "value", expiry=None)
+    assert cache.get("key") == "value"
+    time.sleep(0.06)
+    assert cache.get("key", "missing") == "missing"
+    assert cache.get("kept") == "value"
+    assert cache.get_stats()["expirations"] == 1
+
+
+def test_evicts_least_recently_used_by_count_and_size():
+    cache = TTLCache(max_entries=2, max_bytes=1000)
+    cache.set("a", 1, size=100)
+    cache.set("b", 2, size=100)
+    cache.get("a")
+    cache.set("c", 3, size=100)
+    assert list(cache._entries) == ["a", "c"]
+
+    cache.set("d", 4, size=950)
+    assert list(cache._entries) == ["d"]
+    # Too large to store at all
+    cache.set("e", 5, size=1001)
+    assert cache.get("e") is None
+    assert cache.get_stats()["bytes"] == 950
+
+
+def test_sizeof_counts_direct_items_of_containers():
+    row = {"id": 1, "name": "x" * 1000}
+    assert _sizeof(row) > 1000
+    assert _sizeof([row]) < _sizeof(row)
+    # Values that cannot be pickled are sized too
+    assert _sizeof({"lock": threading.Lock()}) > 0
+
+
+def test_get_or_compute_computes_once_for_concurrent_misses():
+    cache = TTLCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.05)
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("key", compute))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["value"] * 5
+    assert calls == [1]
@@ -0,0 +1,81 @@
+import asyncio
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from backend import models
+from backend.database import AsyncSessionLocal, BatchWriter, WriteSessionLocal
+
+
+def add_user(username):
+    async def write(session):
+        user = models.User(username=username, hashed_password="x")
+        session.add(user)
+        return user
+    return write
+
+
+async def usernames():
+    async with AsyncSessionLocal() as db:
+        return sorted((await db.scalars(select(models.User.username))).all())
+
+
+def test_concurrent_writes_are_committed_together(database, run):
+    writer = BatchWriter(WriteSessionLocal)
+
+    async def main():
+        users = await asyncio.gather(*(writer.run(add_user(f"user-{i}")) for i in range(10)))
+        await writer.close()
+        return users, await usernames()
+
+    users, stored = run(main())
+    # Results are returned once committed, with their generated ids
+    assert all(user.id for user in users)
+    assert stored == sorted(f"user-{i}" for i in range(10))
+    stats = writer.get_stats()
+    # The first write starts a batch on its own, the others are queued behind it
+    assert stats["writes"] == 11 and stats["batches"] <= 3 and stats["largest_batch"] >= 9
+
+
+def test_a_failing_write_does_not_take_its_batch_down(database, run):
+    writer = BatchWriter(WriteSessionLocal)
+
+    async def main():
+        await writer.run(add_user("taken"))
+        results = await asyncio.gather(
+            writer.run(add_user("first")), writer.run(add_user("taken")), writer.run(add_user("last")),
+            return_exceptions=True
+        )
+        await writer.close()
+        return results, await usernames()
+
+    (first, failed, last), stored = run(main())
+    assert isinstance(failed, IntegrityError)
+    assert first.username == "first" and last.username == "last"
+    assert stored == ["first", "last", "taken"]
+    stats = writer.get_stats()
+    assert stats["retried_batches"] == 1 and stats["failed"] == 1
+
+
+def test_batches_are_bounded(database, run):
+    writer = BatchWriter(WriteSessionLocal, max_batch=4)
+
+    async def main():
+        await asyncio.gather(*(writer.run(add_user(f"user-{i}")) for i in range(12)))
+        await writer.close()
+
+    run(main())
+    assert writer.get_stats()["largest_batch"] == 4
+
+
+def test_close_commits_queued_writes(database, run):
+    writer = BatchWriter(WriteSessionLocal)
+
+    async def main():
+        pending = [asyncio.ensure_future(writer.run(add_user(f"user-{i}"))) for i in range(3)]
+        await asyncio.sleep(0)
+        await writer.close()
+        assert all(future.done() for future in pending)
+        return await usernames()
+
+    assert run(main()) == ["user-0", "user-1", "user-2"]
@@ -0,0 +1,107 @@
+import sqlite3
+from datetime import datetime
+
+from sqlalchemy import event
+
+from backend import crud, database
+
+
+def add_server(client, name, type="web"):
+    response = client.post("/create_server_test/", json={"name": name, "host": "localhost", "port": 1, "type": type})
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+def add_tasks(client, server_id, count):
+    response = client.post("/tasks/bulk", json=[
+        {"name": f"task-{i}", "command": "ls", "server_id": server_id} for i in range(count)
+    ])
+    assert response.status_code == 200
+    return [item["id"] for item in response.json()]
+
+
+def test_unchanged_listing_is_not_modified(client):
+    server_id = add_server(client, "alpha")
+    add_tasks(client, server_id, 2)
+    for url in ("/tasks", "/servers"):
+        response = client.get(url)
+        etag = response.headers["etag"]
+        assert response.headers["cache-control"] == "private, no-cache"
+        cached = client.get(url, headers={"If-None-Match": etag})
+        assert cached.status_code == 304 and cached.headers["etag"] == etag and cached.content == b""
+        assert client.get(url, headers={"If-None-Match": f'"other", W/{etag}'}).status_code == 304
+        # Each page and filter has its own ETag
+        assert client.get(url, params={"limit": 1}).headers["etag"] != etag
+
+
+def test_writes_change_the_etag(client):
+    server_id = add_server(client, "alpha")
+    tasks_etag = client.get("/tasks").headers["etag"]
+    servers_etag = client.get("/servers").headers["etag"]
+
+    task_id = add_tasks(client, server_id, 1)[0]
+    response = client.get("/tasks", headers={"If-None-Match": tasks_etag})
+    assert response.status_code == 200 and [task["id"] for task in response.json()] == [task_id]
+    tasks_etag = response.headers["etag"]
+    assert client.put(f"/tasks/{task_id}", json={"status": "completed"}).status_code == 200
+    assert client.get("/tasks", headers={"If-None-Match": tasks_etag}).status_code == 200
+
+    assert client.put(f"/servers/{server_id}", json={"name": "beta", "host": "localhost", "port": 2, "type": "web"}).status_code == 200
+    response = client.get("/servers", headers={"If-None-Match": servers_etag})
+    assert response.status_code == 200 and response.json()[0]["name"] == "beta"
+    servers_etag = response.headers["etag"]
+    assert client.delete(f"/servers/{server_id}").status_code == 200
+    response = client.get("/servers", headers={"If-None-Match": servers_etag})
+    assert response.status_code == 200 and response.json() == []
+
+
+def test_writes_of_other_processes_change_the_etag(client, monkeypatch):
+    monkeypatch.setattr(crud, "REGISTRY_CHECK_INTERVAL", 0)
+    server_id = add_server(client, "alpha")
+    add_tasks(client, server_id, 1)
+    tasks_etag = client.get("/tasks").headers["etag"]
+    servers_etag = client.get("/servers").headers["etag"]
+
+    # Another worker process adds a task and a server through its own connection
+    with sqlite3.connect("mcp.db") as connection:
+        connection.execute("INSERT INTO tasks (name, command, server_id, status, created_at) VALUES ('other', 'ls', ?, 'pending', ?)",
+                           (server_id, datetime.utcnow().isoformat(sep=" ")))
+        connection.execute("INSERT INTO mcpservers (name, host, port, type, status) VALUES ('other', 'localhost', 1, 'web', 0)")
+        connection.execute("UPDATE collection_versions SET version = version + 1")
+
+    response = client.get("/tasks", headers={"If-None-Match": tasks_etag})
+    assert response.status_code == 200 and len(response.json()) == 2
+    response = client.get("/servers", headers={"If-None-Match": servers_etag})
+    assert response.status_code == 200 and [server["name"] for server in response.json()] == ["alpha", "other"]
+    assert client.get("/servers/2").json()["name"] == "other"
+
+
+def test_not_modified_listing_reads_no_version(client, monkeypatch):
+    monkeypatch.setattr(crud, "REGISTRY_CHECK_INTERVAL", 60)
+    server_id = add_server(client, "alpha")
+    add_tasks(client, server_id, 2)
+    etag = client.get("/tasks").headers["etag"]
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+    event.listen(database.async_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        assert client.get("/tasks", headers={"If-None-Match": etag}).status_code == 304
+    finally:
+        event.remove(database.async_engine.sync_engine, "before_cursor_execute", record)
+    assert not [statement for statement in statements if "collection_versions" in statement]
+
+
+def test_writes_of_other_processes_are_seen_after_the_check_interval(client, monkeypatch):
+    monkeypatch.setattr(crud, "REGISTRY_CHECK_INTERVAL", 60)
+    server_id = add_server(client, "alpha")
+    add_tasks(client, server_id, 1)
+    etag = client.get("/tasks").headers["etag"]
+    with sqlite3.connect("mcp.db") as connection:
+        connection.execute("UPDATE collection_versions SET version = version + 1 WHERE collection = 'tasks'")
+
+    # Within the interval the version held in process is served
+    assert client.get("/tasks", headers={"If-None-Match": etag}).status_code == 304
+    monkeypatch.setattr(crud, "REGISTRY_CHECK_INTERVAL", 0)
+    assert client.get("/tasks", headers={"If-None-Match": etag}).status_code == 200
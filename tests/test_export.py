@@ -0,0 +1,116 @@
+import gzip
+import json
+import zlib
+from datetime import datetime
+
+import pytest
+
+from backend import export, monitoring
+from backend.mcp_manager import MockBackend, mcp_manager
+
+
+def add_server(client, name, type="web"):
+    response = client.post("/create_server_test/", json={"name": name, "host": "localhost", "port": 1, "type": type})
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+def add_tasks(client, server_id, count):
+    response = client.post("/tasks/bulk", json=[
+        {"name": f"task-{i}", "command": "ls", "server_id": server_id} for i in range(count)
+    ])
+    assert response.status_code == 200
+    return [item["id"] for item in response.json()]
+
+
+def ndjson_rows(content: bytes):
+    return [json.loads(line) for line in content.decode().splitlines()]
+
+
+def test_export_streams_all_tasks_in_order(client):
+    first = add_server(client, "alpha")
+    second = add_server(client, "beta")
+    ids = add_tasks(client, first, 5) + add_tasks(client, second, 3)
+    listed = client.get("/tasks").json()
+
+    response = client.get("/tasks/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.headers["content-disposition"] == 'attachment; filename="tasks.ndjson"'
+    assert ndjson_rows(response.content) == listed
+
+    compressed = client.get("/tasks/export", params={"gzip": True, "server_id": second})
+    assert compressed.headers["content-type"] == "application/gzip"
+    assert [row["id"] for row in ndjson_rows(gzip.decompress(compressed.content))] == ids[5:]
+
+
+def test_export_reads_a_chunk_at_a_time(client, run):
+    server_id = add_server(client, "alpha")
+    ids = add_tasks(client, server_id, 5)
+
+    async def collect(**filters):
+        return [chunk async for chunk in export.task_chunks(chunk_size=2, **filters)]
+
+    chunks = run(collect())
+    assert [[row["id"] for row in ndjson_rows(chunk)] for chunk in chunks] == [ids[:2], ids[2:4], ids[4:]]
+    assert run(collect(status="completed")) == []
+
+
+def test_gzip_chunks_form_one_member(run):
+    async def chunks():
+        for i in range(3):
+            yield export.ndjson([{"line": i}] * 100)
+
+    async def compress():
+        return [chunk async for chunk in export.gzip_chunks(chunks())]
+
+    compressed = b"".join(run(compress()))
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    content = decompressor.decompress(compressed)
+    assert decompressor.eof and decompressor.unused_data == b""
+    assert len(ndjson_rows(content)) == 300
+
+
+def test_log_export_of_an_unknown_server_is_not_found(client):
+    assert client.get("/servers/999/logs/export").status_code == 404
+
+
+class FailingBackend(MockBackend):
+    async def execute(self, server, command):
+        if command == "fail":
+            raise RuntimeError("tool failed")
+        return await super().execute(server, command)
+
+
+@pytest.fixture
+def failing_backend():
+    mcp_manager.set_backend(FailingBackend())
+    yield
+    mcp_manager.set_backend(None)
+
+
+def test_server_logs_export_filters_by_success(client, failing_backend):
+    server_id = add_server(client, "alpha")
+    assert client.post(f"/servers/connect/{server_id}").json()["success"]
+    client.post(f"/execute/{server_id}", data={"command": "echo hi"})
+    client.post(f"/execute/{server_id}", data={"command": "fail"})
+    logs = client.get(f"/servers/{server_id}/logs").json()
+
+    response = client.get(f"/servers/{server_id}/logs/export")
+    assert response.headers["content-disposition"] == f'attachment; filename="server-{server_id}-logs.ndjson"'
+    assert ndjson_rows(response.content) == logs
+    failed = ndjson_rows(client.get(f"/servers/{server_id}/logs/export", params={"success": False}).content)
+    assert failed and failed == [log for log in logs if not log["success"]]
+
+
+def test_metrics_export_covers_the_requested_range(run, monkeypatch):
+    samples = [{"timestamp": 1000.0 + i, "cpu_usage": i} for i in range(5)]
+    monkeypatch.setattr(monitoring.sampler, "samples", samples)
+
+    async def collect(**range):
+        return [row["cpu_usage"] for chunk in [chunk async for chunk in export.metrics_chunks(chunk_size=2, **range)]
+                for row in ndjson_rows(chunk)]
+
+    assert run(collect()) == [0, 1, 2, 3, 4]
+    since, until = datetime.fromtimestamp(1001), datetime.fromtimestamp(1003)
+    assert run(collect(since=since, until=until)) == [1, 2]
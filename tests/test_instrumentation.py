@@ -0,0 +1,66 @@
+import threading
+
+from backend import instrumentation
+from backend.instrumentation import Registry
+
+
+def test_counter_sums_the_cells_of_all_threads():
+    counter = Registry().counter("requests_total", "Requests", ["route"])
+
+    def record():
+        for _ in range(1000):
+            counter.inc(route="/tasks")
+    threads = [threading.Thread(target=record) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    counter.inc(2.5, route="/servers")
+    assert counter.values() == {("/tasks",): 4000, ("/servers",): 2.5}
+    assert len(counter._cells) == 5
+
+
+def test_gauge_combines_deltas_and_set_values_or_reads_its_function():
+    registry = Registry()
+    gauge = registry.gauge("clients", "Clients")
+    gauge.inc(3)
+    gauge.dec()
+    gauge.set(10)
+    assert gauge.values() == {(): 12}
+    depth = registry.gauge("depth", "Depth")
+    depth.set_function(lambda: 7)
+    assert depth.values() == {(): 7}
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    histogram = registry.histogram("latency_seconds", "Latency", ["route"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, route="/tasks")
+    assert registry.render().splitlines() == [
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{route="/tasks",le="0.1"} 2',
+        'latency_seconds_bucket{route="/tasks",le="1"} 3',
+        'latency_seconds_bucket{route="/tasks",le="+Inf"} 4',
+        'latency_seconds_sum{route="/tasks"} 3.65',
+        'latency_seconds_count{route="/tasks"} 4',
+    ]
+
+
+def test_metrics_are_registered_once_and_label_values_escaped():
+    registry = Registry()
+    counter = registry.counter("errors_total", "Errors", ["message"])
+    assert registry.counter("errors_total", "Errors", ["message"]) is counter
+    counter.inc(message='say "hi"\n')
+    assert 'errors_total{message="say \\"hi\\"\\n"} 1' in registry.render()
+
+
+def test_requests_are_counted_by_route_template(client):
+    assert client.get("/tasks/12345").status_code == 404
+    key = ("GET", "/tasks/{task_id}", 404)
+    before = instrumentation.http_requests.values().get(key, 0)
+    client.get("/tasks/12345")
+    assert instrumentation.http_requests.values()[key] == before + 1
+    body = client.get("/metrics/prometheus").text
+    assert 'http_requests_total{method="GET",route="/tasks/{task_id}",status="404"}' in body
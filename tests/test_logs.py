@@ -0,0 +1,53 @@
+import json
+import logging
+import sys
+from queue import Queue
+
+from backend.logs import DroppingQueueHandler, JsonFormatter, RateLimitFilter, _parse_levels
+
+
+def make_record(msg="task %s done", args=(7,), name="backend.queue", **extra):
+    record = logging.LogRecord(name, logging.INFO, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_lines_carry_extra_fields_and_exceptions():
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = logging.LogRecord("backend.crud", logging.ERROR, __file__, 1, "failed", None, sys.exc_info())
+    record.task_id = 7
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["level"] == "ERROR" and entry["logger"] == "backend.crud" and entry["message"] == "failed"
+    assert entry["task_id"] == 7
+    assert "ValueError: boom" in entry["exc_info"]
+    assert "args" not in entry and "msg" not in entry
+
+
+def test_queue_handler_drops_records_instead_of_blocking():
+    handler = DroppingQueueHandler(Queue(maxsize=2))
+    for _ in range(5):
+        handler.handle(make_record())
+    assert handler.queue.qsize() == 2 and handler.dropped == 3
+    record = handler.queue.get_nowait()
+    # Arguments are merged before the record crosses to the writer thread
+    assert record.msg == "task 7 done" and record.args is None
+
+
+def test_rate_limit_filter_reports_suppressed_records():
+    rate_limit = RateLimitFilter(burst=2, interval=60)
+    assert [rate_limit.filter(make_record(args=(i,))) for i in range(5)] == [True, True, False, False, False]
+    # Other templates have their own window
+    assert rate_limit.filter(make_record(msg="other"))
+
+    rate_limit._windows[("backend.queue", "task %s done")][0] -= 60
+    record = make_record()
+    assert rate_limit.filter(record) and record.suppressed == 3
+    assert not hasattr(make_record(), "suppressed")
+
+
+def test_per_logger_levels_are_parsed():
+    assert _parse_levels("backend.crud=debug, backend.websocket = WARNING,bogus") == {
+        "backend.crud": "DEBUG", "backend.websocket": "WARNING"
+    }
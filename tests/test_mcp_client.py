@@ -0,0 +1,145 @@
+import asyncio
+
+import pytest
+
+from backend.mcp_client import MCPClient, RPCError
+from backend.simulator import RPCServer, Simulator, merge_tools
+
+
+async def serve(handle):
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+async def serve_simulator(**defaults):
+    tools = [{**tool, **defaults} for tool in merge_tools([])]
+    return await serve(RPCServer(Simulator(tools, name="sim")).handle)
+
+
+def test_calls_tools_with_progress():
+    async def main():
+        server, port = await serve_simulator(progress_steps=2)
+        async with server:
+            client = MCPClient("127.0.0.1", port, timeout=5)
+            await client.connect()
+            progress = []
+            try:
+                text = await client.call_tool("cat", "notes.txt", lambda done, total: progress.append((done, total)))
+                concurrent = await asyncio.gather(*(client.call_tool("ls") for _ in range(5)))
+            finally:
+                client.close()
+            return client.server_info, text, progress, concurrent
+
+    server_info, text, progress, concurrent = asyncio.run(main())
+    assert server_info["name"] == "sim"
+    assert text.startswith("Contents of notes.txt:")
+    assert progress == [(1, 2), (2, 2)]
+    assert len(set(concurrent)) == 1
+
+
+def test_tool_and_protocol_errors_raise_rpc_error():
+    async def main():
+        server, port = await serve_simulator(error_rate=1.0)
+        async with server:
+            client = MCPClient("127.0.0.1", port, timeout=5)
+            await client.connect()
+            try:
+                with pytest.raises(RPCError, match="Simulated failure"):
+                    await client.call_tool("ls")
+                with pytest.raises(RPCError, match="Method not found"):
+                    await client.request("resources/list")
+                # The connection is still usable
+                return await client.request("ping")
+            finally:
+                client.close()
+
+    assert asyncio.run(main()) == {}
+
+
+def test_a_dropped_connection_fails_pending_requests():
+    async def main():
+        server, port = await serve_simulator(crash_rate=1.0)
+        async with server:
+            client = MCPClient("127.0.0.1", port, timeout=5)
+            await client.connect()
+            try:
+                with pytest.raises(ConnectionError):
+                    await client.call_tool("ls")
+                await asyncio.sleep(0.01)
+                return client.connected
+            finally:
+                client.close()
+
+    assert asyncio.run(main()) is False
+
+
+def test_a_request_without_reply_times_out():
+    async def main():
+        server, port = await serve_simulator(hang_rate=1.0)
+        async with server:
+            client = MCPClient("127.0.0.1", port, timeout=0.2)
+            await client.connect()
+            try:
+                with pytest.raises(TimeoutError):
+                    await client.call_tool("ls")
+                return client._pending
+            finally:
+                client.close()
+
+    assert asyncio.run(main()) == {}
+
+
+class SilentServer:
+    """Accepts connections and never replies; records when the client goes away"""
+
+    def __init__(self):
+        self.closed = asyncio.Event()
+
+    async def handle(self, reader, writer):
+        while await reader.readline():
+            pass
+        self.closed.set()
+        writer.close()
+
+
+def test_failed_handshake_closes_the_connection():
+    async def main():
+        silent = SilentServer()
+        server, port = await serve(silent.handle)
+        async with server:
+            client = MCPClient("127.0.0.1", port, timeout=0.2)
+            with pytest.raises(TimeoutError):
+                await client.connect()
+            await asyncio.wait_for(silent.closed.wait(), 1)
+            await asyncio.sleep(0)
+            return client
+
+    client = asyncio.run(main())
+    assert not client.connected
+    assert client._reader_task.done()
+
+
+def test_cancelled_handshake_closes_the_connection():
+    async def main():
+        silent = SilentServer()
+        server, port = await serve(silent.handle)
+        async with server:
+            client = MCPClient("127.0.0.1", port, timeout=5)
+            connecting = asyncio.ensure_future(client.connect())
+            await asyncio.sleep(0.05)
+            connecting.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await connecting
+            await asyncio.wait_for(silent.closed.wait(), 1)
+            await asyncio.sleep(0)
+            return client
+
+    client = asyncio.run(main())
+    assert not client.connected
+    assert client._reader_task.done()
+
+
+def test_requests_need_a_connection():
+    client = MCPClient("127.0.0.1", 1)
+    with pytest.raises(ConnectionError):
+        asyncio.run(client.request("ping"))
@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+
+from backend import crud, schemas
+from backend.database import AsyncSessionLocal
+from backend.mcp_manager import CommandBackend, MockBackend, mcp_manager
+
+
+class SlowBackend(MockBackend):
+    """The mock backend, taking a while per command and metrics fetch"""
+
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.executed = []
+
+    async def execute(self, server, command: str) -> str:
+        self.executed.append((server.id, command))
+        await asyncio.sleep(self.delay)
+        return await super().execute(server, command)
+
+    async def metrics(self, server):
+        await asyncio.sleep(self.delay)
+        return await super().metrics(server)
+
+
+@pytest.fixture
+def backend(database):
+    backend = SlowBackend()
+    mcp_manager.set_backend(backend)
+    yield backend
+    mcp_manager.set_backend(None)
+
+
+async def add_server(name: str = "alpha") -> int:
+    async with AsyncSessionLocal() as db:
+        server = await crud.create_mcpserver(db, schemas.MCPServerCreate(name=name, host="localhost", port=1, type="web"))
+    return server.id
+
+
+def test_identical_idempotent_commands_run_once(backend, run):
+    async def main():
+        server_id = await add_server()
+        async with AsyncSessionLocal() as db:
+            return await asyncio.gather(*(mcp_manager.execute_command(db, server_id, "ls") for _ in range(5)))
+
+    results = run(main())
+    assert all(result["success"] for result in results)
+    assert len(backend.executed) == 1
+
+
+def test_shared_calls_outlive_the_session_of_the_first_caller(backend, run):
+    async def main():
+        server_id = await add_server()
+        first_db = AsyncSessionLocal()
+        first = asyncio.ensure_future(mcp_manager.get_server_metrics(first_db, server_id))
+        await asyncio.sleep(0)
+        async with AsyncSessionLocal() as db:
+            second = asyncio.ensure_future(mcp_manager.get_server_metrics(db, server_id))
+            await asyncio.sleep(0)
+            # The first request is cancelled and its session closed while the fetch runs
+            first.cancel()
+            await first_db.close()
+            with pytest.raises(asyncio.CancelledError):
+                await first
+            return await second
+
+    result = run(main())
+    assert result["success"] and "cpu_usage" in result["metrics"]
+
+
+def test_shared_calls_do_not_use_the_callers_session(backend, run, monkeypatch):
+    sessions = []
+    execute = type(mcp_manager)._execute_command
+
+    async def recording(self, db, *args):
+        sessions.append(db)
+        return await execute(self, db, *args)
+
+    monkeypatch.setattr(type(mcp_manager), "_execute_command", recording)
+
+    async def main():
+        server_id = await add_server()
+        async with AsyncSessionLocal() as db:
+            await mcp_manager.execute_command(db, server_id, "ps")
+            await mcp_manager.execute_command(db, server_id, "echo hi")
+            return db
+
+    caller_db = run(main())
+    # The idempotent command ran in a session of its own, the other one in the caller's
+    assert sessions[0] is not caller_db and sessions[1] is caller_db
+
+
+def test_backends_must_implement_execute():
+    class Incomplete(CommandBackend):
+        async def connect(self, server):
+            pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+    assert isinstance(MockBackend(), CommandBackend)
+
+
+def test_connects_report_the_server_not_the_backend(backend, run):
+    async def main():
+        server_id = await add_server()
+        async with AsyncSessionLocal() as db:
+            return await mcp_manager.connect_server(db, server_id), await mcp_manager.disconnect_server(db, server_id)
+
+    connected, disconnected = run(main())
+    assert connected["success"] and connected["message"] == "Connected to alpha"
+    assert disconnected["success"] and disconnected["message"] == "Disconnected from alpha"
@@ -0,0 +1,68 @@
+import time
+from collections import namedtuple
+
+import psutil
+import pytest
+
+from backend import monitoring
+from backend.monitoring import HostMetricsSampler
+
+NetCounters = namedtuple("NetCounters", "bytes_sent bytes_recv")
+
+
+@pytest.fixture
+def host(monkeypatch):
+    """Fake psutil counters; set host["net"] to move them"""
+    host = {"net": NetCounters(1000, 5000)}
+    monkeypatch.setattr(psutil, "cpu_percent", lambda interval=None, percpu=False: [10.0, 30.0])
+    monkeypatch.setattr(psutil, "net_io_counters", lambda: host["net"])
+    return host
+
+
+def test_sample_computes_rates_from_counter_deltas(host):
+    sampler = HostMetricsSampler()
+    first = sampler.sample()
+    assert first["cpu_usage"] == 20.0 and first["cpu_per_core"] == [10.0, 30.0]
+    assert first["network_activity"]["bytes_sent_per_sec"] == 0.0
+
+    sampler._last_net = (time.monotonic() - 2, host["net"])
+    host["net"] = NetCounters(3000, 4000)
+    activity = sampler.sample()["network_activity"]
+    assert activity["bytes_sent"] == 3000
+    assert activity["bytes_sent_per_sec"] == pytest.approx(1000, rel=0.05)
+    # A counter that went back (wrapped or reset) gives no negative rate
+    assert activity["bytes_recv_per_sec"] == 0.0
+
+
+def test_history_is_a_bounded_window(host):
+    sampler = HostMetricsSampler(history=3)
+    for i in range(5):
+        sampler.samples.append(dict(sampler.sample(), i=i))
+    assert [sample["i"] for sample in sampler.window(10)] == [2, 3, 4]
+    assert [sample["i"] for sample in sampler.window(2)] == [3, 4]
+    assert sampler.window(0) == []
+    assert sampler.latest()["i"] == 4
+
+
+def test_sampler_thread_collects_until_stopped():
+    sampler = HostMetricsSampler(interval=0.01)
+    sampler.start()
+    try:
+        deadline = time.monotonic() + 5
+        while len(sampler.samples) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        sampler.stop()
+    assert len(sampler.samples) >= 2 and sampler._thread is None
+    count = len(sampler.samples)
+    time.sleep(0.05)
+    assert len(sampler.samples) == count
+
+
+def test_metrics_return_the_latest_sample_and_history(client):
+    monitoring.sampler.samples.clear()
+    response = client.get("/metrics", params={"window": 5})
+    assert response.status_code == 200
+    metrics = response.json()
+    assert {"cpu_usage", "cpu_per_core", "ram_usage", "disk_usage", "network_activity"} <= set(metrics)
+    assert metrics["history"][-1]["timestamp"] == metrics["timestamp"]
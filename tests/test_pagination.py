@@ -0,0 +1,89 @@
+from datetime import datetime
+
+import pytest
+
+from backend import crud, models
+
+
+def add_server(client, name, type="web"):
+    response = client.post("/create_server_test/", json={"name": name, "host": "localhost", "port": 1, "type": type})
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+def add_tasks(client, server_id, count):
+    response = client.post("/tasks/bulk", json=[
+        {"name": f"task-{i}", "command": "ls", "server_id": server_id} for i in range(count)
+    ])
+    assert response.status_code == 200
+    return [item["id"] for item in response.json()]
+
+
+def pages(client, url, limit):
+    """Every page of a listing, following its X-Next-Cursor headers"""
+    result = []
+    response = client.get(url, params={"limit": limit})
+    while True:
+        assert response.status_code == 200
+        result.append([item["id"] for item in response.json()])
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            return result
+        assert response.headers["link"].endswith('>; rel="next"') and f"cursor={cursor}" in response.headers["link"]
+        response = client.get(url, params={"limit": limit, "cursor": cursor})
+
+
+def test_task_pages_follow_the_cursor(client):
+    server_id = add_server(client, "alpha")
+    ids = add_tasks(client, server_id, 7)
+    assert pages(client, "/tasks", 3) == [ids[:3], ids[3:6], ids[6:]]
+    assert pages(client, "/tasks", 7) == [ids]
+
+
+def test_task_pages_break_ties_on_the_id(client, database):
+    server_id = add_server(client, "alpha")
+    created_at = datetime(2024, 1, 1, 12, 0, 0)
+    with database.engine.begin() as connection:
+        ids = [
+            connection.execute(models.Task.__table__.insert(), {
+                "name": f"task-{i}", "command": "ls", "server_id": server_id, "status": "completed", "created_at": created_at
+            }).inserted_primary_key[0]
+            for i in range(5)
+        ]
+    assert pages(client, "/tasks", 2) == [ids[:2], ids[2:4], ids[4:]]
+
+
+def test_tasks_created_during_paging_come_last(client):
+    server_id = add_server(client, "alpha")
+    ids = add_tasks(client, server_id, 4)
+    first = client.get("/tasks", params={"limit": 2})
+    added = add_tasks(client, server_id, 1)
+    rest = client.get("/tasks", params={"limit": 10, "cursor": first.headers["x-next-cursor"]})
+    assert [task["id"] for task in first.json() + rest.json()] == ids + added
+
+
+def test_server_pages_follow_the_cursor_with_filters(client):
+    ids = [add_server(client, f"server-{i}", type="db" if i % 2 else "web") for i in range(6)]
+    assert pages(client, "/servers", 4) == [ids[:4], ids[4:]]
+    assert pages(client, "/servers?type=db", 2) == [ids[1::2][:2], ids[1::2][2:]]
+
+
+@pytest.mark.parametrize("url", ["/tasks", "/tasks/archive", "/servers"])
+@pytest.mark.parametrize("cursor", [
+    "not-a-cursor!",
+    crud.encode_cursor("2024-01-01T00:00:00"),
+    crud.encode_cursor("yesterday", 1),
+    crud.encode_cursor({"id": 1}),
+])
+def test_invalid_cursors_are_rejected(client, url, cursor):
+    response = client.get(url, params={"cursor": cursor})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+def test_cursors_round_trip():
+    task = models.Task(id=7, created_at=datetime(2024, 5, 1, 8, 30, 15, 250000))
+    assert crud.parse_task_cursor(crud.task_cursor(task)) == (task.created_at, 7)
+    assert crud.parse_mcpserver_cursor(crud.mcpserver_cursor(models.MCPServer(id=3))) == 3
+    with pytest.raises(ValueError):
+        crud.parse_mcpserver_cursor(crud.encode_cursor("3"))
@@ -0,0 +1,110 @@
+import time
+
+import pytest
+
+from backend.ratelimit import RateLimiter, TokenBucket
+
+
+def test_bucket_refills_up_to_its_burst():
+    bucket = TokenBucket(rate=2, burst=4)
+    now = bucket.updated
+    bucket.tokens = 0
+    assert bucket.wait_time() == pytest.approx(0.5)
+    bucket.refill(now + 1)
+    assert bucket.tokens == pytest.approx(2)
+    assert not bucket.is_full(now + 1)
+    bucket.refill(now + 10)
+    assert bucket.tokens == 4
+    assert bucket.is_full(now + 10)
+
+
+def test_bucket_without_rate_never_refills():
+    bucket = TokenBucket(rate=0, burst=1)
+    bucket.tokens = 0
+    assert bucket.wait_time() == float("inf")
+
+
+def limiter(**limits) -> RateLimiter:
+    rate_limiter = RateLimiter()
+    rate_limiter.configure(limits)
+    return rate_limiter
+
+
+def test_rejects_a_user_over_its_burst_with_retry_after():
+    rate_limiter = limiter(per_user={"rate": 0.5, "burst": 2})
+    assert rate_limiter.try_acquire(1, "web", "user:1") is None
+    assert rate_limiter.try_acquire(1, "web", "user:1") is None
+    rejection = rate_limiter.try_acquire(1, "web", "user:1")
+    assert rejection["status_code"] == 429
+    assert rejection["message"] == "Rate limit exceeded (user)"
+    assert rejection["retry_after"] == 2
+    # Other users have their own bucket
+    assert rate_limiter.try_acquire(1, "web", "user:2") is None
+    assert rate_limiter.get_stats()["rejected_user"] == 1
+
+
+def test_per_server_limits_by_type():
+    rate_limiter = limiter(per_server={"db": {"rate": 0, "burst": 1}})
+    assert rate_limiter.try_acquire(1, "db", "user:1") is None
+    rejection = rate_limiter.try_acquire(1, "db", "user:1")
+    assert rejection["status_code"] == 429 and rejection["retry_after"] == 60
+    # Servers of other types use the default limit
+    assert rate_limiter.try_acquire(2, "web", "user:1") is None
+
+
+def test_sheds_load_when_too_many_requests_are_in_flight():
+    rate_limiter = limiter(max_inflight=2, max_queue_depth=10)
+    assert rate_limiter.try_acquire(1, "web", "user:1") is None
+    assert rate_limiter.try_acquire(1, "web", "user:1") is None
+    assert rate_limiter.try_acquire(1, "web", "user:1")["status_code"] == 503
+    rate_limiter.release()
+    assert rate_limiter.try_acquire(1, "web", "user:1", queue_depth=10)["status_code"] == 503
+    stats = rate_limiter.get_stats()
+    assert stats["shed_inflight"] == 1 and stats["shed_queue"] == 1 and stats["inflight"] == 1
+
+
+def test_sweep_drops_refilled_buckets_only():
+    rate_limiter = limiter(per_user={"rate": 100, "burst": 1}, per_server={"default": {"rate": 0.001, "burst": 100}})
+    for user in range(20):
+        assert rate_limiter.try_acquire(1, "web", f"user:{user}") is None
+        rate_limiter.release()
+    assert rate_limiter.get_stats()["buckets"] == 22
+
+    time.sleep(0.1)
+    rate_limiter._next_sweep = 0
+    # Sweeps before taking a token: the refilled user buckets and the global one
+    # are dropped, the drained server bucket is kept with its tokens
+    assert rate_limiter.try_acquire(1, "web", "user:0") is None
+    stats = rate_limiter.get_stats()
+    assert stats["buckets_evicted"] == 21
+    assert stats["buckets"] == 3
+    assert rate_limiter._buckets[("server", 1)].tokens == pytest.approx(79, abs=0.1)
+
+
+def test_configure_is_a_no_op_for_the_same_config():
+    config = {"per_user": {"rate": 1, "burst": 1}}
+    rate_limiter = limiter()
+    rate_limiter.configure(config)
+    assert rate_limiter.try_acquire(1, "web", "user:1") is None
+    rate_limiter.configure(config)
+    assert rate_limiter.try_acquire(1, "web", "user:1")["status_code"] == 429
+
+
+def test_partial_overrides_keep_the_other_defaults():
+    rate_limiter = limiter(per_user={"rate": 5}, per_server={"default": {"burst": 3}, "db": {"rate": 1}})
+    limits = rate_limiter._limits
+    assert limits["per_user"] == {"rate": 5, "burst": 100}
+    assert limits["global"] == {"rate": 500, "burst": 1000}
+    # Server types take what they do not set from the merged default
+    assert limits["per_server"]["default"] == {"rate": 100, "burst": 3}
+    assert limits["per_server"]["db"] == {"rate": 1, "burst": 3}
+    assert rate_limiter.try_acquire(1, "db", "user:1") is None
+
+
+def test_unknown_keys_are_ignored():
+    rate_limiter = limiter(per_user={"rate": 5, "brust": 1}, per_ip={"rate": 1}, global_="x", per_server={"db": 7})
+    limits = rate_limiter._limits
+    assert limits["per_user"] == {"rate": 5, "burst": 100}
+    assert limits["per_server"]["db"] == {"rate": 100, "burst": 200}
+    assert set(limits) == {"global", "per_user", "per_server", "max_inflight", "max_queue_depth"}
+    assert rate_limiter.try_acquire(1, "db", "user:1") is None
@@ -0,0 +1,135 @@
+import sqlite3
+
+from sqlalchemy import event
+
+from backend import crud, database, schemas
+from backend.database import AsyncSessionLocal
+from backend.registry import ServerRecord, ServerRegistry, registry
+
+
+def server(name, port=1):
+    return schemas.MCPServerCreate(name=name, host="localhost", port=port, type="web")
+
+
+def server_queries(statements):
+    return [statement for statement in statements if "FROM mcpservers" in statement]
+
+
+class recording_statements:
+    def __enter__(self):
+        self.statements = []
+        event.listen(database.async_engine.sync_engine, "before_cursor_execute", self.record)
+        return self.statements
+
+    def record(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    def __exit__(self, *exc):
+        event.remove(database.async_engine.sync_engine, "before_cursor_execute", self.record)
+
+
+def test_writes_go_through_to_the_registry(database, run, monkeypatch):
+    monkeypatch.setattr(crud, "REGISTRY_CHECK_INTERVAL", 60)
+
+    async def main():
+        async with AsyncSessionLocal() as db:
+            alpha = await crud.create_mcpserver(db, server("alpha"))
+            beta = await crud.create_mcpserver(db, server("beta"))
+            with recording_statements() as statements:
+                await crud.update_mcpserver(db, alpha.id, schemas.MCPServerUpdate(name="gamma", host="localhost", port=2, type="web"))
+                await crud.delete_mcpserver(db, beta.id)
+                listed = await crud.get_mcpservers(db)
+                renamed = await crud.get_mcpserver_by_name(db, "gamma")
+            return alpha, listed, renamed, statements
+
+    alpha, listed, renamed, statements = run(main())
+    assert [record.name for record in listed] == ["gamma"]
+    assert renamed.id == alpha.id and renamed.port == 2
+    assert registry.get_by_name("alpha") is None
+    # Only the writes touched the servers table
+    assert not [statement for statement in server_queries(statements) if statement.startswith("SELECT")]
+
+
+def test_local_writes_keep_the_registry_current(database, run, monkeypatch):
+    monkeypatch.setattr(crud, "REGISTRY_CHECK_INTERVAL", 0)
+    loads = []
+    load = ServerRegistry.load
+
+    async def counting(self, db):
+        loads.append(1)
+        await load(self, db)
+    monkeypatch.setattr(ServerRegistry, "load", counting)
+
+    async def main():
+        async with AsyncSessionLocal() as db:
+            # The first write starts the version at the current time, so the registry reloads once
+            await crud.create_mcpserver(db, server("first"))
+            await crud.get_mcpservers(db)
+            loads.clear()
+            for i in range(3):
+                await crud.create_mcpserver(db, server(f"server-{i}"))
+            await crud.get_mcpservers(db)
+            return registry.db_version, await crud._stored_version(db, "servers")
+
+    db_version, stored = run(main())
+    assert db_version == stored
+    assert loads == []
+
+
+def test_changes_of_other_processes_are_loaded_after_the_check_interval(database, run, monkeypatch):
+    monkeypatch.setattr(crud, "REGISTRY_CHECK_INTERVAL", 60)
+
+    async def names():
+        async with AsyncSessionLocal() as db:
+            return [record.name for record in await crud.get_mcpservers(db)]
+
+    async def add(name):
+        async with AsyncSessionLocal() as db:
+            await crud.create_mcpserver(db, server(name))
+
+    run(add("alpha"))
+    assert run(names()) == ["alpha"]
+    with sqlite3.connect("mcp.db") as connection:
+        connection.execute("INSERT INTO mcpservers (name, host, port, type, status) VALUES ('other', 'localhost', 1, 'web', 0)")
+        connection.execute("UPDATE collection_versions SET version = version + 1 WHERE collection = 'servers'")
+
+    assert run(names()) == ["alpha"]
+    monkeypatch.setattr(crud, "REGISTRY_CHECK_INTERVAL", 0)
+    assert run(names()) == ["alpha", "other"]
+
+
+def test_a_local_write_after_another_process_wrote_forces_a_reload(database, run, monkeypatch):
+    monkeypatch.setattr(crud, "REGISTRY_CHECK_INTERVAL", 60)
+
+    async def main():
+        async with AsyncSessionLocal() as db:
+            await crud.create_mcpserver(db, server("alpha"))
+            assert [record.name for record in await crud.get_mcpservers(db)] == ["alpha"]
+            with sqlite3.connect("mcp.db") as connection:
+                connection.execute("INSERT INTO mcpservers (name, host, port, type, status) VALUES ('other', 'localhost', 1, 'web', 0)")
+                connection.execute("UPDATE collection_versions SET version = version + 1 WHERE collection = 'servers'")
+            # The version skipped one, so the registry no longer matches the database
+            await crud.create_mcpserver(db, server("beta"))
+            return [record.name for record in await crud.get_mcpservers(db)]
+
+    assert run(main()) == ["alpha", "other", "beta"]
+
+
+def test_views_are_reused_until_a_server_changes():
+    servers = ServerRegistry()
+    changed = []
+    servers.subscribe(changed.append)
+    servers.put(ServerRecord(id=1, name="alpha"))
+    builds = []
+
+    def build():
+        builds.append(1)
+        return [record.name for record in servers.list()]
+
+    assert servers.view("names", build) == ["alpha"]
+    assert servers.view("names", build) == ["alpha"]
+    servers.update(1, name="beta")
+    assert servers.view("names", build) == ["beta"]
+    assert len(builds) == 2 and servers.view_stats == {"hits": 1, "misses": 2}
+    servers.remove(1, notify=False)
+    assert changed == [1, 1] and len(servers) == 0
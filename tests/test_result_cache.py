@@ -0,0 +1,52 @@
+from backend.result_cache import ResultCache
+
+
+def test_result_is_not_stored_after_the_server_was_written():
+    results = ResultCache()
+    generation = results.generation(1)
+    results.invalidate_server(1)
+    assert not results.set(1, "status", "stale", generation)
+    assert results.set(1, "status", "fresh", results.generation(1))
+    assert results.get(1, "status") == "fresh"
+
+
+def test_commands_with_a_ttl_of_zero_are_not_cached():
+    results = ResultCache()
+    results.configure({"default_ttl": 0, "ttls": {"status": 10}})
+    assert not results.set(1, "deploy app", "done")
+    assert results.set(1, "STATUS all", "ok")
+    assert results.get(1, "status all") == "ok"
+    assert results.get(1, "status other") is None
+
+
+def test_forget_server_drops_its_generation_and_results():
+    results = ResultCache()
+    for server_id in range(100):
+        results.invalidate_server(server_id)
+        results.set(server_id, "status", server_id)
+    in_flight = results.generation(5)
+    for server_id in range(100):
+        results.forget_server(server_id)
+    assert results._generations == {}
+    assert results._server_keys == {}
+    assert results.get(5, "status") is None
+    # A result that was in flight while the server was released is not stored
+    assert not results.set(5, "status", "stale", in_flight)
+    assert results.set(5, "status", "fresh", results.generation(5))
+
+
+def test_forget_server_keeps_the_generations_of_other_servers():
+    results = ResultCache()
+    results.invalidate_server(1)
+    generation = results.generation(1)
+    results.forget_server(2)
+    assert results.set(1, "status", "ok", generation)
+
+
+def test_invalidating_a_server_drops_only_its_results():
+    results = ResultCache()
+    results.set(1, "status", "one")
+    results.set(2, "status", "two")
+    results.invalidate_server(1)
+    assert results.get(1, "status") is None
+    assert results.get(2, "status") == "two"
@@ -0,0 +1,148 @@
+import asyncio
+import gzip
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select, update
+
+from backend import models, retention
+from backend.retention import Compactor, read_archive
+
+OLD = datetime.utcnow() - timedelta(days=10)
+NEW = datetime.utcnow() - timedelta(hours=1)
+
+
+@pytest.fixture
+def archive_dir(tmp_path):
+    return str(tmp_path / "archive")
+
+
+@pytest.fixture
+def compactor(database, archive_dir):
+    compactor = Compactor()
+    policy = {"enabled": True, "max_age_days": 7, "max_per_server": 2, "batch_size": 3, "archive_dir": archive_dir}
+    compactor._settings = lambda: {"task_retention": policy}
+    return compactor
+
+
+def add_tasks(database, tasks):
+    """Insert (server_id, status, created_at) tasks; returns their ids"""
+    with database.engine.begin() as connection:
+        for server_id in {server_id for server_id, _, _ in tasks}:
+            connection.execute(models.MCPServer.__table__.insert(), {
+                "id": server_id, "name": f"server-{server_id}", "host": "localhost", "port": 1, "type": "web"
+            })
+        return [
+            connection.execute(models.Task.__table__.insert(), {
+                "name": f"task-{i}", "command": "ls", "server_id": server_id, "status": status, "created_at": created_at
+            }).inserted_primary_key[0]
+            for i, (server_id, status, created_at) in enumerate(tasks)
+        ]
+
+
+def remaining(database):
+    with database.engine.connect() as connection:
+        return sorted(connection.scalars(select(models.Task.id)).all())
+
+
+def test_archives_old_and_excess_finished_tasks(database, compactor, archive_dir, run):
+    ids = add_tasks(database, [
+        (1, "completed", OLD),
+        (1, "pending", OLD),
+        (1, "failed", OLD + timedelta(minutes=1)),
+        (2, "completed", NEW),
+        (2, "completed", NEW + timedelta(minutes=1)),
+        (2, "failed", NEW + timedelta(minutes=2)),
+        (2, "completed", NEW + timedelta(minutes=3)),
+    ])
+    result = run(compactor.run_once())
+
+    # Old finished tasks expire, unfinished ones never do; server 2 keeps its newest two
+    archived = [ids[0], ids[2], ids[3], ids[4]]
+    assert result["archived"] == 4
+    assert remaining(database) == [ids[1], ids[5], ids[6]]
+    rows = read_archive(archive_dir)
+    assert [row["id"] for row in rows] == archived
+    assert rows[0]["status"] == "completed" and rows[0]["server_id"] == 1
+    # One partition per creation day
+    days = {row["created_at"][:10] for row in rows}
+    assert {partition["day"] for partition in retention.list_partitions(archive_dir)} == days
+    assert [row["id"] for row in read_archive(archive_dir, server_id=2)] == [ids[3], ids[4]]
+    assert [row["id"] for row in read_archive(archive_dir, limit=1, after=(OLD, ids[0]))] == [ids[2]]
+
+
+def test_keeps_a_task_rerun_while_its_batch_is_archived(database, compactor, archive_dir, run, monkeypatch):
+    ids = add_tasks(database, [(1, "completed", OLD), (1, "completed", OLD + timedelta(seconds=1))])
+    select_batch = Compactor._expired_batch
+
+    async def rerun_after_selecting(self, db, policy):
+        batch = await select_batch(self, db, policy)
+        # Another request re-runs the first task before the batch is deleted
+        with database.engine.begin() as connection:
+            connection.execute(update(models.Task).where(models.Task.id == ids[0]).values(status="running"))
+        return batch
+
+    monkeypatch.setattr(Compactor, "_expired_batch", rerun_after_selecting)
+    result = run(compactor.run_once())
+
+    assert result["archived"] == 1
+    assert remaining(database) == [ids[0]]
+    assert [row["id"] for row in read_archive(archive_dir)] == [ids[1]]
+
+
+def test_a_retried_batch_is_archived_once(database, compactor, archive_dir, run):
+    ids = add_tasks(database, [(1, "completed", OLD), (1, "failed", OLD)])
+    policy = compactor.policy()
+    written = set()
+
+    async def fail(session):
+        raise RuntimeError("failed write")
+
+    async def main():
+        # Committed together, then retried one at a time after the other one failed
+        return await asyncio.gather(
+            database.writer.run(lambda session: retention._archive_batch(session, policy, ids, written)),
+            database.writer.run(fail),
+            return_exceptions=True,
+        )
+
+    removed, error = run(main())
+    assert removed == 2 and isinstance(error, RuntimeError)
+    assert database.writer.stats["retried_batches"] >= 1
+    assert remaining(database) == []
+    day = OLD.date().isoformat()
+    with gzip.open(retention._partition_path(archive_dir, day), "rt") as f:
+        assert sorted(json.loads(line)["id"] for line in f) == ids
+
+
+def test_skips_the_pass_while_another_process_compacts(database, compactor, archive_dir, run):
+    ids = add_tasks(database, [(1, "completed", OLD)])
+    with retention._pass_lock(archive_dir) as acquired:
+        assert acquired
+        result = run(compactor.run_once())
+    assert result["skipped"] == "another process is compacting"
+    assert compactor.stats["skipped_passes"] == 1
+    assert remaining(database) == ids
+
+    assert run(compactor.run_once())["archived"] == 1
+    assert os.path.exists(os.path.join(archive_dir, retention.LOCK_FILE))
+
+
+def test_archive_queries_accept_times_with_a_time_zone(database, compactor, archive_dir, run, client, write_config):
+    ids = add_tasks(database, [(1, "completed", OLD), (1, "completed", OLD + timedelta(hours=3))])
+    run(compactor.run_once())
+    # Two hours ahead of UTC: one hour after the first task
+    plus_two = timezone(timedelta(hours=2))
+    between = (OLD + timedelta(hours=3)).replace(tzinfo=timezone.utc).astimezone(plus_two) - timedelta(hours=2)
+    assert [row["id"] for row in read_archive(archive_dir, created_after=between)] == [ids[1]]
+    assert [row["id"] for row in read_archive(archive_dir, created_before=between)] == [ids[0]]
+    assert [row["id"] for row in read_archive(archive_dir, after=(OLD.replace(tzinfo=timezone.utc), ids[0]))] == [ids[1]]
+
+    write_config({"servers": [], "task_retention": {"archive_dir": archive_dir}})
+    utc = (OLD + timedelta(hours=1)).isoformat() + "Z"
+    response = client.get("/tasks/archive", params={"created_after": utc})
+    assert response.status_code == 200 and [row["id"] for row in response.json()] == [ids[1]]
+    response = client.get("/tasks/archive", params={"created_before": between.isoformat()})
+    assert response.status_code == 200 and [row["id"] for row in response.json()] == [ids[0]]
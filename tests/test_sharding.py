@@ -0,0 +1,161 @@
+import asyncio
+import os
+import shutil
+import tempfile
+from collections import Counter
+
+import orjson
+import pytest
+
+from backend import sharding
+from backend.sharding import HashRing, ShardRouter
+
+KEYS = range(1, 2001)
+
+
+def owners(ring: HashRing):
+    return {key: ring.owner(key) for key in KEYS}
+
+
+def test_empty_ring_has_no_owner():
+    assert HashRing([]).owner(1) is None
+
+
+def test_owners_are_stable_and_spread():
+    ring = HashRing(["a", "b", "c"])
+    assert owners(ring) == owners(HashRing(["c", "b", "a", "a"]))
+    counts = Counter(owners(ring).values())
+    assert set(counts) == {"a", "b", "c"}
+    assert min(counts.values()) > len(KEYS) / 3 * 0.6
+
+
+def test_adding_a_node_only_moves_keys_to_it():
+    before = owners(HashRing(["a", "b", "c"]))
+    after = owners(HashRing(["a", "b", "c", "d"]))
+    moved = [key for key in KEYS if before[key] != after[key]]
+    assert moved and all(after[key] == "d" for key in moved)
+    assert len(moved) < len(KEYS) / 4 * 1.5
+
+
+def test_removing_a_node_only_moves_its_keys():
+    before = owners(HashRing(["a", "b", "c"]))
+    after = owners(HashRing(["a", "c"]))
+    assert all(before[key] == "b" for key in KEYS if before[key] != after[key])
+
+
+class Manager:
+    """Runs operations that were not forwarded"""
+
+    def __init__(self):
+        self.connections = {}
+        self.released = []
+        self.calls = []
+
+    async def execute_command(self, db, server_id, command):
+        self.calls.append((server_id, command))
+        return {"success": True, "message": f"ran {command} here"}
+
+    def release_server(self, server_id):
+        self.released.append(server_id)
+
+
+@pytest.fixture
+def router():
+    # Unix socket paths are short, so not under pytest's tmp_path
+    shard_dir = tempfile.mkdtemp(prefix="shards-")
+    router = ShardRouter(shard_dir)
+    router._manager = Manager()
+    # Another live worker: pid 1 always exists
+    router.ring = HashRing([router.worker_id, "worker-1"])
+    yield router
+    shutil.rmtree(shard_dir)
+
+
+def remote_server(router: ShardRouter) -> int:
+    return next(key for key in KEYS if router.ring.owner(key) == "worker-1")
+
+
+async def serve_owner(router: ShardRouter, handle):
+    return await asyncio.start_unix_server(handle, router._socket_path("worker-1"))
+
+
+def test_forward_returns_the_owners_reply(router):
+    server_id = remote_server(router)
+    received = []
+
+    async def handle(reader, writer):
+        received.append(orjson.loads(await reader.readline()))
+        writer.write(b'{"success": true, "message": "ran there"}\n')
+        await writer.drain()
+        writer.close()
+
+    async def main():
+        async with await serve_owner(router, handle):
+            return await router.forward("execute_command", server_id, ("ls",), {})
+
+    assert asyncio.run(main()) == {"success": True, "message": "ran there"}
+    assert received == [{"op": "execute_command", "server_id": server_id, "args": ["ls"], "kwargs": {}}]
+    assert router._manager.calls == []
+    assert router.stats["forwarded"] == 1
+
+
+def test_forward_runs_locally_when_the_owner_is_gone(router):
+    server_id = remote_server(router)
+    # No socket: the owner went away, so after a refresh this worker owns everything
+    result = asyncio.run(router.forward("execute_command", server_id, ("ls",), {}))
+    assert result == {"success": True, "message": "ran ls here"}
+    assert router._manager.calls == [(server_id, "ls")]
+    assert router.ring.nodes == (router.worker_id,)
+    assert router.stats["forward_errors"] == 1
+
+
+def test_forward_never_runs_locally_after_the_request_was_sent(router, monkeypatch):
+    monkeypatch.setattr(sharding, "FORWARD_TIMEOUT", 0.2)
+    server_id = remote_server(router)
+
+    async def handle(reader, writer):
+        # Receives the operation, then goes away while running it
+        await reader.readline()
+        os.unlink(router._socket_path("worker-1"))
+        await asyncio.sleep(1)
+        writer.close()
+
+    async def main():
+        async with await serve_owner(router, handle):
+            return await router.forward("execute_command", server_id, ("ls",), {})
+
+    result = asyncio.run(main())
+    assert result == {"success": False, "message": f"Worker owning server {server_id} is unavailable"}
+    assert router._manager.calls == []
+    assert router.stats["forward_errors"] == 1
+
+
+def test_forward_reports_an_owner_that_closed_without_replying(router):
+    server_id = remote_server(router)
+
+    async def handle(reader, writer):
+        await reader.readline()
+        os.unlink(router._socket_path("worker-1"))
+        writer.close()
+
+    async def main():
+        async with await serve_owner(router, handle):
+            return await router.forward("execute_command", server_id, ("ls",), {})
+
+    assert asyncio.run(main())["success"] is False
+    assert router._manager.calls == []
+
+
+def test_refresh_releases_servers_that_moved_away(router):
+    server_id = remote_server(router)
+    router.ring = HashRing([router.worker_id])
+    router._manager.connections = {server_id: object()}
+    open(router._socket_path("worker-1"), "w").close()
+    router.refresh()
+    assert router.ring.nodes == tuple(sorted([router.worker_id, "worker-1"]))
+    assert router._manager.released == [server_id]
+    # A socket left behind by a worker that died is removed
+    os.rename(router._socket_path("worker-1"), router._socket_path(f"worker-{2 ** 22 + 1}"))
+    router.refresh()
+    assert router.ring.nodes == (router.worker_id,)
+    assert os.listdir(router.shard_dir) == []
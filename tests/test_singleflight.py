@@ -0,0 +1,153 @@
+import asyncio
+import gc
+import threading
+import time
+
+import pytest
+
+from backend.singleflight import SingleFlight
+
+
+def test_do_coalesces_concurrent_calls():
+    group = SingleFlight()
+    calls = []
+    started = threading.Event()
+
+    def load():
+        calls.append(1)
+        started.set()
+        time.sleep(0.1)
+        return {"value": 1}
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(group.do("key", load)))
+    leader.start()
+    started.wait()
+    followers = [threading.Thread(target=lambda: results.append(group.do("key", load))) for _ in range(4)]
+    for thread in followers:
+        thread.start()
+    for thread in [leader] + followers:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len(results) == 5 and all(result is results[0] for result in results)
+    assert group.in_flight() == 0
+
+
+def test_do_shares_the_exception_and_forgets_the_call():
+    group = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def fail():
+        started.set()
+        release.wait()
+        raise ValueError("boom")
+
+    errors = []
+
+    def call():
+        try:
+            group.do("key", fail)
+        except ValueError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call)]
+    threads[0].start()
+    started.wait()
+    threads += [threading.Thread(target=call) for _ in range(2)]
+    for thread in threads[1:]:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(errors) == 3
+    assert group.in_flight() == 0
+    # The failure is not remembered
+    assert group.do("key", lambda: 2) == 2
+
+
+def test_do_async_coalesces_concurrent_calls():
+    group = SingleFlight()
+    calls = []
+
+    async def load(value):
+        calls.append(value)
+        await asyncio.sleep(0.05)
+        return [value]
+
+    async def main():
+        results = await asyncio.gather(*(group.do_async("key", load, 1) for _ in range(5)))
+        return results, group.in_flight()
+
+    results, in_flight = asyncio.run(main())
+    assert calls == [1]
+    assert all(result is results[0] for result in results)
+    assert in_flight == 0
+
+
+def test_do_async_shares_the_exception():
+    group = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise KeyError("missing")
+
+    async def main():
+        return await asyncio.gather(*(group.do_async("key", fail) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert len(results) == 3 and all(isinstance(result, KeyError) for result in results)
+    assert group.in_flight() == 0
+
+
+def test_cancelling_the_first_caller_does_not_cancel_the_others():
+    group = SingleFlight()
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return "done"
+
+    async def main():
+        leader = asyncio.ensure_future(group.do_async("key", load))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(group.do_async("key", load))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(main()) == "done"
+    assert calls == [1]
+    assert group.in_flight() == 0
+
+
+def test_a_call_whose_callers_were_all_cancelled_is_forgotten():
+    group = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("nobody is waiting")
+
+    async def main():
+        caller = asyncio.ensure_future(group.do_async("key", fail))
+        await asyncio.sleep(0)
+        caller.cancel()
+        # The execution keeps running after its only caller went away
+        await asyncio.sleep(0.05)
+        gc.collect()
+        return group.in_flight()
+
+    loop = asyncio.new_event_loop()
+    unhandled = []
+    loop.set_exception_handler(lambda loop, context: unhandled.append(context))
+    try:
+        assert loop.run_until_complete(main()) == 0
+    finally:
+        loop.close()
+    assert unhandled == []
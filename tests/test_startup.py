@@ -0,0 +1,81 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import auth, main, startup
+from backend.startup import StartupReport
+
+
+@pytest.fixture
+def report(monkeypatch):
+    report = StartupReport()
+    monkeypatch.setattr(startup, "report", report)
+    return report
+
+
+def test_report_records_phases_and_status(report):
+    assert report.to_dict()["status"] == "starting"
+    with report.phase("schema"):
+        pass
+    report.mark_serving()
+    assert not report.ready and report.serving_after is not None
+    report.mark_ready()
+    state = report.to_dict()
+    assert state["status"] == "ready" and list(state["phases_ms"]) == ["schema"]
+    assert state["ready_after_ms"] >= state["serving_after_ms"]
+
+    failed = StartupReport()
+    failed.mark_failed(ValueError("no database"))
+    assert failed.to_dict()["status"] == "failed" and failed.to_dict()["error"] == "ValueError: no database"
+
+
+def test_ready_once_started(client):
+    assert client.get("/health/live").json() == {"status": "alive"}
+    response = client.get("/health/ready")
+    assert response.status_code == 200 and response.json()["status"] == "ready"
+    assert {"schema", "registry", "default_user", "config_sync"} <= set(response.json()["phases_ms"])
+
+
+def test_fast_start_serves_before_it_is_ready(database, report, monkeypatch):
+    monkeypatch.setattr(main, "FAST_START", True)
+    release = threading.Event()
+    default_principal = auth.default_principal
+
+    async def slow_default_principal():
+        while not release.is_set():
+            await asyncio.sleep(0.01)
+        return await default_principal()
+    monkeypatch.setattr(auth, "default_principal", slow_default_principal)
+
+    with TestClient(main.app) as client:
+        assert client.get("/health/live").status_code == 200
+        response = client.get("/health/ready")
+        assert response.status_code == 503 and response.json()["status"] == "starting"
+        release.set()
+        for _ in range(500):
+            response = client.get("/health/ready")
+            if response.status_code == 200:
+                break
+            time.sleep(0.01)
+        assert response.json()["status"] == "ready"
+        assert response.json()["serving_after_ms"] <= response.json()["ready_after_ms"]
+
+
+def test_failed_initialization_is_reported(database, report, monkeypatch):
+    monkeypatch.setattr(main, "FAST_START", True)
+
+    async def broken():
+        raise RuntimeError("no users table")
+    monkeypatch.setattr(auth, "default_principal", broken)
+
+    with TestClient(main.app) as client:
+        for _ in range(500):
+            response = client.get("/health/ready")
+            if response.json()["status"] != "starting":
+                break
+            time.sleep(0.01)
+    assert response.status_code == 503
+    assert response.json()["status"] == "failed" and response.json()["error"] == "RuntimeError: no users table"
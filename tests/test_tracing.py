@@ -0,0 +1,77 @@
+import json
+import time
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from backend import tracing
+from backend.tracing import Tracer, latency_summary
+
+
+@pytest.fixture
+def tracer(monkeypatch):
+    tracer = Tracer()
+    monkeypatch.setattr(tracing, "tracer", tracer)
+    return tracer
+
+
+def test_spans_nest_and_break_down_exclusive_time(tracer):
+    with tracing.span("request", route="/tasks") as request:
+        with tracing.span("db.query"):
+            time.sleep(0.02)
+        tracing.record_span("queue_wait", 0.5)
+        assert tracing.current_span() is request
+    assert tracing.current_span() is None
+
+    query, wait, root = tracer.recent()
+    assert query["trace_id"] == wait["trace_id"] == root["trace_id"]
+    assert query["parent_id"] == wait["parent_id"] == root["span_id"] and root["parent_id"] is None
+    assert root["attrs"] == {"route": "/tasks"}
+    assert wait["duration"] == pytest.approx(0.5, abs=0.01)
+    breakdown = request.breakdown()
+    assert breakdown["db.query"] >= 0.02 and breakdown["queue_wait"] == pytest.approx(0.5, abs=0.01)
+    # The root's own time excludes its children
+    assert breakdown["request"] < 0.02
+
+
+def test_summary_groups_durations_by_attribute(tracer):
+    for server_id, duration in [(1, 0.1), (1, 0.3), (2, 0.2)]:
+        tracing.record_span("mcp.execute_command", duration, server_id=server_id)
+    summary = tracer.summary("mcp.execute_command", "server_id")
+    assert summary["1"]["count"] == 2 and summary["1"]["max"] == pytest.approx(0.3, abs=0.01)
+    assert summary["2"]["p50"] == pytest.approx(0.2, abs=0.01)
+    assert latency_summary([]) == {"count": 0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+
+
+def test_spans_are_exported_as_ndjson(monkeypatch, tmp_path):
+    path = tmp_path / "traces.ndjson"
+    tracer = Tracer(export_path=str(path))
+    monkeypatch.setattr(tracing, "tracer", tracer)
+    for i in range(3):
+        with tracing.span("work", i=i):
+            pass
+    deadline = time.monotonic() + 5
+    while (not path.exists() or len(path.read_text().splitlines()) < 3) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert [json.loads(line)["attrs"]["i"] for line in path.read_text().splitlines()] == [0, 1, 2]
+
+
+def test_failed_statements_end_their_span(database, tracer):
+    with tracing.span("migration"):
+        with pytest.raises(OperationalError):
+            with database.engine.connect() as connection:
+                connection.execute(text("SELECT * FROM no_such_table"))
+        assert tracing.current_span().name == "migration"
+    failed = [span for span in tracer.recent() if span["name"] == "db.query" and "error" in span["attrs"]]
+    assert failed[0]["attrs"]["error"] == "OperationalError"
+
+
+def test_requests_are_traced_with_their_queries(client):
+    assert client.get("/tasks").status_code == 200
+    request = client.get("/traces", params={"name": "http.request", "limit": 1}).json()[0]
+    assert request["attrs"]["route"] == "/tasks" and request["attrs"]["status"] == 200
+    queries = [span for span in client.get("/traces", params={"limit": 1000}).json()
+               if span["trace_id"] == request["trace_id"] and span["name"] == "db.query"]
+    assert queries
+    assert "/tasks" in client.get("/traces/summary").json()["by_route"]
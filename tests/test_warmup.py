@@ -0,0 +1,102 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from backend import crud, schemas
+from backend.database import AsyncSessionLocal
+from backend.warmup import WarmUp, select_servers
+
+
+class FakeManager:
+    """Connects take `delays[name]` seconds; names in `failing` fail"""
+
+    def __init__(self, servers, delays, failing=(), **policy):
+        self.servers = servers
+        self.delays = delays
+        self.failing = set(failing)
+        self.settings = {"warmup": policy}
+        self.connecting = 0
+        self.most_connecting = 0
+
+    def load_settings(self):
+        return self.settings
+
+    def load_config(self):
+        return self.servers
+
+    async def connect_server(self, db, server_id):
+        server = await crud.get_mcpserver(db, server_id)
+        self.connecting += 1
+        self.most_connecting = max(self.most_connecting, self.connecting)
+        try:
+            await asyncio.sleep(self.delays.get(server.name, 0))
+        finally:
+            self.connecting -= 1
+        if server.name in self.failing:
+            return {"success": False, "message": "Connection refused"}
+        return {"success": True, "message": "Connected"}
+
+
+async def add_servers(*names):
+    async with AsyncSessionLocal() as db:
+        for name in names:
+            await crud.create_mcpserver(db, schemas.MCPServerCreate(name=name, host="localhost", port=1, type="web"))
+
+
+def entry(name, *tags):
+    return {"name": name, "host": "localhost", "port": 1, "type": "web", "tags": list(tags)}
+
+
+def test_servers_are_selected_by_tag():
+    servers = [entry("alpha", "edge"), entry("beta", "core"), {"name": "gamma"}]
+    assert select_servers(servers, None) == servers
+    assert [server["name"] for server in select_servers(servers, ["edge", "other"])] == ["alpha"]
+
+
+def test_warm_up_reports_each_server(database, run):
+    names = ["a", "b", "c", "d", "slow", "broken"]
+    manager = FakeManager(
+        [entry(name) for name in names] + [entry("unknown")],
+        delays={name: 0.05 for name in names} | {"slow": 5},
+        failing={"broken"}, concurrency=2, timeout=0.5,
+    )
+
+    async def main():
+        await add_servers(*names)
+        return await WarmUp(manager).run()
+
+    progress = run(main())
+    assert progress["state"] == "done" and progress["total"] == 7
+    assert (progress["connected"], progress["failed"], progress["timed_out"]) == (4, 2, 1)
+    servers = progress["servers"]
+    assert servers["slow"]["status"] == "timed_out"
+    assert servers["broken"] == {"status": "failed", "message": "Connection refused", "ms": servers["broken"]["ms"]}
+    assert servers["unknown"]["message"] == "Server not found"
+    assert manager.most_connecting == 2
+    assert progress["duration"] < 2
+
+
+def test_tags_given_to_run_override_the_policy(database, run):
+    manager = FakeManager([entry("alpha", "edge"), entry("beta", "core")], delays={}, tags=["edge"])
+
+    async def main():
+        await add_servers("alpha", "beta")
+        warmer = WarmUp(manager)
+        return await warmer.run(), await warmer.run(["core"])
+
+    by_policy, by_request = run(main())
+    assert list(by_policy["servers"]) == ["alpha"]
+    assert list(by_request["servers"]) == ["beta"]
+
+
+def test_configured_servers_are_connected_before_ready(database, write_config):
+    from backend.main import app
+    servers = [dict(entry("alpha", "edge"), id=1), dict(entry("beta"), id=2)]
+    write_config({"servers": servers, "warmup": {"enabled": True, "tags": ["edge"]}})
+    with TestClient(app) as client:
+        assert client.get("/health/ready").json()["phases_ms"]["warmup"] >= 0
+        progress = client.get("/metrics/warmup").json()
+        assert progress["state"] == "done" and progress["servers"]["alpha"]["status"] == "connected"
+        assert "beta" not in progress["servers"] and progress["policy"]["tags"] == ["edge"]
+        servers = {server["name"]: server["status"] for server in client.get("/servers").json()}
+        assert servers == {"alpha": True, "beta": False}
@@ -0,0 +1,41 @@
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from backend import crud, schemas
+from backend.database import AsyncSessionLocal
+
+
+def bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_websockets_authenticate_like_requests(client, token):
+    with client.websocket_connect(f"/ws/1?token={token}") as websocket:
+        assert websocket.receive_json()["type"] == "server_list"
+    with client.websocket_connect("/ws/1", headers=bearer(token)) as websocket:
+        assert websocket.receive_json()["type"] == "server_list"
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with client.websocket_connect("/ws/1?token=bad") as websocket:
+            websocket.receive_json()
+    assert closed.value.code == 1008
+
+
+def test_websocket_commands_are_rate_limited_per_user(client, token, write_config):
+    async def add_server():
+        async with AsyncSessionLocal() as db:
+            server = await crud.create_mcpserver(db, schemas.MCPServerCreate(name="alpha", host="localhost", port=1, type="web"))
+        return server.id
+    server_id = client.portal.call(add_server)
+    write_config({"servers": [], "rate_limits": {"per_user": {"rate": 0.01, "burst": 1}}})
+
+    with client.websocket_connect(f"/ws/1?token={token}") as websocket:
+        assert websocket.receive_json()["type"] == "server_list"
+        results = []
+        for _ in range(2):
+            websocket.send_json({"type": "execute_command", "server_id": server_id, "command": "echo hi"})
+            message = websocket.receive_json()
+            while message["type"] != "command_result":
+                message = websocket.receive_json()
+            results.append(message)
+    assert "status_code" not in results[0]
+    assert results[1]["success"] is False and results[1]["status_code"] == 429
@@ -0,0 +1,164 @@
+# Lightweight tracing: nested spans propagated through contextvars, kept in an
+# in-memory ring buffer and optionally appended as NDJSON to TRACE_FILE.
+import contextvars
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+_span_ids = itertools.count(1)
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+class Trace:
+    """Spans sharing a root; accumulates exclusive time per span name"""
+    __slots__ = ("trace_id", "breakdown")
+
+    def __init__(self):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.breakdown: Dict[str, float] = {}
+
+
+class Span:
+    __slots__ = ("name", "span_id", "parent", "trace", "attrs", "start_time", "started", "duration", "child_time", "token")
+
+    def __init__(self, name: str, parent: Optional["Span"], attrs: Dict[str, Any]):
+        self.name = name
+        self.span_id = next(_span_ids)
+        self.parent = parent
+        self.trace = parent.trace if parent is not None else Trace()
+        self.attrs = attrs
+        self.start_time = time.time()
+        self.started = time.perf_counter()
+        self.duration = None
+        self.child_time = 0.0
+        self.token = None
+
+    def breakdown(self) -> Dict[str, float]:
+        """Exclusive time per span name recorded so far in this span's trace, in seconds"""
+        return {name: round(seconds, 6) for name, seconds in self.trace.breakdown.items()}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent is not None else None,
+            "name": self.name,
+            "start": self.start_time,
+            "duration": self.duration,
+            "attrs": self.attrs,
+        }
+
+
+class Tracer:
+    def __init__(self, buffer_size: int = 10000, export_path: Optional[str] = None):
+        self.spans = deque(maxlen=buffer_size)
+        self.export_path = export_path
+        self._pending = deque()
+        self._wakeup = threading.Event()
+        self._writer = None
+
+    def record(self, span: Span) -> None:
+        self.spans.append(span)
+        if self.export_path:
+            self._pending.append(span)
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="trace-exporter", daemon=True)
+                self._writer.start()
+            self._wakeup.set()
+
+    def _write_loop(self) -> None:
+        # Spans are appended off the request path, in batches
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            lines = []
+            while self._pending:
+                lines.append(json.dumps(self._pending.popleft().to_dict(), default=str))
+            if lines:
+                with open(self.export_path, "a") as f:
+                    f.write("\n".join(lines) + "\n")
+
+    def recent(self, limit: int = 100, name: Optional[str] = None) -> List[Dict[str, Any]]:
+        spans = [s for s in list(self.spans) if name is None or s.name == name]
+        return [s.to_dict() for s in spans[-limit:]]
+
+    def summary(self, name: str, group_by: str) -> Dict[str, Dict[str, Any]]:
+        """p50/p95/p99 of `name` span durations grouped by an attribute"""
+        groups: Dict[str, List[float]] = {}
+        for s in list(self.spans):
+            if s.name == name and group_by in s.attrs:
+                groups.setdefault(str(s.attrs[group_by]), []).append(s.duration)
+        return {key: latency_summary(durations) for key, durations in groups.items()}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def latency_summary(durations: List[float]) -> Dict[str, Any]:
+    values = sorted(durations)
+    return {
+        "count": len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": values[-1] if values else 0.0,
+    }
+
+
+tracer = Tracer(
+    buffer_size=int(os.environ.get("TRACE_BUFFER_SIZE", "10000")),
+    export_path=os.environ.get("TRACE_FILE"),
+)
+
+
+def start_span(name: str, **attrs) -> Span:
+    """Start a span as a child of the current one; must be ended with end_span"""
+    span = Span(name, _current_span.get(), attrs)
+    span.token = _current_span.set(span)
+    return span
+
+
+def end_span(span: Span) -> None:
+    span.duration = time.perf_counter() - span.started
+    try:
+        _current_span.reset(span.token)
+    except ValueError:
+        # Ended in a different context than it was started in (e.g. SQLAlchemy events)
+        _current_span.set(span.parent)
+    exclusive = span.duration - span.child_time
+    span.trace.breakdown[span.name] = span.trace.breakdown.get(span.name, 0.0) + exclusive
+    if span.parent is not None:
+        span.parent.child_time += span.duration
+    tracer.record(span)
+
+
+@contextmanager
+def span(name: str, **attrs) -> Iterator[Span]:
+    current = start_span(name, **attrs)
+    try:
+        yield current
+    finally:
+        end_span(current)
+
+
+def record_span(name: str, duration: float, **attrs) -> None:
+    """Record an already measured interval (e.g. queue wait) as a child of the current span"""
+    current = start_span(name, **attrs)
+    current.started -= duration
+    current.start_time -= duration
+    end_span(current)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
@@ -1,9 +1,29 @@
-from passlib.context import CryptContext
+import asyncio
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+import functools
+
+import orjson
+
+# passlib is imported on first use; most processes never hash a password
+@functools.lru_cache(maxsize=None)
+def get_pwd_context():
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
+
+# bcrypt takes a few hundred milliseconds by design; keep it off the event loop
+async def verify_password_async(plain_password, hashed_password):
+    return await asyncio.to_thread(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    return await asyncio.to_thread(get_password_hash, password)
+
+def dumps_json(content):
+    """Serialize to compact JSON bytes, as the default ORJSONResponse does"""
+    return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
@@ -0,0 +1,104 @@
+# Connection warm-up of configured servers
+#
+# Connects the servers listed in config.json (or those carrying one of the
+# configured tags) concurrently, so the first request to each of them does not
+# pay for the connect. At most `concurrency` connects run at a time and each is
+# abandoned after `timeout` seconds; a server that fails or times out is left
+# to the auto-reconnect of its first command.
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+
+from backend import crud, database
+from backend.logs import get_logger
+from backend.mcp_manager import mcp_manager
+
+logger = get_logger(__name__)
+
+# Overridden by "warmup" in config.json
+DEFAULT_POLICY = {
+    "enabled": False,
+    "tags": None,  # only servers whose config entry has one of these "tags"; null for all
+    "concurrency": 8,  # connects in flight at once
+    "timeout": 10,  # seconds per server
+}
+
+
+def select_servers(servers: List[Dict[str, Any]], tags: Optional[List[str]]) -> List[Dict[str, Any]]:
+    """Config entries to warm up: all of them, or those sharing a tag with `tags`"""
+    if not tags:
+        return list(servers)
+    wanted = set(tags)
+    return [server for server in servers if wanted.intersection(server.get("tags") or [])]
+
+
+class WarmUp:
+    """Connects configured servers concurrently and reports progress"""
+
+    def __init__(self, manager):
+        self.manager = manager
+        self._lock = asyncio.Lock()
+        self.progress: Dict[str, Any] = {"state": "idle"}
+
+    def policy(self) -> Dict[str, Any]:
+        return {**DEFAULT_POLICY, **(self.manager.load_settings().get("warmup") or {})}
+
+    async def run(self, tags: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Connect the configured servers (those with one of `tags`, if given) and return the progress report"""
+        async with self._lock:
+            policy = self.policy()
+            selected = select_servers(self.manager.load_config(), tags if tags is not None else policy["tags"])
+            self.progress = {
+                "state": "running",
+                "total": len(selected),
+                "connected": 0,
+                "failed": 0,
+                "timed_out": 0,
+                "started_at": int(time.time()),
+                "duration": None,
+                "servers": {server["name"]: {"status": "pending"} for server in selected},
+            }
+            started = time.monotonic()
+            semaphore = asyncio.Semaphore(max(1, policy["concurrency"]))
+            await asyncio.gather(*(self._warm(server["name"], semaphore, policy["timeout"]) for server in selected))
+            self.progress["state"] = "done"
+            self.progress["duration"] = round(time.monotonic() - started, 3)
+            logger.info(
+                "Warm-up connected %d of %d servers in %.3f s (%d failed, %d timed out)",
+                self.progress["connected"], self.progress["total"], self.progress["duration"],
+                self.progress["failed"], self.progress["timed_out"]
+            )
+            return self.progress
+
+    async def _warm(self, name: str, semaphore: asyncio.Semaphore, timeout: float) -> None:
+        entry = self.progress["servers"][name]
+        async with semaphore:
+            started = time.monotonic()
+            entry["status"] = "connecting"
+            async with database.AsyncSessionLocal() as db:
+                server = await crud.get_mcpserver_by_name(db, name)
+                if server is None:
+                    result = {"success": False, "message": "Server not found"}
+                else:
+                    try:
+                        result = await asyncio.wait_for(self.manager.connect_server(db, server.id), timeout)
+                    except asyncio.TimeoutError:
+                        result = None
+                    except Exception as e:
+                        result = {"success": False, "message": str(e)}
+        entry["ms"] = round((time.monotonic() - started) * 1000, 1)
+        if result is None:
+            entry["status"] = "timed_out"
+            self.progress["timed_out"] += 1
+        elif result["success"]:
+            entry["status"] = "connected"
+            self.progress["connected"] += 1
+        else:
+            entry["status"] = "failed"
+            entry["message"] = result["message"]
+            self.progress["failed"] += 1
+        done = self.progress["connected"] + self.progress["failed"] + self.progress["timed_out"]
+        logger.debug("Warm-up %d/%d: %s %s", done, self.progress["total"], name, entry["status"])
+
+
+warmer = WarmUp(mcp_manager)
@@ -1,44 +1,91 @@
-from fastapi import WebSocket, Depends, WebSocketDisconnect
-from sqlalchemy.orm import Session
+from fastapi import WebSocket, Depends, WebSocketDisconnect, HTTPException, status
 import json
 import asyncio
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Union
 
 # Import backend modules with correct paths
-from backend import database, crud
+from backend import database, crud, utils
 from backend.mcp_manager import mcp_manager
-from backend.auth import get_db
+from backend.auth import Principal, get_current_user, get_db
+from backend.ratelimit import rate_limiter
+from backend import queue, instrumentation
+from backend.logs import get_logger
+
+logger = get_logger(__name__)
+# WebSocket errors can repeat for every message of a misbehaving client
+error_logger = get_logger("backend.websocket.errors", rate_limit=(10, 60.0))
 
 # Store active connections
 active_connections: Dict[int, WebSocket] = {}
+instrumentation.websocket_clients.set_function(lambda: len(active_connections))
+
+async def send_message(websocket: WebSocket, payload: Union[Dict[str, Any], str]):
+    """Send a JSON message (a dict, or a str already serialized), counting it as
+    pending until the client has taken it
+    """
+    instrumentation.websocket_pending_sends.inc()
+    try:
+        if not isinstance(payload, str):
+            payload = utils.dumps_json(payload).decode()
+        await websocket.send_text(payload)
+    finally:
+        instrumentation.websocket_pending_sends.dec()
+
+def _render_server_list(servers) -> str:
+    return utils.dumps_json({
+        "type": "server_list",
+        "servers": [
+            {
+                "id": server.id,
+                "name": server.name,
+                "host": server.host,
+                "port": server.port,
+                "type": server.type,
+                "status": server.status
+            } for server in servers.list()
+        ]
+    }).decode()
+
+async def server_list_message(db) -> str:
+    """The serialized server_list message, shared by all clients until a server changes"""
+    servers = await crud.server_registry(db)
+    return servers.view("ws_server_list", lambda: _render_server_list(servers))
+
+async def websocket_principal(websocket: WebSocket) -> Optional[Principal]:
+    """The principal of the bearer token in the `token` query parameter or the
+    Authorization header (browsers cannot set headers on WebSockets), or None
+    if the connection is not authenticated
+    """
+    token = websocket.query_params.get("token")
+    if not token:
+        scheme, _, credentials = websocket.headers.get("authorization", "").partition(" ")
+        if scheme.lower() == "bearer":
+            token = credentials
+    try:
+        return await get_current_user(token or None)
+    except HTTPException:
+        return None
 
 async def websocket_endpoint(websocket: WebSocket, client_id: int):
+    principal = await websocket_principal(websocket)
+    if principal is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
     await websocket.accept()
     active_connections[client_id] = websocket
     
-    # Create a database session
-    db = database.SessionLocal()
+    # Create a database session; it is only used by this handler, the metrics
+    # task opens its own since an AsyncSession cannot be shared between tasks
+    db = database.AsyncSessionLocal()
+    metrics_task = None
     
     try:
         # Send initial server list
         await asyncio.sleep(1) # Add a 1-second delay before sending initial server list
-        servers = crud.get_mcpservers(db)
-        await websocket.send_json({
-            "type": "server_list",
-            "servers": [
-                {
-                    "id": server.id,
-                    "name": server.name,
-                    "host": server.host,
-                    "port": server.port,
-                    "type": server.type,
-                    "status": server.status
-                } for server in servers
-            ]
-        })
+        await send_message(websocket, await server_list_message(db))
         
         # Start metrics update task
-        metrics_task = asyncio.create_task(send_metrics_updates(websocket, db))
+        metrics_task = asyncio.create_task(send_metrics_updates(websocket))
         
         # Listen for messages
         while True:
@@ -47,8 +94,8 @@ async def websocket_endpoint(websocket: WebSocket, client_id: int):
             
             if message["type"] == "connect_server":
                 server_id = message["server_id"]
-                result = mcp_manager.connect_server(db, server_id)
-                await websocket.send_json({
+                result = await mcp_manager.connect_server(db, server_id)
+                await send_message(websocket, {
                     "type": "server_status_update",
                     "server_id": server_id,
                     "status": result["success"],
@@ -57,8 +104,8 @@ async def websocket_endpoint(websocket: WebSocket, client_id: int):
                 
             elif message["type"] == "disconnect_server":
                 server_id = message["server_id"]
-                result = mcp_manager.disconnect_server(db, server_id)
-                await websocket.send_json({
+                result = await mcp_manager.disconnect_server(db, server_id)
+                await send_message(websocket, {
                     "type": "server_status_update",
                     "server_id": server_id,
                     "status": not result["success"],  # Invert because success means disconnected
@@ -68,8 +115,27 @@ async def websocket_endpoint(websocket: WebSocket, client_id: int):
             elif message["type"] == "execute_command":
                 server_id = message["server_id"]
                 command = message["command"]
-                result = mcp_manager.execute_command(db, server_id, command)
-                await websocket.send_json({
+                server = await crud.get_mcpserver(db, server_id)
+                rate_limiter.configure(mcp_manager.load_settings().get("rate_limits"))
+                rejection = rate_limiter.try_acquire(
+                    server_id, server.type if server else None, f"user:{principal.id}",
+                    queue_depth=queue.tasks_queue.qsize()
+                )
+                if rejection:
+                    await send_message(websocket, {
+                        "type": "command_result",
+                        "server_id": server_id,
+                        "success": False,
+                        "message": rejection["message"],
+                        "status_code": rejection["status_code"],
+                        "retry_after": rejection["retry_after"]
+                    })
+                    continue
+                try:
+                    result = await mcp_manager.execute_command(db, server_id, command)
+                finally:
+                    rate_limiter.release()
+                await send_message(websocket, {
                     "type": "command_result",
                     "server_id": server_id,
                     "success": result["success"],
@@ -78,43 +144,26 @@ async def websocket_endpoint(websocket: WebSocket, client_id: int):
                 })
             
             elif message["type"] == "get_server_list":
-                print("WebSocket received: get_server_list") # Log message received
-                print("WebSocket: Fetching server list from database...") # Log before fetching
-                servers = crud.get_mcpservers(db)
-                print(f"WebSocket: Fetched {len(servers)} servers from database") # Log server count
-                print("WebSocket: Sending 'server_list' message to client...") # Log before sending
-                server_list_payload = {
-                    "type": "server_list",
-                    "servers": [
-                        {
-                            "id": server.id,
-                            "name": server.name,
-                            "host": server.host,
-                            "port": server.port,
-                            "type": server.type,
-                            "status": server.status
-                        } for server in servers
-                    ]
-                }
-                print("WebSocket: Server list payload:", server_list_payload) # Log server list payload
-                await websocket.send_json(server_list_payload)
-                print("WebSocket: Sent 'server_list' message to client") # Log after sending
+                logger.debug("WebSocket client %s requested the server list", client_id)
+                await send_message(websocket, await server_list_message(db))
+                logger.debug("Sent server list to client %s", client_id)
     
     except WebSocketDisconnect:
         if client_id in active_connections:
             del active_connections[client_id]
     except Exception as e:
-        print(f"WebSocket error: {e}")
+        error_logger.warning("WebSocket error for client %s: %s", client_id, e)
     finally:
         # Cancel metrics task
-        metrics_task.cancel()
-        try:
-            await metrics_task
-        except asyncio.CancelledError:
-            pass
+        if metrics_task is not None:
+            metrics_task.cancel()
+            try:
+                await metrics_task
+            except asyncio.CancelledError:
+                pass
         
         # Close database session
-        db.close()
+        await db.close()
         
         # Remove connection
         if client_id in active_connections:
@@ -122,22 +171,23 @@ async def websocket_endpoint(websocket: WebSocket, client_id: int):
         
         await websocket.close()
 
-async def send_metrics_updates(websocket: WebSocket, db: Session):
+async def send_metrics_updates(websocket: WebSocket):
     """Send periodic metrics updates to the client"""
     try:
         while True:
-            servers = crud.get_mcpservers(db)
-            
-            for server in servers:
-                if server.status:
-                    # Get metrics for connected servers
-                    result = mcp_manager.get_server_metrics(db, server.id)
-                    if result["success"]:
-                        await websocket.send_json({
-                            "type": "server_metrics",
-                            "server_id": server.id,
-                            "metrics": result["metrics"]
-                        })
+            async with database.AsyncSessionLocal() as db:
+                servers = await crud.get_mcpservers(db)
+                
+                for server in servers:
+                    if server.status:
+                        # Get metrics for connected servers
+                        result = await mcp_manager.get_server_metrics(db, server.id)
+                        if result["success"]:
+                            await send_message(websocket, {
+                                "type": "server_metrics",
+                                "server_id": server.id,
+                                "metrics": result["metrics"]
+                            })
             
             # Wait before next update
             await asyncio.sleep(5)